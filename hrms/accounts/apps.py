@@ -17,9 +17,11 @@ class AccountsConfig(AppConfig):
         # Import signals
         import accounts.signals
         
-        # Start the scheduler (only in production/runserver, not in migrations)
+        # Start the scheduler for the dev server only. In production it runs
+        # in its own process (`manage.py run_scheduler`, the Procfile's
+        # scheduler entry), so the web and ws workers never run jobs twice.
         import sys
-        if 'runserver' in sys.argv or 'gunicorn' in sys.argv[0]:
+        if 'runserver' in sys.argv:
             # Prevent duplicate initialization in Django dev server (reloader)
             if os.environ.get('RUN_MAIN') != 'true':
                 return
@@ -29,4 +31,4 @@ class AccountsConfig(AppConfig):
                 start_scheduler()
                 logger.info("Attendance scheduler initialized successfully")
             except Exception as e:
-                logger.error(f"Failed to start scheduler: {str(e)}")
\ No newline at end of file
+                logger.error(f"Failed to start scheduler: {str(e)}")
@@ -0,0 +1,103 @@
+"""
+Read side of the offboarding attendance archive (ReleavedAttendance).
+
+Archived rows are append-only and pile up with every departure, so the listing
+uses keyset pagination on (date, id), newest first, instead of OFFSET: each
+page is one range scan on the composite index that matches the filter, no
+matter how deep the client pages. The opaque cursor carries the (date, id) of
+the last row served.
+"""
+
+import base64
+import json
+from datetime import date
+
+from django.db.models import Q
+from django.utils.dateparse import parse_date
+
+from .models import ReleavedAttendance
+
+ARCHIVE_DEFAULT_PAGE_SIZE = 50
+ARCHIVE_MAX_PAGE_SIZE = 500
+
+ARCHIVE_EXPORT_COLUMNS = [
+    "id", "email", "fullname", "department", "date", "check_in", "check_out",
+    "location_type", "latitude", "longitude", "archived_at", "releaved_employee_id",
+]
+
+
+def parse_archive_filters(request):
+    """
+    ?email=...&releaved_employee_id=...&from=YYYY-MM-DD&to=YYYY-MM-DD
+
+    Raises ValueError with a user-facing message on bad input.
+    """
+    filters = {
+        "email": (request.GET.get("email") or "").strip() or None,
+        "releaved_employee_id": None,
+        "from": None,
+        "to": None,
+    }
+
+    raw_id = request.GET.get("releaved_employee_id")
+    if raw_id:
+        try:
+            filters["releaved_employee_id"] = int(raw_id)
+        except ValueError:
+            raise ValueError("releaved_employee_id must be an integer")
+
+    for key in ("from", "to"):
+        raw = request.GET.get(key)
+        if raw:
+            parsed = parse_date(raw)
+            if parsed is None:
+                raise ValueError(f"Invalid '{key}' date. Use YYYY-MM-DD")
+            filters[key] = parsed
+
+    if filters["from"] and filters["to"] and filters["from"] > filters["to"]:
+        raise ValueError("'from' must be on or before 'to'")
+
+    return filters
+
+
+def archived_attendance(filters):
+    queryset = ReleavedAttendance.objects.all()
+    if filters["email"]:
+        queryset = queryset.filter(email=filters["email"])
+    if filters["releaved_employee_id"] is not None:
+        queryset = queryset.filter(releaved_employee_id=filters["releaved_employee_id"])
+    if filters["from"]:
+        queryset = queryset.filter(date__gte=filters["from"])
+    if filters["to"]:
+        queryset = queryset.filter(date__lte=filters["to"])
+    return queryset
+
+
+def encode_cursor(row):
+    payload = json.dumps([row.date.isoformat(), row.id]).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii")
+
+
+def decode_cursor(token):
+    try:
+        day, row_id = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+        return date.fromisoformat(day), int(row_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def keyset_page(queryset, cursor=None, page_size=ARCHIVE_DEFAULT_PAGE_SIZE):
+    """
+    One page of `queryset` newest first, after `cursor` when given.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    queryset = queryset.order_by("-date", "-id")
+    if cursor:
+        day, row_id = decode_cursor(cursor)
+        queryset = queryset.filter(Q(date__lt=day) | Q(date=day, id__lt=row_id))
+
+    rows = list(queryset[:page_size + 1])
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
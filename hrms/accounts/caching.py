@@ -0,0 +1,207 @@
+"""
+Versioned caching for read-heavy endpoints.
+
+Every cached payload is stored under a key that embeds the current version of
+its resource (one counter per model, e.g. "accounts.attendance"). Writes to
+the model bump the counter once their transaction commits (see signals.py),
+which makes every older key unreachable at once; stale entries simply age
+out.
+
+Counters, payloads and hit/miss metrics all live in the shared cache
+configured in settings.CACHES (Redis or a file cache), so every worker sees
+the same versions and the same statistics. Counting hits and misses costs a
+cache write per read, so it only runs with settings.CACHE_STATS_ENABLED.
+
+The views and the prefetch_attendance command build keys and payloads
+through the same functions here, so a warmed entry is exactly what a view
+will read.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Attendance, AbsentEmployeeDetails, Leave, Payroll, Holiday
+from .image_derivatives import thumbnail_url
+
+# Seconds a cached payload stays valid when no write bumps the version first
+CACHE_TIMEOUT = 60 * 5
+
+
+def model_resource(model):
+    """Cache namespace for a model: its app label + model name."""
+    return model._meta.label_lower
+
+
+# Models whose writes bump their cache version (wired up in signals.py)
+VERSIONED_CACHE_MODELS = [Attendance, AbsentEmployeeDetails, Leave, Payroll, Holiday]
+
+ATTENDANCE_RESOURCE = model_resource(Attendance)
+
+
+# ------------------- VERSIONS -------------------
+def _version_key(resource):
+    return f"cache_version:{resource}"
+
+
+def _fresh_version():
+    # Milliseconds since epoch: if the counter is evicted, the new start value
+    # is still larger than any version handed out before it.
+    return int(time.time() * 1000)
+
+
+def get_version(resource):
+    key = _version_key(resource)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _fresh_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(resource):
+    key = _version_key(resource)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Counter missing (never read yet or evicted)
+        version = _fresh_version()
+        cache.set(key, version, None)
+        return version
+
+
+def bump_version_on_commit(resource):
+    """
+    Bump `resource` once the current transaction commits (right away outside
+    one). Bumping earlier would let a concurrent reader rebuild the payload
+    under the new version from rows not committed yet, and that stale payload
+    would then be served until it times out.
+    """
+    transaction.on_commit(lambda: bump_version(resource))
+
+
+def invalidate_model_cache(sender, **kwargs):
+    """post_save / post_delete receiver: bump the version of the sender's resource after commit."""
+    bump_version_on_commit(model_resource(sender))
+
+
+def versioned_key(resource, *parts):
+    suffix = ":".join(str(part) for part in parts)
+    return f"{resource}:v{get_version(resource)}:{suffix}"
+
+
+# ------------------- METRICS -------------------
+def _stat_key(resource, kind):
+    return f"cache_stats:{resource}:{kind}"
+
+
+def _record(resource, kind):
+    if not settings.CACHE_STATS_ENABLED:
+        return
+    key = _stat_key(resource, kind)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def cache_stats(resources):
+    """Version, hits, misses and hit ratio for each resource, across all workers."""
+    stats = {}
+    for resource in resources:
+        hits = cache.get(_stat_key(resource, "hits")) or 0
+        misses = cache.get(_stat_key(resource, "misses")) or 0
+        total = hits + misses
+        stats[resource] = {
+            "version": cache.get(_version_key(resource)),
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / total, 4) if total else None,
+        }
+    return {
+        "backend": settings.CACHES["default"]["BACKEND"].rsplit(".", 1)[-1],
+        "stats_enabled": settings.CACHE_STATS_ENABLED,
+        "resources": stats,
+    }
+
+
+def reset_cache_stats(resources):
+    cache.delete_many([_stat_key(resource, kind) for resource in resources for kind in ("hits", "misses")])
+
+
+# ------------------- READ / WARM -------------------
+def get_or_build(resource, parts, builder, timeout=CACHE_TIMEOUT):
+    """Return the cached payload for `parts`, building and storing it on a miss."""
+    key = versioned_key(resource, *parts)
+    payload = cache.get(key)
+    if payload is None:
+        _record(resource, "misses")
+        payload = builder()
+        cache.set(key, payload, timeout)
+    else:
+        _record(resource, "hits")
+    return payload
+
+
+def warm(resource, parts, builder, timeout=CACHE_TIMEOUT):
+    """Build and store the payload for `parts` unconditionally."""
+    payload = builder()
+    cache.set(versioned_key(resource, *parts), payload, timeout)
+    return payload
+
+
+# ------------------- ATTENDANCE PAYLOADS -------------------
+def _attendance_row(record):
+    return {
+        "email": record.email.email,
+        "role": record.email.role,
+        "fullname": record.fullname,
+        "department": record.department,
+        "date": str(record.date),
+        "check_in": str(record.check_in) if record.check_in else None,
+        "check_out": str(record.check_out) if record.check_out else None,
+        "check_in_photo": record.check_in_photo if record.check_in_photo else None,
+        "check_out_photo": record.check_out_photo if record.check_out_photo else None,
+        "check_in_photo_thumbnail": thumbnail_url(record.check_in_photo),
+        "check_out_photo_thumbnail": thumbnail_url(record.check_out_photo),
+    }
+
+
+def attendance_list_parts(page=None, page_size=None):
+    if page is None:
+        return ("list", "all")
+    return ("list", page, page_size)
+
+
+def build_attendance_list(page=None, page_size=None):
+    """Payload for list_attendance; `page=None` means every record, unpaginated."""
+    records = Attendance.objects.select_related('email').order_by('-date')
+
+    if page is None:
+        return {"attendance": [_attendance_row(record) for record in records]}
+
+    offset = (page - 1) * page_size
+    total_count = Attendance.objects.count()
+    total_pages = (total_count + page_size - 1) // page_size
+
+    return {
+        "attendance": [_attendance_row(record) for record in records[offset:offset + page_size]],
+        "pagination": {
+            "current_page": page,
+            "page_size": page_size,
+            "total_pages": total_pages,
+            "total_count": total_count
+        }
+    }
+
+
+def employee_attendance_parts(email):
+    return ("employee", email)
+
+
+def build_employee_attendance(email):
+    records = Attendance.objects.filter(email_id=email).select_related('email').order_by('-date')
+    return {"attendance": [_attendance_row(record) for record in records]}
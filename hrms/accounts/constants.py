@@ -7,3 +7,9 @@ IST = pytz.timezone("Asia/Kolkata")
 # Attendance windows
 CHECK_IN_START = time(7, 0)        # 07:00 AM IST
 CHECK_IN_DEADLINE = time(12, 0)    # 12:00 PM IST
+
+# Check-ins after this time (IST) count as late in attendance summaries
+LATE_CHECK_IN_AFTER = time(10, 0)  # 10:00 AM IST
+
+# Working days Mon..Sun in numpy.busday weekmask form: Monday-Saturday on, Sunday off
+WORKING_WEEKMASK = "1111110"
@@ -0,0 +1,43 @@
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .realtime import ATTENDANCE_BOARD_GROUP
+from .today_board import get_board, board_view
+
+
+class AttendanceBoardConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Live today-board. On connect the client gets one "snapshot" message (the
+    maintained board, see today_board.py), then one message per check-in,
+    check-out or absence as it is written:
+
+        {"event": "check_in" | "check_out" | "attendance_updated" | "attendance_deleted"
+                  | "absent" | "absence_removed",
+         "data": {...}}
+
+    Connect with ?department=<name> to receive only that department.
+    """
+
+    async def connect(self):
+        query = parse_qs(self.scope.get("query_string", b"").decode())
+        self.department = (query.get("department") or [None])[0]
+
+        await self.channel_layer.group_add(ATTENDANCE_BOARD_GROUP, self.channel_name)
+        await self.accept()
+        await self.send_json({"event": "snapshot", "data": await self.snapshot()})
+
+    async def disconnect(self, code):
+        await self.channel_layer.group_discard(ATTENDANCE_BOARD_GROUP, self.channel_name)
+
+    async def attendance_event(self, message):
+        department = message["data"].get("department")
+        # Delete events carry no department, so they always go through
+        if self.department and department is not None and department != self.department:
+            return
+        await self.send_json({"event": message["event"], "data": message["data"]})
+
+    @database_sync_to_async
+    def snapshot(self):
+        return board_view(get_board(), department=self.department)
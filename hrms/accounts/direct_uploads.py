@@ -0,0 +1,227 @@
+"""
+Presigned, direct-to-MinIO uploads.
+
+Large files no longer have to stream through a Django worker:
+
+1. `uploads/presign/` checks the target and returns a presigned POST policy
+   (the size and content type are enforced by MinIO) plus a presigned PUT URL
+   for clients that cannot send multipart forms.
+2. The client uploads straight to MinIO.
+3. `uploads/confirm/` HEADs the object, checks its size and type, and only
+   then records its URL on the model, removing the previous object if the key
+   changed.
+
+The object key is derived from (kind, email, field, filename) on both calls, so
+confirm needs no server-side state and cannot be pointed at an arbitrary key.
+Keys are the same ones the multipart endpoints write.
+"""
+
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.shortcuts import get_object_or_404
+
+from .models import User, Document, AppliedJobs, Employee, HR, Manager, Admin, CEO
+from .storage import get_s3_client, ensure_bucket
+from .image_derivatives import schedule_derivatives
+
+PRESIGN_EXPIRES_SECONDS = 15 * 60
+
+PDF_TYPES = ("application/pdf",)
+IMAGE_TYPES = ("image/jpeg", "image/png", "image/webp")
+WORD_TYPES = (
+    "application/msword",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+)
+
+DOCUMENT_FIELDS = (
+    "tenth", "twelth", "degree", "masters", "marks_card", "certificates",
+    "award", "resume", "id_proof", "appointment_letter", "offer_letter",
+    "releaving_letter", "resignation_letter", "achievement_crt", "bonafide_crt",
+)
+
+PROFILE_MODELS = (Employee, HR, Manager, Admin, CEO)
+
+
+class UploadTarget(ABC):
+    """Where one kind of upload goes and what it may contain."""
+
+    # Generate thumbnail / face crop after confirm (None: not an image target)
+    derivatives = None
+
+    def __init__(self, kind, content_types, max_bytes):
+        self.kind = kind
+        self.content_types = content_types
+        self.max_bytes = max_bytes
+
+    @abstractmethod
+    def key(self, email, field, ext):
+        ...
+
+    def check(self, email, field):
+        """Raise ValueError / Http404 if the upload is not allowed."""
+
+    @abstractmethod
+    def current_url(self, email, field):
+        ...
+
+    @abstractmethod
+    def record(self, email, field, url):
+        ...
+
+
+class DocumentTarget(UploadTarget):
+    def key(self, email, field, ext):
+        return f"documents/{email.split('@')[0].lower()}/{field}.{ext}"
+
+    def check(self, email, field):
+        if field not in DOCUMENT_FIELDS:
+            raise ValueError(f"field must be one of: {', '.join(DOCUMENT_FIELDS)}")
+        get_object_or_404(User, email=email)
+
+    def current_url(self, email, field):
+        document = Document.objects.filter(email_id=email).first()
+        return getattr(document, field) if document else None
+
+    def record(self, email, field, url):
+        Document.objects.update_or_create(email_id=email, defaults={field: url})
+
+
+class ResumeTarget(UploadTarget):
+    def key(self, email, field, ext):
+        return f"careers_resume/{email}.{ext}"
+
+    def check(self, email, field):
+        get_object_or_404(AppliedJobs, email=email)
+
+    def current_url(self, email, field):
+        return AppliedJobs.objects.filter(email=email).values_list('resume', flat=True).first()
+
+    def record(self, email, field, url):
+        AppliedJobs.objects.filter(email=email).update(resume=url)
+
+
+class ProfilePictureTarget(UploadTarget):
+    derivatives = {"face": True, "replaces_previous": True}
+
+    def key(self, email, field, ext):
+        return f"images/{email}/profile_picture.{ext}"
+
+    def _profile(self, email):
+        for model in PROFILE_MODELS:
+            profile = model.objects.filter(email_id=email).first()
+            if profile:
+                return profile
+        return None
+
+    def check(self, email, field):
+        get_object_or_404(User, email=email)
+        if self._profile(email) is None:
+            raise ValueError("User has no role profile to attach a picture to")
+
+    def current_url(self, email, field):
+        profile = self._profile(email)
+        return profile.profile_picture if profile else None
+
+    def record(self, email, field, url):
+        for model in PROFILE_MODELS:
+            model.objects.filter(email_id=email).update(profile_picture=url)
+
+
+UPLOAD_TARGETS = {
+    target.kind: target
+    for target in (
+        DocumentTarget("document", PDF_TYPES + IMAGE_TYPES, 20 * 1024 * 1024),
+        ResumeTarget("resume", PDF_TYPES + WORD_TYPES + IMAGE_TYPES, 10 * 1024 * 1024),
+        ProfilePictureTarget("profile_picture", IMAGE_TYPES, 5 * 1024 * 1024),
+    )
+}
+
+
+def parse_upload_request(data):
+    """
+    Validate {kind, email, field, filename, content_type} and return
+    (target, email, field, key, content_type). Raises ValueError / Http404.
+    """
+    kind = data.get("kind")
+    target = UPLOAD_TARGETS.get(kind)
+    if target is None:
+        raise ValueError(f"kind must be one of: {', '.join(UPLOAD_TARGETS)}")
+
+    email = (data.get("email") or "").strip()
+    filename = data.get("filename") or ""
+    if not email or not filename:
+        raise ValueError("email and filename are required")
+    ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    if not ext.isalnum():
+        raise ValueError("filename must have an extension")
+
+    content_type = data.get("content_type") or ""
+    if content_type not in target.content_types:
+        raise ValueError(f"content_type must be one of: {', '.join(target.content_types)}")
+
+    field = data.get("field")
+    target.check(email, field)
+    return target, email, field, target.key(email, field, ext), content_type
+
+
+def presign_upload(target, key, content_type):
+    client = get_s3_client()
+    bucket_name = settings.MINIO_STORAGE["BUCKET_NAME"]
+    ensure_bucket(bucket_name)
+
+    post = client.generate_presigned_post(
+        Bucket=bucket_name,
+        Key=key,
+        Fields={"Content-Type": content_type},
+        Conditions=[
+            {"Content-Type": content_type},
+            ["content-length-range", 1, target.max_bytes],
+        ],
+        ExpiresIn=PRESIGN_EXPIRES_SECONDS,
+    )
+    put_url = client.generate_presigned_url(
+        "put_object",
+        Params={"Bucket": bucket_name, "Key": key, "ContentType": content_type},
+        ExpiresIn=PRESIGN_EXPIRES_SECONDS,
+    )
+    return {
+        "key": key,
+        "max_bytes": target.max_bytes,
+        "expires_in": PRESIGN_EXPIRES_SECONDS,
+        "post": post,
+        "put": {"url": put_url, "headers": {"Content-Type": content_type}},
+    }
+
+
+def confirm_upload(target, email, field, key):
+    """
+    HEAD the uploaded object, enforce the target's limits (a presigned PUT
+    cannot), then record its URL. Returns the URL; raises ValueError if the
+    object is missing or not acceptable.
+    """
+    client = get_s3_client()
+    bucket_name = settings.MINIO_STORAGE["BUCKET_NAME"]
+    try:
+        head = client.head_object(Bucket=bucket_name, Key=key)
+    except Exception:
+        raise ValueError("Uploaded object not found; upload it before confirming")
+
+    size = head.get("ContentLength", 0)
+    content_type = head.get("ContentType", "")
+    if not 0 < size <= target.max_bytes or content_type not in target.content_types:
+        client.delete_object(Bucket=bucket_name, Key=key)
+        raise ValueError(f"Uploaded object rejected ({content_type}, {size} bytes)")
+
+    url = f"{settings.BASE_BUCKET_URL}{key}"
+    old_url = target.current_url(email, field)
+    target.record(email, field, url)
+    if target.derivatives is not None:
+        schedule_derivatives(url, **target.derivatives)
+
+    if old_url and old_url != url and old_url.startswith(settings.BASE_BUCKET_URL):
+        try:
+            client.delete_object(Bucket=bucket_name, Key=old_url.replace(settings.BASE_BUCKET_URL, ""))
+        except Exception as e:
+            print(f"Failed to delete replaced object {old_url}: {e}")
+    return url
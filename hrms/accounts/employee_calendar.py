@@ -0,0 +1,91 @@
+"""
+Per-employee calendar: attendance, absence, leave and holiday merged into one
+date-keyed view for a bounded range.
+
+Each table is read with one range query on its (email, date) index. The ETag
+is derived from the shared cache's per-model version counters (see
+caching.py), so a revalidation that hits needs no database query at all.
+"""
+
+import hashlib
+from datetime import timedelta
+
+import numpy as np
+
+from .caching import get_version, model_resource
+from .constants import WORKING_WEEKMASK
+from .models import Attendance, AbsentEmployeeDetails, Leave, Holiday
+
+# Longest range one calendar request may cover
+MAX_CALENDAR_DAYS = 366
+
+CALENDAR_MODELS = (Attendance, AbsentEmployeeDetails, Leave, Holiday)
+
+
+def calendar_etag(email, start, end):
+    versions = ":".join(str(get_version(model_resource(model))) for model in CALENDAR_MODELS)
+    digest = hashlib.md5(f"{email}:{start}:{end}:{versions}".encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+
+def build_calendar(email, start, end):
+    """Date-keyed merged view for `email` between `start` and `end` (inclusive)."""
+    n_days = (end - start).days + 1
+    working = np.is_busday(
+        np.arange(np.datetime64(start), np.datetime64(end) + 1), weekmask=WORKING_WEEKMASK
+    )
+    days = {
+        str(start + timedelta(days=i)): {
+            "status": "none" if working[i] else "weekend",
+            "weekend": not bool(working[i]),
+            "holiday": None,
+            "leave": None,
+            "absent": False,
+            "attendance": None,
+        }
+        for i in range(n_days)
+    }
+
+    # Applied in increasing precedence; each later source overrides "status"
+    for name, holiday_type, day in Holiday.objects.filter(date__range=(start, end)).values_list('name', 'type', 'date'):
+        entry = days[str(day)]
+        entry["holiday"] = {"name": name, "type": holiday_type}
+        entry["status"] = "holiday"
+
+    for day in AbsentEmployeeDetails.objects.filter(email_id=email, date__range=(start, end)).values_list('date', flat=True):
+        entry = days[str(day)]
+        entry["absent"] = True
+        entry["status"] = "absent"
+
+    leaves = Leave.objects.filter(email_id=email, start_date__lte=end, end_date__gte=start).exclude(status='Rejected')
+    for leave in leaves.values('id', 'leave_type', 'status', 'paid_status', 'start_date', 'end_date'):
+        day = max(leave['start_date'], start)
+        last = min(leave['end_date'], end)
+        info = {
+            "id": leave['id'],
+            "leave_type": leave['leave_type'],
+            "status": leave['status'],
+            "paid_status": leave['paid_status'],
+        }
+        while day <= last:
+            entry = days[str(day)]
+            entry["leave"] = info
+            if leave['status'] == 'Approved':
+                entry["status"] = "leave"
+            day += timedelta(days=1)
+
+    attendance = Attendance.objects.filter(email_id=email, date__range=(start, end)).values(
+        'date', 'check_in', 'check_out', 'location_type', 'check_in_photo', 'check_out_photo'
+    )
+    for row in attendance:
+        entry = days[str(row['date'])]
+        entry["attendance"] = {
+            "check_in": str(row['check_in']) if row['check_in'] else None,
+            "check_out": str(row['check_out']) if row['check_out'] else None,
+            "location_type": row['location_type'],
+            "check_in_photo": row['check_in_photo'],
+            "check_out_photo": row['check_out_photo'],
+        }
+        entry["status"] = "wfh" if row['location_type'] == 'work' else "present"
+
+    return days
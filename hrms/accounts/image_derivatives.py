@@ -0,0 +1,264 @@
+"""
+Image derivatives: small WebP thumbnails and normalized face crops.
+
+Each derivative is stored next to its original under a fixed suffix, e.g.
+
+    images/a@x.com/profile_picture.png
+    images/a@x.com/profile_picture.thumb.webp
+    images/a@x.com/profile_picture.face.webp
+
+so they are found from the original's URL or key (`thumbnail_url`,
+`derivative_keys`) without extra columns. Every uploaded image gets a
+thumbnail; face crops are only made for profile pictures, the reference
+faces check-in photos are matched against. They are generated in the background
+right after an upload (`schedule_derivatives`), on a small pool of their own
+(settings.IMAGE_DERIVATIVE_WORKERS) so face detection never queues request
+path S3 transfers behind it; `manage.py generate_image_derivatives`
+backfills existing images.
+
+A profile picture keeps its stem when it is replaced, so the old face crop is
+removed as soon as the new picture is recorded (and whenever no face is
+found); face matching then falls back to the new original instead of the
+previous photo's crop.
+
+The face crop is the largest detected face with a margin, squared and resized
+to FACE_CROP_SIZE. The face box inside the crop (which moves when the face is
+near an edge of the photo) is stored in the object's metadata, so face
+matching can take it as one known face location instead of running detection
+on a full-size photo.
+"""
+
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from django.conf import settings
+from PIL import Image, ImageOps
+
+from .storage import get_s3_client
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SIZE = (256, 256)
+THUMBNAIL_QUALITY = 70
+FACE_CROP_SIZE = 200
+FACE_CROP_QUALITY = 85
+# Extra space kept around the detected face box, as a fraction of its size
+FACE_MARGIN = 0.25
+
+# Object metadata on a face crop: the face box inside it, "top,right,bottom,left"
+FACE_BOX_METADATA = "face-box"
+
+THUMB_SUFFIX = ".thumb.webp"
+FACE_SUFFIX = ".face.webp"
+DERIVATIVE_SUFFIXES = (THUMB_SUFFIX, FACE_SUFFIX)
+
+
+def is_derivative(key):
+    return key.endswith(DERIVATIVE_SUFFIXES)
+
+
+def derivative_key(key, suffix):
+    stem = key.rsplit(".", 1)[0] if "." in key.rsplit("/", 1)[-1] else key
+    return f"{stem}{suffix}"
+
+
+def _derivative_url(url, suffix):
+    base_url = settings.BASE_BUCKET_URL
+    if not url or not url.startswith(base_url):
+        return None
+    return f"{base_url}{derivative_key(url[len(base_url):], suffix)}"
+
+
+def thumbnail_url(url):
+    return _derivative_url(url, THUMB_SUFFIX)
+
+
+def derivative_keys(key):
+    return [derivative_key(key, suffix) for suffix in DERIVATIVE_SUFFIXES]
+
+
+# ------------------- RENDERING -------------------
+def open_image(data):
+    image = Image.open(io.BytesIO(data))
+    image = ImageOps.exif_transpose(image)  # phone photos carry their rotation in EXIF
+    return image.convert("RGB")
+
+
+def _webp(image, quality):
+    buffer = io.BytesIO()
+    image.save(buffer, format="WEBP", quality=quality, method=4)
+    return buffer.getvalue()
+
+
+def make_thumbnail(image):
+    thumbnail = image.copy()
+    thumbnail.thumbnail(THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
+    return _webp(thumbnail, THUMBNAIL_QUALITY)
+
+
+def make_face_crop(image):
+    """
+    (WebP bytes, face location) for the largest face, or None if no face is
+    found. The location is the face box inside the crop as (top, right,
+    bottom, left), the order face_recognition uses.
+    """
+    import face_recognition
+
+    # Detect on a reduced copy; the box is scaled back to the original
+    scale = min(1.0, 800 / max(image.size))
+    probe = image if scale == 1.0 else image.resize((round(image.width * scale), round(image.height * scale)))
+    locations = face_recognition.face_locations(np.asarray(probe))
+    if not locations:
+        return None
+
+    top, right, bottom, left = max(locations, key=lambda box: (box[2] - box[0]) * (box[1] - box[3]))
+    top, right, bottom, left = (value / scale for value in (top, right, bottom, left))
+    center_x, center_y = (left + right) / 2, (top + bottom) / 2
+
+    # A square around the face with a margin; near an edge of the photo it
+    # shrinks to fit and the face is no longer centered in it
+    side = max(bottom - top, right - left) * (1 + 2 * FACE_MARGIN)
+    side = max(1, round(min(side, image.width, image.height)))
+    x0 = min(max(0, round(center_x - side / 2)), image.width - side)
+    y0 = min(max(0, round(center_y - side / 2)), image.height - side)
+    face = image.crop((x0, y0, x0 + side, y0 + side)).resize(
+        (FACE_CROP_SIZE, FACE_CROP_SIZE), Image.Resampling.LANCZOS
+    )
+
+    factor = FACE_CROP_SIZE / side
+
+    def to_crop(value, origin):
+        return min(FACE_CROP_SIZE, max(0, round((value - origin) * factor)))
+
+    location = (to_crop(top, y0), to_crop(right, x0), to_crop(bottom, y0), to_crop(left, x0))
+    return _webp(face, FACE_CROP_QUALITY), location
+
+
+# ------------------- GENERATION -------------------
+def generate_derivatives(key, face=True):
+    """Render and store the derivatives of the object at `key`. Returns the keys written."""
+    client = get_s3_client()
+    bucket_name = settings.MINIO_STORAGE["BUCKET_NAME"]
+    image = open_image(client.get_object(Bucket=bucket_name, Key=key)["Body"].read())
+
+    outputs = {derivative_key(key, THUMB_SUFFIX): (make_thumbnail(image), {})}
+    if face:
+        crop = make_face_crop(image)
+        if crop is not None:
+            data, location = crop
+            outputs[derivative_key(key, FACE_SUFFIX)] = (data, {FACE_BOX_METADATA: encode_face_box(location)})
+        else:
+            # No face in this image: a crop left from an earlier one must not be matched
+            client.delete_object(Bucket=bucket_name, Key=derivative_key(key, FACE_SUFFIX))
+
+    for output_key, (data, metadata) in outputs.items():
+        client.put_object(Bucket=bucket_name, Key=output_key, Body=data, ContentType="image/webp", Metadata=metadata)
+    return list(outputs)
+
+
+def _is_missing(error):
+    return error.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound")
+
+
+def has_derivatives(key):
+    """Whether the thumbnail of `key` exists (it is always written, unlike the face crop)."""
+    client = get_s3_client()
+    try:
+        client.head_object(Bucket=settings.MINIO_STORAGE["BUCKET_NAME"], Key=derivative_key(key, THUMB_SUFFIX))
+    except client.exceptions.ClientError as e:
+        if _is_missing(e):
+            return False
+        raise
+    return True
+
+
+def _generate_quietly(key, face):
+    try:
+        generate_derivatives(key, face=face)
+    except Exception as e:
+        logger.warning(f"Could not generate derivatives for {key}: {e}")
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def derivative_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(
+                    max_workers=settings.IMAGE_DERIVATIVE_WORKERS, thread_name_prefix="image-derivatives"
+                )
+    return _pool
+
+
+def schedule_derivatives(url, face=True, replaces_previous=False):
+    """
+    Generate derivatives for an uploaded image URL in the background.
+    `replaces_previous`: the upload overwrote an image with the same stem, so
+    its face crop is dropped right away rather than once the job finishes.
+    """
+    base_url = settings.BASE_BUCKET_URL
+    if not url or not url.startswith(base_url):
+        return
+    key = url[len(base_url):]
+    if face and replaces_previous:
+        try:
+            get_s3_client().delete_object(
+                Bucket=settings.MINIO_STORAGE["BUCKET_NAME"], Key=derivative_key(key, FACE_SUFFIX)
+            )
+        except Exception as e:
+            logger.warning(f"Could not remove the previous face crop of {key}: {e}")
+    derivative_pool().submit(_generate_quietly, key, face)
+
+
+# ------------------- FACE MATCHING -------------------
+def encode_face_box(location):
+    return ",".join(str(value) for value in location)
+
+
+def decode_face_box(value):
+    """(top, right, bottom, left) from FACE_BOX_METADATA, or None if absent or malformed."""
+    try:
+        location = tuple(int(part) for part in value.split(","))
+    except (AttributeError, ValueError):
+        return None
+    return location if len(location) == 4 else None
+
+
+def reference_face_encodings(url):
+    """
+    Face encodings of a profile picture, from its face crop when there is one
+    (small download, no face detection on the full photo) and from the
+    original otherwise.
+    """
+    import face_recognition
+    import requests
+
+    base_url = settings.BASE_BUCKET_URL
+    if url.startswith(base_url):
+        client = get_s3_client()
+        try:
+            response = client.get_object(
+                Bucket=settings.MINIO_STORAGE["BUCKET_NAME"],
+                Key=derivative_key(url[len(base_url):], FACE_SUFFIX),
+            )
+        except client.exceptions.ClientError as e:
+            if not _is_missing(e):
+                raise
+        else:
+            crop = np.asarray(open_image(response["Body"].read()))
+            location = decode_face_box(response.get("Metadata", {}).get(FACE_BOX_METADATA))
+            # Crops written before the face box was recorded: detect on the (small) crop
+            locations = [location] if location else None
+            return face_recognition.face_encodings(crop, known_face_locations=locations)
+
+    response = requests.get(url, timeout=10)
+    if response.status_code != 200:
+        return []
+    return face_recognition.face_encodings(np.asarray(open_image(response.content)))
@@ -0,0 +1,25 @@
+"""
+Helpers shared by the background job tables (LetterJob, LetterBatch,
+StorageDeletionJob).
+
+Each table claims a row by moving it from 'queued' to 'running' with a
+conditional UPDATE and stamps `started_at`. A row whose process died stays
+'running'; `requeue_stale_running` puts such rows back in the queue so the
+scheduler's pending-job sweep runs them again.
+"""
+
+import logging
+
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def requeue_stale_running(model, stale_after):
+    """Put rows stuck in 'running' since before `stale_after` back in the queue. Returns how many."""
+    requeued = model.objects.filter(
+        status=model.STATUS_RUNNING, started_at__lte=timezone.now() - stale_after,
+    ).update(status=model.STATUS_QUEUED, started_at=None)
+    if requeued:
+        logger.warning(f"Requeued {requeued} {model.__name__} rows left running by a dead process")
+    return requeued
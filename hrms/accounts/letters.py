@@ -0,0 +1,502 @@
+"""
+HR letters: appointment, offer, relieving and bonafide.
+
+A letter request only records a LetterJob and returns its id; once the
+transaction commits, the job runs on a small per-process pool
+(settings.LETTER_WORKERS). The job renders the PDF once into memory, stores
+those bytes in MinIO under documents/<name>/, records the URL on the
+employee's Document and queues the same bytes as the email attachment.
+Jobs whose process went away - still queued, or running for longer than a job
+can take - are picked up by `run_pending_letter_jobs` (scheduler).
+
+PDFs are rendered with settings.PDF_BACKEND and cached under a hash of the
+backend and the rendered HTML (template + context), so re-sending an
+unchanged letter skips PDF rendering.
+
+A LetterBatch generates one letter type for many employees (a list of emails
+or a department / join-date filter): templates are rendered in this process,
+the PDFs missing from the cache in a pool of LETTER_PROCESSES worker processes, uploads run
+concurrently on the shared S3 pool, Document rows are written with
+bulk_update / bulk_create, and all PDFs are also stored as one ZIP. The
+batch endpoint only records the batch: the scheduler process runs queued
+batches (`run_pending_letter_batches`) and `manage.py generate_letters` runs
+one directly, so the process pool is never started inside a web worker.
+"""
+
+import logging
+import multiprocessing
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .jobs import requeue_stale_running
+from .models import Document, Employee, LetterJob, LetterBatch
+from .outbox import enqueue_email
+from .pdf_rendering import content_hash, render_pdf
+from .storage import get_s3_client, run_parallel
+
+logger = logging.getLogger(__name__)
+
+COMPANY_NAME = 'Global Tech Software Solutions'
+COMPANY_LOGO_URL = 'https://www.globaltechsoftwaresolutions.com/_next/image?url=%2Flogo%2FGlobal.jpg&w=64&q=75'
+
+# Queued this long without starting means the scheduling process is gone
+STALE_QUEUED_AFTER = timedelta(minutes=5)
+# Running this long means the process running it died; the run is redone
+STALE_JOB_RUNNING_AFTER = timedelta(minutes=30)
+STALE_BATCH_RUNNING_AFTER = timedelta(hours=3)
+
+# Errors kept on a batch row for inspection
+MAX_RECORDED_ERRORS = 50
+
+
+class LetterError(Exception):
+    pass
+
+
+# ------------------- CONTEXTS -------------------
+def appointment_context(employee, today):
+    return {
+        'employee_name': employee.fullname,
+        'designation': employee.designation or 'Employee',
+        'joining_date': (
+            employee.date_joined.strftime('%d-%m-%Y') if employee.date_joined else today.strftime('%d-%m-%Y')
+        ),
+        'department': employee.department or 'N/A',
+        'reporting_manager': (
+            employee.reports_to.email if employee.reports_to else 'N/A'
+        ),
+        'logo_url': getattr(settings, 'LOGO_URL', ''),
+        'company_name': COMPANY_NAME,
+        'salary': 'Confidential',
+        'today_date': today.strftime('%d-%m-%Y'),
+        'acceptance_deadline': (today + timedelta(days=5)).strftime('%d-%m-%Y'),
+    }
+
+
+def offer_context(employee, today):
+    return {
+        'candidate_name': employee.fullname,
+        'designation': employee.designation or 'Employee',
+        'location': employee.work_location or 'Bangalore',
+        'joining_date': employee.date_joined or today,
+        'today_date': today,
+        'probation_months': 6,
+        'acceptance_deadline': today + timedelta(days=5),
+        'logo_url': COMPANY_LOGO_URL,
+        'company_name': COMPANY_NAME,
+    }
+
+
+def releaving_context(employee, today):
+    last_working_day = getattr(employee, 'last_working_date', today)
+    last_working_day = (
+        last_working_day.strftime("%d-%m-%Y") if hasattr(last_working_day, 'strftime') else str(last_working_day)
+    )
+    return {
+        'employee_name': employee.fullname,
+        'candidate_name': employee.fullname,
+        'employee_id': getattr(employee, 'emp_id', '') or getattr(employee, 'id', ''),
+        'designation': employee.designation or 'Employee',
+        'department': employee.department or '',
+        'date_of_joining': employee.date_joined.strftime("%d-%m-%Y") if employee.date_joined else today.strftime("%d-%m-%Y"),
+        'last_working_day': last_working_day,
+        'resignation_effective_date': last_working_day,
+        'today_date': today.strftime("%d-%m-%Y"),
+        'issue_date': today.strftime("%d-%m-%Y"),
+        'company_name': COMPANY_NAME,
+        'logo_url': COMPANY_LOGO_URL,
+    }
+
+
+def bonafide_context(employee, today):
+    return {
+        'candidate_name': employee.fullname,
+        'email': employee.email_id,
+        'designation': employee.designation or "Employee",
+        'department': employee.department or "N/A",
+        'date_of_joining': employee.date_joined.strftime("%d-%m-%Y") if employee.date_joined else "N/A",
+        'last_working_day': today.strftime("%d-%m-%Y"),
+        'resignation_effective_date': today.strftime("%d-%m-%Y"),
+        'issue_date': today.strftime("%d-%m-%Y"),
+        'company_name': COMPANY_NAME,
+        'logo_url': COMPANY_LOGO_URL,
+    }
+
+
+class LetterType:
+    def __init__(self, kind, title, template, filename, document_field, build_context):
+        self.kind = kind
+        self.title = title
+        self.template = template
+        self.filename = filename
+        self.document_field = document_field
+        self.build_context = build_context
+
+    @property
+    def subject(self):
+        return f"{self.title} - {COMPANY_NAME}"
+
+    def email_body(self, employee):
+        return (
+            f"Dear {employee.fullname},\n\nPlease find attached your {self.title.lower()}.\n\n"
+            f"Best Regards,\nGlobal Tech HR"
+        )
+
+
+LETTER_TYPES = {
+    letter.kind: letter
+    for letter in (
+        LetterType('appointment_letter', 'Appointment Letter', 'letters/appointment_letter.html',
+                   'appointment_letter.pdf', 'appointment_letter', appointment_context),
+        LetterType('offer_letter', 'Offer Letter', 'letters/offer_letter.html',
+                   'offer_letter.pdf', 'offer_letter', offer_context),
+        LetterType('releaving_letter', 'Relieving Letter', 'letters/releaving_letter.html',
+                   'releaving_letter.pdf', 'releaving_letter', releaving_context),
+        LetterType('bonafide_certificate', 'Bonafide Certificate', 'letters/bonafide_certificate.html',
+                   'bonafide_crt.pdf', 'bonafide_crt', bonafide_context),
+    )
+}
+
+
+# ------------------- SINGLE LETTERS -------------------
+def letter_key(email, letter):
+    return f"documents/{email.split('@')[0].lower()}/{letter.filename}"
+
+
+def letter_html(letter, employee, today):
+    return render_to_string(letter.template, letter.build_context(employee, today))
+
+
+def pdf_cache_key(html):
+    return f"letter_pdf:{content_hash(html, settings.PDF_BACKEND)}"
+
+
+def cached_pdf(html):
+    """PDF bytes for `html`, from the cache when the same letter was rendered before."""
+    key = pdf_cache_key(html)
+    pdf = cache.get(key)
+    if pdf is None:
+        pdf = render_pdf(html, settings.PDF_BACKEND)
+        cache.set(key, pdf, settings.PDF_CACHE_TIMEOUT)
+    return pdf
+
+
+def store_pdf(key, pdf, content_type='application/pdf'):
+    get_s3_client().put_object(
+        Bucket=settings.MINIO_STORAGE['BUCKET_NAME'], Key=key, Body=pdf, ContentType=content_type,
+    )
+    return f"{settings.BASE_BUCKET_URL}{key}"
+
+
+def generate_letter(kind, employee):
+    """Render, store and email one letter. Returns the stored file URL."""
+    letter = LETTER_TYPES[kind]
+    email = employee.email_id
+    pdf = cached_pdf(letter_html(letter, employee, timezone.localdate()))
+
+    file_url = store_pdf(letter_key(email, letter), pdf)
+    Document.objects.update_or_create(email_id=email, defaults={letter.document_field: file_url})
+
+    enqueue_email(
+        letter.subject,
+        letter.email_body(employee),
+        email,
+        attachments=[(letter.filename, pdf, 'application/pdf')],
+    )
+    return file_url
+
+
+# ------------------- JOBS -------------------
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def letter_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=settings.LETTER_WORKERS, thread_name_prefix="letters")
+    return _pool
+
+
+def schedule_letter(kind, email):
+    """Record a letter job and start it once the current transaction commits."""
+    if kind not in LETTER_TYPES:
+        raise ValueError(f"Unknown letter type: {kind}")
+    job = LetterJob.objects.create(kind=kind, email=email)
+    transaction.on_commit(lambda: letter_pool().submit(run_letter_job, job.pk))
+    return job
+
+
+def run_letter_job(job_id):
+    """Run one queued job. Safe to call twice; only one run claims it."""
+    try:
+        claimed = LetterJob.objects.filter(pk=job_id, status=LetterJob.STATUS_QUEUED).update(
+            status=LetterJob.STATUS_RUNNING, started_at=timezone.now(),
+        )
+        if not claimed:
+            return
+
+        job = LetterJob.objects.get(pk=job_id)
+        employee = Employee.objects.select_related('reports_to').filter(email_id=job.email).first()
+        if employee is None:
+            raise LetterError("Employee not found")
+        file_url = generate_letter(job.kind, employee)
+        LetterJob.objects.filter(pk=job_id).update(
+            status=LetterJob.STATUS_DONE, file_url=file_url, finished_at=timezone.now(),
+        )
+    except Exception as e:
+        logger.error(f"Letter job {job_id} failed: {str(e)}", exc_info=True)
+        LetterJob.objects.filter(pk=job_id).update(
+            status=LetterJob.STATUS_FAILED, error=str(e), finished_at=timezone.now(),
+        )
+    finally:
+        close_old_connections()
+
+
+def run_pending_letter_jobs(older_than=STALE_QUEUED_AFTER, running_after=STALE_JOB_RUNNING_AFTER):
+    """
+    Run queued jobs created more than `older_than` ago (their background start
+    was lost), after requeueing jobs running for longer than `running_after`.
+    """
+    requeue_stale_running(LetterJob, running_after)
+    job_ids = list(
+        LetterJob.objects.filter(
+            status=LetterJob.STATUS_QUEUED, created_at__lte=timezone.now() - older_than,
+        ).order_by('created_at').values_list('pk', flat=True)
+    )
+    for job_id in job_ids:
+        run_letter_job(job_id)
+    return job_ids
+
+
+def run_pending_letter_batches(running_after=STALE_BATCH_RUNNING_AFTER):
+    """
+    Run every queued batch, oldest first, after requeueing batches running
+    for longer than `running_after`. Returns batch ids.
+    """
+    requeue_stale_running(LetterBatch, running_after)
+    batch_ids = list(
+        LetterBatch.objects.filter(status=LetterBatch.STATUS_QUEUED)
+        .order_by('created_at').values_list('pk', flat=True)
+    )
+    for batch_id in batch_ids:
+        run_letter_batch(batch_id)
+    return batch_ids
+
+
+def letter_job_result(job):
+    return {
+        "id": job.pk,
+        "kind": job.kind,
+        "email": job.email,
+        "status": job.status,
+        "file_url": job.file_url,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+# ------------------- BATCHES -------------------
+def parse_batch_filters(data):
+    """
+    Normalize {emails, department, joined_from, joined_to} into a JSON-able
+    dict. At least one criterion is required. Raises ValueError.
+    """
+    filters = {}
+    emails = data.get('emails')
+    if emails:
+        if isinstance(emails, str):
+            emails = emails.split(',')
+        filters['emails'] = sorted({email.strip() for email in emails if email and email.strip()})
+    if data.get('department'):
+        filters['department'] = str(data['department']).strip()
+    for name in ('joined_from', 'joined_to'):
+        if data.get(name):
+            try:
+                filters[name] = date.fromisoformat(str(data[name])).isoformat()
+            except ValueError:
+                raise ValueError(f"{name} must be a date (YYYY-MM-DD)")
+    if not filters:
+        raise ValueError("Give emails or at least one of department, joined_from, joined_to")
+    return filters
+
+
+def select_employees(filters):
+    employees = Employee.objects.select_related('reports_to')
+    if filters.get('emails'):
+        employees = employees.filter(email_id__in=filters['emails'])
+    if filters.get('department'):
+        employees = employees.filter(department__iexact=filters['department'])
+    if filters.get('joined_from'):
+        employees = employees.filter(date_joined__gte=filters['joined_from'])
+    if filters.get('joined_to'):
+        employees = employees.filter(date_joined__lte=filters['joined_to'])
+    return list(employees.order_by('email_id'))
+
+
+def schedule_letter_batch(kind, filters, send_email=True):
+    """Record a queued batch; the scheduler process picks it up within a minute."""
+    if kind not in LETTER_TYPES:
+        raise ValueError(f"Unknown letter type: {kind}")
+    return LetterBatch.objects.create(kind=kind, filters=filters, send_email=send_email)
+
+
+def render_pdfs(htmls, processes=None):
+    """
+    {name: html} -> ({name: pdf bytes}, {name: error}). Cached PDFs are reused;
+    the rest are rendered across worker processes and cached. "spawn" keeps
+    the children free of this process's threads and connections; they only
+    import the Django-free pdf_rendering module.
+    """
+    pdfs, errors = {}, {}
+    keys = {name: pdf_cache_key(html) for name, html in htmls.items()}
+    cached = cache.get_many(set(keys.values()))
+    missing = {}
+    for name, html in htmls.items():
+        if keys[name] in cached:
+            pdfs[name] = cached[keys[name]]
+        else:
+            missing[name] = html
+    if not missing:
+        return pdfs, errors
+
+    processes = max(1, min(processes or settings.LETTER_PROCESSES, len(missing)))
+    rendered = {}
+    with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn')) as executor:
+        futures = {name: executor.submit(render_pdf, html, settings.PDF_BACKEND) for name, html in missing.items()}
+        for name, future in futures.items():
+            try:
+                pdfs[name] = rendered[keys[name]] = future.result()
+            except Exception as e:
+                errors[name] = str(e)
+    cache.set_many(rendered, settings.PDF_CACHE_TIMEOUT)
+    return pdfs, errors
+
+
+def save_document_urls(field, urls):
+    """Set Document.<field> for {email: url} with one bulk_update and one bulk_create."""
+    existing = {document.email_id: document for document in Document.objects.filter(email_id__in=urls)}
+    created = []
+    for email, url in urls.items():
+        if email in existing:
+            setattr(existing[email], field, url)
+        else:
+            created.append(Document(email_id=email, **{field: url}))
+    with transaction.atomic():
+        Document.objects.bulk_update(existing.values(), [field], batch_size=500)
+        Document.objects.bulk_create(created, batch_size=500)
+
+
+def build_zip(files):
+    """ZIP bytes of {filename: content}. PDFs are already compressed, so entries are stored."""
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as archive:
+        for filename, content in files.items():
+            archive.writestr(filename, content)
+    return buffer.getvalue()
+
+
+def run_letter_batch(batch_id, processes=None):
+    """Run one queued batch. Safe to call twice; only one run claims it."""
+    try:
+        claimed = LetterBatch.objects.filter(pk=batch_id, status=LetterBatch.STATUS_QUEUED).update(
+            status=LetterBatch.STATUS_RUNNING, started_at=timezone.now(),
+        )
+        if not claimed:
+            return
+
+        batch = LetterBatch.objects.get(pk=batch_id)
+        letter = LETTER_TYPES[batch.kind]
+        employees = {employee.email_id: employee for employee in select_employees(batch.filters)}
+        batch.total = len(employees)
+        batch.save(update_fields=['total'])
+
+        errors = {}
+        htmls = {}
+        today = timezone.localdate()
+        for email, employee in employees.items():
+            try:
+                htmls[email] = letter_html(letter, employee, today)
+            except Exception as e:
+                errors[email] = str(e)
+
+        pdfs, render_errors = render_pdfs(htmls, processes)
+        errors.update(render_errors)
+
+        uploads = run_parallel({
+            email: (lambda email=email, pdf=pdf: store_pdf(letter_key(email, letter), pdf))
+            for email, pdf in pdfs.items()
+        })
+        urls = {}
+        for email, (ok, result) in uploads.items():
+            if ok:
+                urls[email] = result
+            else:
+                errors[email] = str(result)
+        save_document_urls(letter.document_field, urls)
+
+        if urls:
+            archive = build_zip({
+                f"{email.split('@')[0].lower()}_{letter.filename}": pdfs[email] for email in sorted(urls)
+            })
+            batch.zip_url = store_pdf(
+                f"letters/batches/{batch.pk}/{letter.kind}.zip", archive, content_type='application/zip',
+            )
+
+        if batch.send_email:
+            with transaction.atomic():
+                for email in urls:
+                    enqueue_email(
+                        letter.subject,
+                        letter.email_body(employees[email]),
+                        email,
+                        attachments=[(letter.filename, pdfs[email], 'application/pdf')],
+                    )
+
+        batch.done_count = len(urls)
+        batch.failed_count = len(errors)
+        batch.errors = [{"email": email, "error": error} for email, error in sorted(errors.items())][:MAX_RECORDED_ERRORS]
+        batch.status = LetterBatch.STATUS_DONE
+        batch.finished_at = timezone.now()
+        batch.save(update_fields=['done_count', 'failed_count', 'errors', 'zip_url', 'status', 'finished_at'])
+        logger.info(f"Letter batch {batch.pk}: {batch.done_count}/{batch.total} generated, {batch.failed_count} failed")
+    except Exception as e:
+        logger.error(f"Letter batch {batch_id} failed: {str(e)}", exc_info=True)
+        LetterBatch.objects.filter(pk=batch_id).update(
+            status=LetterBatch.STATUS_FAILED,
+            finished_at=timezone.now(),
+            errors=[{"email": None, "error": str(e)}],
+        )
+    finally:
+        close_old_connections()
+
+
+def letter_batch_result(batch):
+    return {
+        "id": batch.pk,
+        "kind": batch.kind,
+        "filters": batch.filters,
+        "send_email": batch.send_email,
+        "status": batch.status,
+        "total": batch.total,
+        "done_count": batch.done_count,
+        "failed_count": batch.failed_count,
+        "errors": batch.errors,
+        "zip_url": batch.zip_url,
+        "created_at": batch.created_at,
+        "started_at": batch.started_at,
+        "finished_at": batch.finished_at,
+    }
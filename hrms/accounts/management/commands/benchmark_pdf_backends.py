@@ -0,0 +1,67 @@
+import statistics
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from accounts.models import Employee
+from accounts.letters import LETTER_TYPES, letter_html
+from accounts.pdf_rendering import BACKENDS, render_pdf
+
+
+class Command(BaseCommand):
+    help = 'Compare PDF rendering backends on the letter templates (time per render and output size)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Renders per backend and letter (default: 5)')
+        parser.add_argument('--letter', choices=sorted(LETTER_TYPES), action='append', help='Letter type(s) to render (default: all)')
+        parser.add_argument('--backend', choices=sorted(BACKENDS), action='append', help='Backend(s) to compare (default: all)')
+        parser.add_argument('--email', help='Render for this employee instead of sample data')
+
+    def _employee(self, email):
+        if email:
+            employee = Employee.objects.select_related('reports_to').filter(email_id=email).first()
+            if employee is None:
+                raise CommandError(f'Employee {email} not found')
+            return employee
+        return Employee(
+            email_id='sample.employee@example.com',
+            fullname='Sample Employee',
+            designation='Software Engineer',
+            department='Engineering',
+            work_location='Bangalore',
+            date_joined=timezone.localdate() - timedelta(days=30),
+        )
+
+    def handle(self, *args, **options):
+        if options['runs'] < 1:
+            raise CommandError('--runs must be at least 1')
+        employee = self._employee(options['email'])
+        today = timezone.localdate()
+
+        htmls = {}
+        for kind in options['letter'] or sorted(LETTER_TYPES):
+            try:
+                htmls[kind] = letter_html(LETTER_TYPES[kind], employee, today)
+            except Exception as e:
+                self.stderr.write(f'{kind}: cannot render template ({e})')
+
+        self.stdout.write(f"{'backend':<12} {'letter':<22} {'mean ms':>9} {'min ms':>9} {'max ms':>9} {'KB':>8}")
+        for name in options['backend'] or sorted(BACKENDS):
+            ok, reason = BACKENDS[name].available()
+            if not ok:
+                self.stdout.write(f'{name:<12} unavailable: {reason}')
+                continue
+            for kind, html in htmls.items():
+                timings = []
+                try:
+                    for _ in range(options['runs']):
+                        started = time.perf_counter()
+                        pdf = render_pdf(html, name)
+                        timings.append((time.perf_counter() - started) * 1000)
+                except Exception as e:
+                    self.stdout.write(f'{name:<12} {kind:<22} failed: {e}')
+                    continue
+                self.stdout.write(
+                    f'{name:<12} {kind:<22} {statistics.mean(timings):>9.1f} {min(timings):>9.1f} '
+                    f'{max(timings):>9.1f} {len(pdf) / 1024:>8.1f}'
+                )
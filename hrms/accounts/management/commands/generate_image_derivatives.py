@@ -0,0 +1,78 @@
+from itertools import chain, islice
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from accounts.models import Award, Attendance
+from accounts.direct_uploads import PROFILE_MODELS
+from accounts.image_derivatives import generate_derivatives, has_derivatives
+from accounts.storage import run_parallel
+
+BATCH_SIZE = 64
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate thumbnails for profile pictures, award photos and attendance photos, and face crops '
+        'for profile pictures, where they have none yet (--force regenerates every image)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--only', choices=['profiles', 'awards', 'attendance'], help='Backfill one kind of image only'
+        )
+        parser.add_argument(
+            '--force', action='store_true', help='Regenerate derivatives even where a thumbnail already exists'
+        )
+
+    def _generate(self, key, face, force):
+        if not force and has_derivatives(key):
+            return False
+        generate_derivatives(key, face=face)
+        return True
+
+    def _urls(self, kind):
+        if kind == 'profiles':
+            for model in PROFILE_MODELS:
+                for url in model.objects.exclude(profile_picture__isnull=True).values_list('profile_picture', flat=True).iterator():
+                    yield url, True
+        elif kind == 'awards':
+            for url in Award.objects.exclude(photo__isnull=True).values_list('photo', flat=True).iterator():
+                yield url, False
+        else:
+            for check_in_photo, check_out_photo in (
+                Attendance.objects.exclude(check_in_photo__isnull=True, check_out_photo__isnull=True)
+                .values_list('check_in_photo', 'check_out_photo')
+                .iterator()
+            ):
+                for url in (check_in_photo, check_out_photo):
+                    yield url, False
+
+    def handle(self, *args, **options):
+        kinds = [options['only']] if options['only'] else ['profiles', 'awards', 'attendance']
+        base_url = settings.BASE_BUCKET_URL
+        images = (
+            (url[len(base_url):], face)
+            for url, face in chain.from_iterable(self._urls(kind) for kind in kinds)
+            if url and url.startswith(base_url)
+        )
+
+        done = skipped = failed = 0
+        while True:
+            batch = list(islice(images, BATCH_SIZE))
+            if not batch:
+                break
+            results = run_parallel({
+                key: (lambda key=key, face=face: self._generate(key, face, options['force']))
+                for key, face in batch
+            })
+            for key, (ok, result) in results.items():
+                if ok and result:
+                    done += 1
+                elif ok:
+                    skipped += 1
+                else:
+                    failed += 1
+                    self.stderr.write(f'{key}: {result}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated derivatives for {done} images, {skipped} already had them, {failed} failed'
+        ))
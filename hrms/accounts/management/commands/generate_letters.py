@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from accounts.models import LetterBatch
+from accounts.letters import LETTER_TYPES, parse_batch_filters, run_letter_batch
+
+
+class Command(BaseCommand):
+    help = 'Generate one letter type for many employees (by email list or department / join date) and a ZIP of all PDFs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(LETTER_TYPES), help='Letter type')
+        parser.add_argument('--emails', nargs='+', help='Employee emails')
+        parser.add_argument('--department', help='Employees of this department')
+        parser.add_argument('--joined-from', help='Employees who joined on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--joined-to', help='Employees who joined on or before this date (YYYY-MM-DD)')
+        parser.add_argument('--no-email', action='store_true', help='Store the letters without emailing them')
+        parser.add_argument('--processes', type=int, help='PDF worker processes (default: settings.LETTER_PROCESSES)')
+
+    def handle(self, *args, **options):
+        try:
+            filters = parse_batch_filters(options)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        batch = LetterBatch.objects.create(kind=options['kind'], filters=filters, send_email=not options['no_email'])
+        run_letter_batch(batch.pk, processes=options['processes'])
+        batch.refresh_from_db()
+
+        for error in batch.errors:
+            self.stderr.write(f"{error['email'] or '-'}: {error['error']}")
+        if batch.status == LetterBatch.STATUS_FAILED:
+            raise CommandError(f'Batch {batch.pk} failed')
+        self.stdout.write(self.style.SUCCESS(
+            f'Batch {batch.pk}: {batch.done_count}/{batch.total} letters generated, '
+            f'{batch.failed_count} failed. ZIP: {batch.zip_url or "-"}'
+        ))
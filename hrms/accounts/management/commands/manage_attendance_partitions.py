@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand, CommandError
+from accounts.partitioning import (
+    PARTITIONED_MODELS, is_postgresql, is_partitioned, convert_to_partitioned, maintain_partitions,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'PostgreSQL monthly partitions for attendance and absence tables: convert a table once with '
+        '--convert, then run regularly to create upcoming partitions and retire old ones'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--table',
+            choices=sorted(PARTITIONED_MODELS) + ['all'],
+            default='all',
+            help='Which table to manage (default: all)'
+        )
+        parser.add_argument(
+            '--convert',
+            action='store_true',
+            help='Rebuild the table as a partitioned table (locks it while rows are copied; run in a maintenance window)'
+        )
+        parser.add_argument(
+            '--months-ahead',
+            type=int,
+            default=3,
+            help='Keep partitions created this many months ahead (default: 3)'
+        )
+        parser.add_argument(
+            '--retain-months',
+            type=int,
+            default=None,
+            help='Detach partitions older than this many months (default: keep everything)'
+        )
+        parser.add_argument(
+            '--drop',
+            action='store_true',
+            help='Drop retired partitions instead of leaving them as detached archive tables'
+        )
+
+    def handle(self, *args, **options):
+        if not is_postgresql():
+            raise CommandError('Partitioning is only available on PostgreSQL')
+
+        names = sorted(PARTITIONED_MODELS) if options['table'] == 'all' else [options['table']]
+        for name in names:
+            model = PARTITIONED_MODELS[name]
+            table = model._meta.db_table
+
+            if options['convert']:
+                if is_partitioned(table):
+                    self.stdout.write(self.style.WARNING(f'{table} is already partitioned'))
+                else:
+                    convert_to_partitioned(model, months_ahead=options['months_ahead'])
+                    self.stdout.write(self.style.SUCCESS(f'Converted {table} to monthly partitions'))
+
+            if not is_partitioned(table):
+                self.stdout.write(self.style.WARNING(f'{table} is not partitioned; run with --convert first'))
+                continue
+
+            created, retired = maintain_partitions(
+                model,
+                months_ahead=options['months_ahead'],
+                retain_months=options['retain_months'],
+                drop=options['drop'],
+            )
+            action = 'Dropped' if options['drop'] else 'Detached'
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'{table}: created {len(created)} partition(s){" " + ", ".join(created) if created else ""}; '
+                    f'{action.lower()} {len(retired)}{" " + ", ".join(retired) if retired else ""}'
+                )
+            )
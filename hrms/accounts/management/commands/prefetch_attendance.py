@@ -1,7 +1,13 @@
 import logging
 from django.core.management.base import BaseCommand
-from django.core.cache import cache
 from accounts.models import Attendance
+from accounts.caching import (
+    ATTENDANCE_RESOURCE, warm,
+    attendance_list_parts, build_attendance_list,
+    employee_attendance_parts, build_employee_attendance,
+)
+from accounts.realtime import board_date
+from accounts.today_board import rebuild_board
 
 logger = logging.getLogger(__name__)
 
@@ -13,7 +19,7 @@ class Command(BaseCommand):
             '--page-size',
             type=int,
             default=20,
-            help='Number of records to fetch per page (default: 20)'
+            help='Number of records to fetch per page (default: 20, max: 100)'
         )
         parser.add_argument(
             '--pages',
@@ -21,23 +27,49 @@ class Command(BaseCommand):
             default=5,
             help='Number of pages to pre-fetch (default: 5)'
         )
+        parser.add_argument(
+            '--employees',
+            action='store_true',
+            help="Also warm the per-employee attendance of everyone who has a record today"
+        )
 
     def handle(self, *args, **options):
-        page_size = options['page_size']
+        # Same clamp list_attendance applies, so the keys line up
+        page_size = min(options['page_size'], 100)
         pages = options['pages']
-        
+
         logger.info(f"Pre-fetching attendance data: {pages} pages of {page_size} records each")
-        
+
         try:
             # Pre-fetch multiple pages of attendance data
             for page in range(1, pages + 1):
-                self.prefetch_page(page, page_size)
-                
+                payload = warm(
+                    ATTENDANCE_RESOURCE,
+                    attendance_list_parts(page, page_size),
+                    lambda: build_attendance_list(page, page_size),
+                )
+                logger.info(f"Pre-fetched and cached page {page} with {len(payload['attendance'])} records")
+
+            today = board_date()
+            rebuild_board(today)
+
+            warmed_employees = 0
+            if options['employees']:
+                emails = Attendance.objects.filter(date=today).values_list('email_id', flat=True)
+                for email in emails:
+                    warm(
+                        ATTENDANCE_RESOURCE,
+                        employee_attendance_parts(email),
+                        lambda: build_employee_attendance(email),
+                    )
+                    warmed_employees += 1
+
             logger.info("Successfully pre-fetched attendance data")
             self.stdout.write(
                 self.style.SUCCESS(
                     f'Successfully pre-fetched {pages} pages of attendance data '
-                    f'({page_size} records per page)'
+                    f'({page_size} records per page), today\'s attendance '
+                    f'and {warmed_employees} employee histories'
                 )
             )
         except Exception as e:
@@ -45,46 +77,3 @@ class Command(BaseCommand):
             self.stdout.write(
                 self.style.ERROR(f'Error pre-fetching attendance data: {e}')
             )
-
-    def prefetch_page(self, page, page_size):
-        """Pre-fetch and cache a specific page of attendance data"""
-        offset = (page - 1) * page_size
-        
-        # Get total count
-        total_count = Attendance.objects.count()
-        
-        # Get paginated records
-        attendance_records = Attendance.objects.all().order_by('-date')[offset:offset + page_size]
-        
-        result = []
-        for record in attendance_records:
-            result.append({
-                "email": record.email.email,
-                "role": record.email.role,
-                "fullname": record.fullname,
-                "department": record.department,
-                "date": str(record.date),
-                "check_in": str(record.check_in) if record.check_in else None,
-                "check_out": str(record.check_out) if record.check_out else None,
-                "check_in_photo": record.check_in_photo if record.check_in_photo else None,
-                "check_out_photo": record.check_out_photo if record.check_out_photo else None,
-            })
-        
-        # Calculate pagination info
-        total_pages = (total_count + page_size - 1) // page_size
-        
-        response_data = {
-            "attendance": result,
-            "pagination": {
-                "current_page": page,
-                "page_size": page_size,
-                "total_pages": total_pages,
-                "total_count": total_count
-            }
-        }
-        
-        # Cache the result for 5 minutes
-        cache_key = f"attendance_list_page_{page}_size_{page_size}"
-        cache.set(cache_key, response_data, 60 * 5)  # Cache for 5 minutes
-        
-        logger.info(f"Pre-fetched and cached page {page} with {len(result)} records")
\ No newline at end of file
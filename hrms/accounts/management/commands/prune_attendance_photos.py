@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from accounts.photo_retention import run_photo_retention
+
+
+class Command(BaseCommand):
+    help = 'Recompress attendance photos to WebP after N days and delete them after the retention horizon'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recompress-after', type=int, help='Days before photos are recompressed (default: settings)')
+        parser.add_argument('--delete-after', type=int, help='Days before photos are deleted, 0 keeps them (default: settings)')
+        parser.add_argument('--concurrency', type=int, help='Parallel transcodes / delete batches (default: settings)')
+        parser.add_argument('--dry-run', action='store_true', help='Only list the days that would be processed')
+
+    def handle(self, *args, **options):
+        try:
+            stats = run_photo_retention(
+                recompress_after_days=options['recompress_after'],
+                delete_after_days=options['delete_after'],
+                concurrency=options['concurrency'],
+                dry_run=options['dry_run'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f"Days to expire: {', '.join(stats['expired_days']) or '-'}")
+        self.stdout.write(f"Days to recompress: {', '.join(stats['recompressed_days']) or '-'}")
+        if options['dry_run']:
+            return
+        saved = stats['bytes_before'] - stats['bytes_after']
+        self.stdout.write(self.style.SUCCESS(
+            f"Recompressed {stats['recompressed']} photos ({saved / 1024 / 1024:.1f} MB saved, "
+            f"{stats['rows_rewritten']} rows), deleted {stats['deleted']} objects "
+            f"({stats['rows_cleared']} photo URLs cleared), {stats['kept']} originals kept (no row rewritten), "
+            f"{stats['failed']} failed"
+        ))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from accounts.summaries import rebuild_monthly_summaries
+
+
+class Command(BaseCommand):
+    help = 'Rebuild AttendanceMonthlySummary from Attendance and AbsentEmployeeDetails'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, help='Only rebuild this year')
+        parser.add_argument('--month', type=int, help='Only rebuild this month (1-12, needs --year)')
+
+    def handle(self, *args, **options):
+        year = options['year']
+        month = options['month']
+
+        if month is not None and year is None:
+            raise CommandError('--month needs --year')
+        if month is not None and not 1 <= month <= 12:
+            raise CommandError('--month must be between 1 and 12')
+
+        written = rebuild_monthly_summaries(year=year, month=month)
+
+        scope = f'{year}-{month:02d}' if month else (str(year) if year else 'all months')
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt {written} monthly attendance summaries for {scope}')
+        )
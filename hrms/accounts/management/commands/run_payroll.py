@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from accounts.payroll_run import run_payroll
+
+
+class Command(BaseCommand):
+    help = (
+        "Create a month's payroll for every Employee, HR and Manager, with LOP from approved unpaid "
+        "leaves (safe to re-run). CEO and Admin accounts are not included."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', type=int, required=True, help='Month (1-12)')
+        parser.add_argument('--year', type=int, default=timezone.now().year, help='Year (default: current)')
+        parser.add_argument('--emails', nargs='+', help='Only these users')
+        parser.add_argument('--std', type=int, help="Standard working days to record (default: the month's working days)")
+        parser.add_argument('--update-pending', action='store_true', help="Re-apply computed LOP to the month's Pending rows")
+        parser.add_argument('--dry-run', action='store_true', help='Report without writing')
+
+    def handle(self, *args, **options):
+        if not 1 <= options['month'] <= 12:
+            raise CommandError('--month must be 1-12')
+        result = run_payroll(
+            options['year'], options['month'], emails=options['emails'], std=options['std'],
+            update_pending=options['update_pending'], dry_run=options['dry_run'],
+        )
+        for row in result['results']:
+            self.stdout.write(f"{row['email']}: {row['status']} (LOP {row['LOP']}, STD {row['STD']})")
+        prefix = 'Dry run: would create' if options['dry_run'] else 'Created'
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix} {result['created']} payrolls for {result['month']}/{result['year']}, "
+            f"updated {result['updated']}, {result['existing']} already existed"
+        ))
@@ -0,0 +1,24 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from accounts.scheduler import start_scheduler
+
+
+class Command(BaseCommand):
+    help = 'Run the scheduled jobs (accounts/scheduler.py) in this process until stopped'
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+        signal.signal(signal.SIGINT, lambda signum, frame: stop.set())
+
+        scheduler = start_scheduler()
+        jobs = ', '.join(job.id for job in scheduler.get_jobs())
+        self.stdout.write(self.style.SUCCESS(f'Scheduler running: {jobs}'))
+        try:
+            stop.wait()
+        finally:
+            scheduler.shutdown()
+            self.stdout.write('Scheduler stopped')
@@ -0,0 +1,20 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from accounts.models import StorageDeletionJob
+from accounts.object_cleanup import run_pending_deletion_jobs
+
+
+class Command(BaseCommand):
+    help = 'Run queued MinIO object deletion jobs now (and optionally retry failed ones)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retry-failed', action='store_true', help='Re-queue failed jobs before running')
+
+    def handle(self, *args, **options):
+        job_ids = run_pending_deletion_jobs(older_than=timedelta(0), retry_failed=options['retry_failed'])
+        for job in StorageDeletionJob.objects.filter(pk__in=job_ids).order_by('pk'):
+            self.stdout.write(
+                f'Job {job.pk} ({job.reason}, {job.email or "-"}): {job.status}, '
+                f'{job.deleted_count}/{job.total_keys} deleted, {job.error_count} errors'
+            )
+        self.stdout.write(self.style.SUCCESS(f'Ran {len(job_ids)} storage deletion jobs'))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from accounts.models import OutboundEmail
+from accounts.outbox import OUTBOX_BATCH_SIZE, drain_outbox
+
+
+class Command(BaseCommand):
+    help = 'Send every queued email that is due, one SMTP connection per batch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=OUTBOX_BATCH_SIZE,
+                            help=f'Emails sent per SMTP connection (default: {OUTBOX_BATCH_SIZE})')
+        parser.add_argument('--retry-failed', action='store_true',
+                            help='Queue emails that ran out of attempts again before sending')
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            requeued = OutboundEmail.objects.filter(status=OutboundEmail.STATUS_FAILED).update(
+                status=OutboundEmail.STATUS_PENDING, attempts=0, next_attempt_at=timezone.now()
+            )
+            self.stdout.write(f'Re-queued {requeued} failed emails')
+
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = drain_outbox(options['batch_size'])
+            if not sent and not failed:
+                break
+            total_sent += sent
+            total_failed += failed
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Sent {total_sent} emails, {total_failed} failed and will be retried or given up')
+        )
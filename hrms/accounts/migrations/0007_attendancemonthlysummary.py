@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_alter_payroll_year'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceMonthlySummary',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('fullname', models.CharField(blank=True, max_length=255, null=True)),
+                ('department', models.CharField(blank=True, max_length=100, null=True)),
+                ('year', models.PositiveIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('present_days', models.PositiveIntegerField(default=0)),
+                ('absent_days', models.PositiveIntegerField(default=0)),
+                ('late_days', models.PositiveIntegerField(default=0)),
+                ('office_days', models.PositiveIntegerField(default=0)),
+                ('wfh_days', models.PositiveIntegerField(default=0)),
+                ('total_hours', models.DecimalField(decimal_places=2, default=0, max_digits=7)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('email', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['year', 'month'], name='accounts_at_year_c656cd_idx')],
+                'unique_together': {('email', 'year', 'month')},
+            },
+        ),
+    ]
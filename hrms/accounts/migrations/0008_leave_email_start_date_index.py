@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_attendancemonthlysummary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='leave',
+            index=models.Index(fields=['email', 'start_date'], name='accounts_le_email_i_f3f092_idx'),
+        ),
+    ]
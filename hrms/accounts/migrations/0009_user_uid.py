@@ -0,0 +1,65 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:40
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+BATCH_SIZE = 1000
+ATTENDANCE_ID_STEP = 50000
+USER_UID_SEQUENCE = 'accounts_user_uid_seq'
+
+
+def backfill_uids(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    Attendance = apps.get_model('accounts', 'Attendance')
+
+    # Number existing users in email order
+    batch = []
+    for uid, user in enumerate(User.objects.order_by('email').only('email').iterator(), start=1):
+        user.uid = uid
+        batch.append(user)
+        if len(batch) >= BATCH_SIZE:
+            User.objects.bulk_update(batch, ['uid'])
+            batch = []
+    if batch:
+        User.objects.bulk_update(batch, ['uid'])
+
+    # New users draw from a sequence that starts after the backfilled numbers
+    if schema_editor.connection.vendor == 'postgresql':
+        table = schema_editor.quote_name(User._meta.db_table)
+        schema_editor.execute(f"CREATE SEQUENCE {USER_UID_SEQUENCE} OWNED BY {table}.uid")
+        schema_editor.execute(
+            f"SELECT setval(%s, COALESCE((SELECT MAX(uid) FROM {table}), 0) + 1, false)", [USER_UID_SEQUENCE],
+        )
+
+    # Copy uids onto attendance in id ranges so no single UPDATE locks the whole table
+    top = Attendance.objects.aggregate(top=models.Max('id'))['top'] or 0
+    uid_of_user = Subquery(User.objects.filter(email=OuterRef('email_id')).values('uid')[:1])
+    for low in range(0, top + 1, ATTENDANCE_ID_STEP):
+        Attendance.objects.filter(id__gte=low, id__lt=low + ATTENDANCE_ID_STEP).update(user_uid=uid_of_user)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_leave_email_start_date_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='user_uid',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='uid',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['user_uid', 'date'], name='accounts_at_user_ui_e2f3fe_idx'),
+        ),
+        # The sequence is owned by the uid column and goes away with it on reverse
+        migrations.RunPython(backfill_uids, migrations.RunPython.noop),
+    ]
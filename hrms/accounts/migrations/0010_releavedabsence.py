@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:45
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_user_uid'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReleavedAbsence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=254)),
+                ('fullname', models.CharField(blank=True, max_length=255, null=True)),
+                ('department', models.CharField(blank=True, max_length=100, null=True)),
+                ('date', models.DateField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('releaved_employee_id', models.IntegerField(blank=True, help_text='Reference to ReleavedEmployee record', null=True)),
+            ],
+            options={
+                'verbose_name': 'Releaved Absence',
+                'verbose_name_plural': 'Releaved Absences',
+                'ordering': ['-date', '-archived_at'],
+            },
+        ),
+    ]
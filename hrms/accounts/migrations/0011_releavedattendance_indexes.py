@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_releavedabsence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='releavedattendance',
+            index=models.Index(fields=['email', 'date', 'id'], name='accounts_re_email_26971d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='releavedattendance',
+            index=models.Index(fields=['releaved_employee_id', 'date', 'id'], name='accounts_re_releave_7703f2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='releavedattendance',
+            index=models.Index(fields=['date', 'id'], name='accounts_re_date_1cbabe_idx'),
+        ),
+    ]
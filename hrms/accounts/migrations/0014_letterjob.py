@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0013_storagedeletionjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LetterJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('appointment_letter', 'Appointment Letter'), ('offer_letter', 'Offer Letter'), ('releaving_letter', 'Relieving Letter'), ('bonafide_certificate', 'Bonafide Certificate')], max_length=30)),
+                ('email', models.EmailField(max_length=254)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('file_url', models.URLField(blank=True, max_length=500, null=True)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='accounts_le_status_aaeefd_idx')],
+            },
+        ),
+    ]
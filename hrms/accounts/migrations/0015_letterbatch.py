@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0014_letterjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LetterBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('appointment_letter', 'Appointment Letter'), ('offer_letter', 'Offer Letter'), ('releaving_letter', 'Relieving Letter'), ('bonafide_certificate', 'Bonafide Certificate')], max_length=30)),
+                ('filters', models.JSONField(blank=True, default=dict)),
+                ('send_email', models.BooleanField(default=True)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('done_count', models.PositiveIntegerField(default=0)),
+                ('failed_count', models.PositiveIntegerField(default=0)),
+                ('errors', models.JSONField(blank=True, default=list)),
+                ('zip_url', models.URLField(blank=True, max_length=500, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
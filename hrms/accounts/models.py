@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import connection, models
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
 from django.utils import timezone
 from django.core.exceptions import ValidationError
@@ -25,8 +25,30 @@ class UserManager(BaseUserManager):
         return self.create_user(email, role, password, **extra_fields)
 
 
+# PostgreSQL sequence behind User.uid (created by migration 0009)
+USER_UID_SEQUENCE = 'accounts_user_uid_seq'
+
+
+def next_user_uid():
+    """
+    Next User.uid. PostgreSQL draws it from USER_UID_SEQUENCE, so concurrent
+    signups never collide; other databases (SQLite in development) take
+    max + 1 and rely on the unique index.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT nextval(%s)", [USER_UID_SEQUENCE])
+            return cursor.fetchone()[0]
+    return (User.objects.aggregate(top=models.Max('uid'))['top'] or 0) + 1
+
+
 class User(AbstractBaseUser, PermissionsMixin):
     email = models.EmailField(primary_key=True, max_length=254)
+    # Compact integer identity: the expand step of moving foreign keys off the
+    # 254-char email. Email stays the primary key and every FK still points at
+    # it; repointing the FKs (the contract step) would change every email_id
+    # in the API and waits until readers have moved to the uid columns.
+    uid = models.PositiveIntegerField(unique=True, null=True, blank=True, editable=False)
     role = models.CharField(max_length=30)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
@@ -39,6 +61,18 @@ class User(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return f"{self.email} ({self.role})"
 
+    def save(self, *args, **kwargs):
+        if self.uid is None and kwargs.get('update_fields') is None:
+            self.uid = next_user_uid()
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        # Archive and remove attendance / absences in bulk before the cascade
+        # would load them row by row (see signals.offboarding)
+        from .signals import offboarding
+        with offboarding(self):
+            return super().delete(*args, **kwargs)
+
 
 # ------------------- DEPARTMENT -------------------
 class Department(models.Model):
@@ -225,17 +259,21 @@ class Attendance(models.Model):
     location_type = models.CharField(max_length=10, choices=LOCATION_TYPE_CHOICES, default='office')
     check_in_photo = models.URLField(max_length=500, null=True, blank=True, help_text="Photo taken during check-in")
     check_out_photo = models.URLField(max_length=500, null=True, blank=True, help_text="Photo taken during check-out")
+    # Copy of the owner's User.uid, so large scans can group and join on a 4-byte key
+    user_uid = models.PositiveIntegerField(null=True, blank=True, editable=False)
 
     CHECK_IN_DEADLINE = time(12, 0)   # 12:00 PM
 
     class Meta:
         unique_together = ('email', 'date')
         indexes = [
-            models.Index(fields=['email', 'date'])
+            models.Index(fields=['email', 'date']),
+            models.Index(fields=['user_uid', 'date']),
         ]
 
     def save(self, *args, **kwargs):
         if self.email:
+            self.user_uid = self.email.uid
             # Try to get from Employee first
             try:
                 employee = Employee.objects.get(email=self.email)
@@ -314,6 +352,9 @@ class Leave(models.Model):
 
     class Meta:
         ordering = ['-applied_on']
+        indexes = [
+            models.Index(fields=['email', 'start_date']),
+        ]
 
     def __str__(self) -> str:
         return f"{self.email.email} Leave from {self.start_date} to {self.end_date} [{self.status}]"
@@ -632,6 +673,36 @@ class RaiseRequestAttendance(models.Model):
         return f"{email_str} - {self.date}"
 
 
+class AttendanceMonthlySummary(models.Model):
+    """
+    Per-employee, per-month rollup of Attendance and AbsentEmployeeDetails.
+    Kept current by signals on every attendance / absence write (see
+    accounts/summaries.py); rebuild with `manage.py rebuild_attendance_summary`.
+    """
+    id = models.AutoField(primary_key=True)
+    email = models.ForeignKey('User', on_delete=models.CASCADE, to_field='email', related_name='attendance_summaries')
+    fullname = models.CharField(max_length=255, null=True, blank=True)
+    department = models.CharField(max_length=100, null=True, blank=True)
+    year = models.PositiveIntegerField()
+    month = models.PositiveSmallIntegerField()
+    present_days = models.PositiveIntegerField(default=0)
+    absent_days = models.PositiveIntegerField(default=0)
+    late_days = models.PositiveIntegerField(default=0)
+    office_days = models.PositiveIntegerField(default=0)
+    wfh_days = models.PositiveIntegerField(default=0)
+    total_hours = models.DecimalField(max_digits=7, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('email', 'year', 'month')
+        indexes = [
+            models.Index(fields=['year', 'month']),
+        ]
+
+    def __str__(self):
+        return f"{self.fullname or self.email_id} - {self.year}-{self.month:02d}"
+
+
 class ReleavedAttendance(models.Model):
     """
     Stores attendance records of releaved employees before deletion.
@@ -662,11 +733,41 @@ class ReleavedAttendance(models.Model):
         verbose_name = "Releaved Attendance"
         verbose_name_plural = "Releaved Attendances"
         ordering = ['-date', '-archived_at']
+        # Each filter of the archive listing, followed by its keyset (date, id)
+        indexes = [
+            models.Index(fields=['email', 'date', 'id']),
+            models.Index(fields=['releaved_employee_id', 'date', 'id']),
+            models.Index(fields=['date', 'id']),
+        ]
 
     def __str__(self):
         return f"Releaved Attendance: {self.fullname or self.email} - {self.date}"
 
 
+class ReleavedAbsence(models.Model):
+    """
+    Absence records (AbsentEmployeeDetails) of releaved employees, archived
+    alongside ReleavedAttendance before the user is deleted.
+    """
+    # Store email as plain text (not FK) to preserve data after employee deletion
+    email = models.EmailField(max_length=254)
+    fullname = models.CharField(max_length=255, null=True, blank=True)
+    department = models.CharField(max_length=100, null=True, blank=True)
+    date = models.DateField()
+
+    # Audit fields
+    archived_at = models.DateTimeField(default=timezone.now)
+    releaved_employee_id = models.IntegerField(null=True, blank=True, help_text="Reference to ReleavedEmployee record")
+
+    class Meta:
+        verbose_name = "Releaved Absence"
+        verbose_name_plural = "Releaved Absences"
+        ordering = ['-date', '-archived_at']
+
+    def __str__(self):
+        return f"Releaved Absence: {self.fullname or self.email} - {self.date}"
+
+
 class AppliedJobs(models.Model):
     GENDER_CHOICES = [
         ('Male', 'Male'),
@@ -842,3 +943,166 @@ class Shift(models.Model):
     class Meta:
         ordering = ['-date', '-start_time']
         unique_together = ('emp_email', 'date', 'start_time')
+
+
+# ------------------- EMAIL OUTBOX -------------------
+class OutboundEmail(models.Model):
+    """
+    An email waiting to be sent (or already sent) by the outbox worker.
+    Request handlers only insert rows here; see accounts/outbox.py.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENDING, 'Sending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(null=True, blank=True)
+    from_email = models.CharField(max_length=254, null=True, blank=True)
+    to = models.JSONField(default=list)
+    # [{"filename": ..., "mimetype": ..., "content": base64}]
+    attachments = models.JSONField(default=list, blank=True)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    # Due time while pending; lease expiry while sending
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)} ({self.status})"
+
+
+# ------------------- STORAGE CLEANUP -------------------
+class StorageDeletionJob(models.Model):
+    """
+    MinIO objects to remove in the background (see accounts/object_cleanup.py).
+    `keys` are exact object keys; every object under each of `prefixes` is
+    listed and removed as well.
+    """
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    email = models.EmailField(max_length=254, null=True, blank=True)  # Plain text; the user may be gone
+    reason = models.CharField(max_length=50)
+    keys = models.JSONField(default=list, blank=True)
+    prefixes = models.JSONField(default=list, blank=True)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    total_keys = models.PositiveIntegerField(default=0)
+    deleted_count = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.reason} cleanup for {self.email or '-'} ({self.status})"
+
+
+class LetterJob(models.Model):
+    """
+    One HR letter (appointment / offer / relieving / bonafide) rendered,
+    stored and emailed in the background (see accounts/letters.py).
+    """
+    KIND_CHOICES = [
+        ('appointment_letter', 'Appointment Letter'),
+        ('offer_letter', 'Offer Letter'),
+        ('releaving_letter', 'Relieving Letter'),
+        ('bonafide_certificate', 'Bonafide Certificate'),
+    ]
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    email = models.EmailField(max_length=254)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    file_url = models.URLField(max_length=500, null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} for {self.email} ({self.status})"
+
+
+class LetterBatch(models.Model):
+    """
+    One letter type generated for many employees at once (see
+    accounts/letters.py): individual PDFs in each Document plus one ZIP.
+    `filters` holds the selection (emails, department, joined_from/joined_to).
+    """
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=30, choices=LetterJob.KIND_CHOICES)
+    filters = models.JSONField(default=dict, blank=True)
+    send_email = models.BooleanField(default=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    total = models.PositiveIntegerField(default=0)
+    done_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    zip_url = models.URLField(max_length=500, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.kind} batch {self.pk} ({self.status})"
@@ -0,0 +1,186 @@
+"""
+Background removal of MinIO objects.
+
+Deleting a user, award or document only records a StorageDeletionJob with the
+object keys (and key prefixes) that belong to it; once the transaction
+commits, the job runs on the shared S3 I/O pool and removes the objects with
+DeleteObjects, DELETE_BATCH_SIZE keys per call, saving its progress after
+every batch. Jobs whose process went away - still queued, or running for
+longer than a job can take - are picked up by `run_pending_deletion_jobs`
+(scheduler / `manage.py run_storage_deletions`).
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import StorageDeletionJob, Document, Award, Attendance
+from .direct_uploads import DOCUMENT_FIELDS
+from .image_derivatives import derivative_keys
+from .jobs import requeue_stale_running
+from .storage import get_s3_client, s3_manager
+
+logger = logging.getLogger(__name__)
+
+# S3 / MinIO limit for one DeleteObjects request
+DELETE_BATCH_SIZE = 1000
+
+# Errors kept on the job row for inspection
+MAX_RECORDED_ERRORS = 50
+
+# Queued this long without starting means the scheduling process is gone
+STALE_QUEUED_AFTER = timedelta(minutes=5)
+# Running this long means the process running it died; the job is redone
+STALE_RUNNING_AFTER = timedelta(hours=1)
+
+
+def url_to_key(url):
+    base_url = settings.BASE_BUCKET_URL
+    if url and url.startswith(base_url):
+        return url[len(base_url):]
+    return None
+
+
+def collect_user_keys(email):
+    """
+    (keys, prefixes) of every object stored for `email`: documents, award
+    photos and attendance photos (with their thumbnails / face crops) by their
+    recorded URLs, plus everything under images/<email>/ (profile pictures).
+    """
+    urls = []
+    document = Document.objects.filter(email_id=email).values(*DOCUMENT_FIELDS).first()
+    if document:
+        urls.extend(document.values())
+    urls.extend(Award.objects.filter(email_id=email).values_list('photo', flat=True))
+    for check_in_photo, check_out_photo in (
+        Attendance.objects.filter(email_id=email)
+        .exclude(check_in_photo__isnull=True, check_out_photo__isnull=True)
+        .values_list('check_in_photo', 'check_out_photo')
+        .iterator()
+    ):
+        urls.extend((check_in_photo, check_out_photo))
+
+    keys = set()
+    for key in filter(None, map(url_to_key, urls)):
+        keys.add(key)
+        keys.update(derivative_keys(key))
+    return sorted(keys), [f"images/{email}/"]
+
+
+def schedule_deletion(reason, keys=(), prefixes=(), email=None):
+    """Record a deletion job and start it once the current transaction commits."""
+    keys, prefixes = list(keys), list(prefixes)
+    if not keys and not prefixes:
+        return None
+    job = StorageDeletionJob.objects.create(
+        email=email, reason=reason, keys=keys, prefixes=prefixes, total_keys=len(keys),
+    )
+    transaction.on_commit(lambda: s3_manager.pool().submit(run_deletion_job, job.pk))
+    return job
+
+
+def list_prefix(client, bucket_name, prefix):
+    paginator = client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            yield obj['Key']
+
+
+def delete_batch(client, bucket_name, keys):
+    """One DeleteObjects call for at most DELETE_BATCH_SIZE keys. Returns the per-key errors."""
+    response = client.delete_objects(
+        Bucket=bucket_name,
+        Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': True},
+    )
+    return response.get('Errors', [])
+
+
+def run_deletion_job(job_id):
+    """Run one queued job to completion. Safe to call twice; only one run claims it."""
+    try:
+        # Counters restart: a requeued job lists and deletes everything again
+        claimed = StorageDeletionJob.objects.filter(
+            pk=job_id, status=StorageDeletionJob.STATUS_QUEUED,
+        ).update(
+            status=StorageDeletionJob.STATUS_RUNNING, started_at=timezone.now(),
+            deleted_count=0, error_count=0, errors=[],
+        )
+        if not claimed:
+            return
+
+        job = StorageDeletionJob.objects.get(pk=job_id)
+        client = get_s3_client()
+        bucket_name = settings.MINIO_STORAGE["BUCKET_NAME"]
+
+        keys = set(job.keys)
+        for prefix in job.prefixes:
+            keys.update(list_prefix(client, bucket_name, prefix))
+        keys = sorted(keys)
+        job.total_keys = len(keys)
+        job.save(update_fields=['total_keys'])
+
+        for start in range(0, len(keys), DELETE_BATCH_SIZE):
+            batch = keys[start:start + DELETE_BATCH_SIZE]
+            errors = delete_batch(client, bucket_name, batch)
+            job.deleted_count += len(batch) - len(errors)
+            job.error_count += len(errors)
+            room = MAX_RECORDED_ERRORS - len(job.errors)
+            job.errors.extend(
+                {"key": error.get('Key'), "code": error.get('Code'), "message": error.get('Message')}
+                for error in errors[:max(room, 0)]
+            )
+            job.save(update_fields=['deleted_count', 'error_count', 'errors'])
+
+        job.status = StorageDeletionJob.STATUS_DONE
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'finished_at'])
+        logger.info(f"Storage cleanup {job.pk}: deleted {job.deleted_count}/{job.total_keys}, {job.error_count} errors")
+    except Exception as e:
+        logger.error(f"Storage cleanup {job_id} failed: {str(e)}", exc_info=True)
+        StorageDeletionJob.objects.filter(pk=job_id).update(
+            status=StorageDeletionJob.STATUS_FAILED,
+            finished_at=timezone.now(),
+            errors=[{"key": None, "code": type(e).__name__, "message": str(e)}],
+        )
+    finally:
+        close_old_connections()
+
+
+def run_pending_deletion_jobs(older_than=STALE_QUEUED_AFTER, retry_failed=False, running_after=STALE_RUNNING_AFTER):
+    """
+    Run queued jobs created more than `older_than` ago (their background start
+    was lost), after requeueing jobs running for longer than `running_after`,
+    and failed ones first re-queued if `retry_failed`. Returns job ids.
+    """
+    requeue_stale_running(StorageDeletionJob, running_after)
+    if retry_failed:
+        StorageDeletionJob.objects.filter(status=StorageDeletionJob.STATUS_FAILED).update(
+            status=StorageDeletionJob.STATUS_QUEUED, deleted_count=0, error_count=0, errors=[],
+        )
+    job_ids = list(
+        StorageDeletionJob.objects.filter(
+            status=StorageDeletionJob.STATUS_QUEUED, created_at__lte=timezone.now() - older_than,
+        ).order_by('created_at').values_list('pk', flat=True)
+    )
+    for job_id in job_ids:
+        run_deletion_job(job_id)
+    return job_ids
+
+
+def job_progress(job):
+    return {
+        "id": job.pk,
+        "email": job.email,
+        "reason": job.reason,
+        "status": job.status,
+        "total_keys": job.total_keys,
+        "deleted_count": job.deleted_count,
+        "error_count": job.error_count,
+        "errors": job.errors,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
@@ -0,0 +1,222 @@
+"""
+Email outbox.
+
+Request handlers call `enqueue_email`, which only inserts an OutboundEmail
+row; nothing in a request waits on SMTP. One worker thread per process
+(started on the first enqueue, and woken by the scheduler for retries) claims
+due rows in batches and sends each batch over a single SMTP connection.
+Failed sends are retried with exponential backoff until MAX_ATTEMPTS, after
+which the row is left as 'failed' for `manage.py send_email_outbox
+--retry-failed`.
+
+Rows are claimed with SELECT ... FOR UPDATE SKIP LOCKED and leased by moving
+next_attempt_at forward, so several processes can drain the same table and a
+batch abandoned by a crashed worker is picked up again once its lease ends.
+The claim leases a batch for MESSAGE_LEASE_SECONDS per row, and each row's
+lease is renewed just before it is sent, conditional on the row still
+carrying the lease this worker set: a row whose lease ran out and was
+claimed by another worker is skipped instead of sent twice.
+"""
+
+import base64
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = 50
+MAX_ATTEMPTS = 6
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 60 * 60
+# A claimed batch stays reserved this long per row; a renewed row this long
+MESSAGE_LEASE_SECONDS = 3 * 60
+# Idle worker re-checks for due retries this often
+POLL_SECONDS = 30
+
+
+def enqueue_email(subject, body, to, html_body=None, from_email=None, attachments=()):
+    """
+    Queue an email. `to` is an address or a list of addresses; `attachments`
+    are (filename, content bytes, mimetype) tuples, as for EmailMessage.attach.
+    """
+    if isinstance(to, str):
+        to = [to]
+    row = OutboundEmail.objects.create(
+        subject=subject,
+        body=body,
+        html_body=html_body,
+        from_email=from_email,
+        to=list(to),
+        attachments=[
+            {
+                "filename": filename,
+                "mimetype": mimetype,
+                "content": base64.b64encode(content).decode("ascii"),
+            }
+            for filename, content, mimetype in attachments
+        ],
+    )
+    if getattr(settings, 'EMAIL_OUTBOX_WORKER', True):
+        transaction.on_commit(worker.wake)
+    return row
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS))
+
+
+def claim_batch(batch_size=OUTBOX_BATCH_SIZE):
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(
+                status__in=[OutboundEmail.STATUS_PENDING, OutboundEmail.STATUS_SENDING],
+                next_attempt_at__lte=now,
+            )
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        if rows:
+            lease_until = now + timedelta(seconds=MESSAGE_LEASE_SECONDS * len(rows))
+            OutboundEmail.objects.filter(pk__in=[row.pk for row in rows]).update(
+                status=OutboundEmail.STATUS_SENDING,
+                next_attempt_at=lease_until,
+            )
+            for row in rows:
+                row.next_attempt_at = lease_until
+    return rows
+
+
+def renew_lease(row):
+    """
+    Extend `row`'s lease for one send. False when the lease this worker set
+    has been replaced, i.e. it ran out and another worker claimed the row.
+    """
+    lease_until = timezone.now() + timedelta(seconds=MESSAGE_LEASE_SECONDS)
+    renewed = OutboundEmail.objects.filter(
+        pk=row.pk, status=OutboundEmail.STATUS_SENDING, next_attempt_at=row.next_attempt_at,
+    ).update(next_attempt_at=lease_until)
+    if renewed:
+        row.next_attempt_at = lease_until
+    return bool(renewed)
+
+
+def build_message(row, connection=None):
+    message = EmailMultiAlternatives(
+        subject=row.subject,
+        body=row.body,
+        from_email=row.from_email or None,
+        to=row.to,
+        connection=connection,
+    )
+    if row.html_body:
+        message.attach_alternative(row.html_body, 'text/html')
+    for attachment in row.attachments:
+        message.attach(attachment["filename"], base64.b64decode(attachment["content"]), attachment["mimetype"])
+    return message
+
+
+def _mark_sent(row):
+    OutboundEmail.objects.filter(pk=row.pk).update(
+        status=OutboundEmail.STATUS_SENT,
+        attempts=F('attempts') + 1,
+        sent_at=timezone.now(),
+        last_error=None,
+    )
+
+
+def _mark_failed(row, error):
+    attempts = row.attempts + 1
+    if attempts >= MAX_ATTEMPTS:
+        status, next_attempt_at = OutboundEmail.STATUS_FAILED, timezone.now()
+        logger.error(f"Giving up on email {row.pk} to {row.to} after {attempts} attempts: {error}")
+    else:
+        status, next_attempt_at = OutboundEmail.STATUS_PENDING, timezone.now() + retry_delay(attempts)
+        logger.warning(f"Email {row.pk} to {row.to} failed (attempt {attempts}), retrying at {next_attempt_at}: {error}")
+    OutboundEmail.objects.filter(pk=row.pk).update(
+        status=status,
+        attempts=attempts,
+        next_attempt_at=next_attempt_at,
+        last_error=str(error),
+    )
+
+
+def drain_outbox(batch_size=OUTBOX_BATCH_SIZE):
+    """Claim and send one batch over one SMTP connection. Returns (sent, failed)."""
+    rows = claim_batch(batch_size)
+    if not rows:
+        return 0, 0
+
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        for row in rows:
+            _mark_failed(row, e)
+        return 0, len(rows)
+
+    sent = failed = 0
+    try:
+        for row in rows:
+            if not renew_lease(row):
+                logger.warning(f"Lease on email {row.pk} was lost to another worker; not sending it")
+                continue
+            try:
+                if not connection.send_messages([build_message(row, connection)]):
+                    raise ValueError("Message has no recipients")
+            except Exception as e:
+                _mark_failed(row, e)
+                failed += 1
+                # The server may have dropped us; carry on with a fresh connection
+                connection.close()
+                try:
+                    connection.open()
+                except Exception:
+                    pass
+            else:
+                _mark_sent(row)
+                sent += 1
+    finally:
+        connection.close()
+
+    return sent, failed
+
+
+class OutboxWorker:
+    """At most one sending thread per process, woken whenever mail is queued."""
+
+    def __init__(self):
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def wake(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='email-outbox', daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.clear()
+            try:
+                while any(drain_outbox()):
+                    pass
+            except Exception as e:
+                logger.error(f"Email outbox worker error: {str(e)}", exc_info=True)
+            finally:
+                close_old_connections()
+            self._wake.wait(POLL_SECONDS)
+
+
+worker = OutboxWorker()
@@ -0,0 +1,239 @@
+"""
+Optional PostgreSQL monthly range partitioning for Attendance and
+AbsentEmployeeDetails.
+
+Nothing here runs unless asked: `manage.py manage_attendance_partitions
+--convert` turns an existing table into a table partitioned by month on
+`date`, and later runs of the command keep partitions created ahead of time
+and detach (or drop) months past the retention window. On other databases,
+or on tables that were never converted, every helper is a no-op.
+
+PostgreSQL requires every unique constraint on a partitioned table to
+include the partition key, so the converted primary key is (id, date).
+`id` stays unique in practice because it keeps drawing from one sequence,
+and Django keeps using it as the model's primary key.
+"""
+
+import logging
+from datetime import date
+
+from django.db import connection, transaction
+
+from .models import Attendance, AbsentEmployeeDetails
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_MODELS = {
+    'attendance': Attendance,
+    'absent': AbsentEmployeeDetails,
+}
+
+PARTITION_KEY = 'date'
+
+
+def is_postgresql():
+    return connection.vendor == 'postgresql'
+
+
+def add_months(day, months):
+    index = day.year * 12 + (day.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table, month_start):
+    return f"{table}_p{month_start.year}_{month_start.month:02d}"
+
+
+def _quote(name):
+    return connection.ops.quote_name(name)
+
+
+def is_partitioned(table):
+    if not is_postgresql():
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [table])
+        row = cursor.fetchone()
+    return bool(row) and row[0] == 'p'
+
+
+def list_partitions(table):
+    """[(partition_name, month_start or None for the default partition)] for a partitioned table."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+            FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = to_regclass(%s)
+            ORDER BY c.relname
+            """,
+            [table],
+        )
+        rows = cursor.fetchall()
+
+    partitions = []
+    for name, bound in rows:
+        if bound == 'DEFAULT':
+            partitions.append((name, None))
+        else:
+            # FOR VALUES FROM ('2026-01-01') TO ('2026-02-01')
+            partitions.append((name, date.fromisoformat(bound.split("'")[1])))
+    return partitions
+
+
+def _default_partition(table):
+    for name, month in list_partitions(table):
+        if month is None:
+            return name
+    return None
+
+
+def create_partition(table, month_start):
+    """
+    Create the partition for the month starting at `month_start`, if missing.
+
+    PostgreSQL refuses to create a partition whose range already has rows in
+    the DEFAULT partition (they land there when maintenance lapses), so those
+    rows are moved in the same transaction: the default partition is
+    detached, the month created, its rows re-inserted through the parent and
+    removed from the default, and the default attached again.
+    """
+    name = partition_name(table, month_start)
+    bounds = [month_start, add_months(month_start, 1)]
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [name])
+        if cursor.fetchone()[0]:
+            return name
+
+        default = _default_partition(table)
+        moved = 0
+        if default:
+            cursor.execute(
+                f"SELECT COUNT(*) FROM {_quote(default)} "
+                f"WHERE {_quote(PARTITION_KEY)} >= %s AND {_quote(PARTITION_KEY)} < %s",
+                bounds,
+            )
+            moved = cursor.fetchone()[0]
+
+        if moved:
+            cursor.execute(f"ALTER TABLE {_quote(table)} DETACH PARTITION {_quote(default)}")
+        cursor.execute(
+            f"CREATE TABLE {_quote(name)} PARTITION OF {_quote(table)} FOR VALUES FROM (%s) TO (%s)",
+            bounds,
+        )
+        if moved:
+            month_rows = f"WHERE {_quote(PARTITION_KEY)} >= %s AND {_quote(PARTITION_KEY)} < %s"
+            cursor.execute(f"INSERT INTO {_quote(table)} SELECT * FROM {_quote(default)} {month_rows}", bounds)
+            cursor.execute(f"DELETE FROM {_quote(default)} {month_rows}", bounds)
+            cursor.execute(f"ALTER TABLE {_quote(table)} ATTACH PARTITION {_quote(default)} DEFAULT")
+            logger.warning(f"Moved {moved} rows for {month_start:%Y-%m} out of {default} into {name}")
+    return name
+
+
+def convert_to_partitioned(model, months_ahead=3):
+    """
+    Rebuild `model`'s table as a monthly range-partitioned table, copying all
+    rows, in one transaction. The original table is renamed to
+    <table>_legacy during the copy and dropped at the end.
+    """
+    table = model._meta.db_table
+    legacy = f"{table}_legacy"
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = to_regclass(%s)",
+            [table],
+        )
+        constraints = cursor.fetchall()
+        cursor.execute(
+            """
+            SELECT i.relname, pg_get_indexdef(i.oid)
+            FROM pg_index x JOIN pg_class i ON i.oid = x.indexrelid
+            WHERE x.indrelid = to_regclass(%s)
+              AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.oid)
+            """,
+            [table],
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(f"SELECT MIN({_quote(PARTITION_KEY)}), MAX({_quote(PARTITION_KEY)}) FROM {_quote(table)}")
+        first_day, last_day = cursor.fetchone()
+        pk_column = model._meta.pk.column
+        cursor.execute("SELECT pg_get_serial_sequence(%s, %s)", [table, pk_column])
+        legacy_sequence = cursor.fetchone()[0]
+
+        # Free the original names (index names are schema-wide) for the new table
+        cursor.execute(f"ALTER TABLE {_quote(table)} RENAME TO {_quote(legacy)}")
+        for name, kind, _ in constraints:
+            if kind in ('p', 'u'):
+                cursor.execute(f"ALTER TABLE {_quote(legacy)} RENAME CONSTRAINT {_quote(name)} TO {_quote(name[:56] + '_legacy')}")
+        for name, _ in indexes:
+            cursor.execute(f"ALTER INDEX {_quote(name)} RENAME TO {_quote(name[:56] + '_legacy')}")
+
+        cursor.execute(
+            f"CREATE TABLE {_quote(table)} (LIKE {_quote(legacy)} INCLUDING DEFAULTS INCLUDING IDENTITY) "
+            f"PARTITION BY RANGE ({_quote(PARTITION_KEY)})"
+        )
+        cursor.execute("SELECT pg_get_serial_sequence(%s, %s)", [table, pk_column])
+        if cursor.fetchone()[0] is None and legacy_sequence:
+            # serial (not identity) column: the copied default still uses the
+            # old sequence, which must not be dropped with the legacy table
+            cursor.execute(f"ALTER SEQUENCE {legacy_sequence} OWNED BY {_quote(table)}.{_quote(pk_column)}")
+        for name, kind, definition in constraints:
+            if kind == 'p':
+                definition = f"PRIMARY KEY ({_quote(pk_column)}, {_quote(PARTITION_KEY)})"
+            cursor.execute(f"ALTER TABLE {_quote(table)} ADD CONSTRAINT {_quote(name)} {definition}")
+        for _, definition in indexes:
+            cursor.execute(definition)
+
+        today = date.today().replace(day=1)
+        month = (first_day or today).replace(day=1)
+        last_month = max((last_day or today).replace(day=1), add_months(today, months_ahead))
+        while month <= last_month:
+            create_partition(table, month)
+            month = add_months(month, 1)
+        cursor.execute(f"CREATE TABLE {_quote(table + '_default')} PARTITION OF {_quote(table)} DEFAULT")
+
+        cursor.execute(f"INSERT INTO {_quote(table)} SELECT * FROM {_quote(legacy)}")
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence(%s, %s), COALESCE(MAX({_quote(pk_column)}), 0) + 1, false) "
+            f"FROM {_quote(table)}",
+            [table, pk_column],
+        )
+        cursor.execute(f"DROP TABLE {_quote(legacy)}")
+
+    logger.info(f"Converted {table} to monthly partitions")
+
+
+def maintain_partitions(model, months_ahead=3, retain_months=None, drop=False):
+    """
+    Make sure partitions exist from the current month to `months_ahead` months
+    out, and detach (or drop, with `drop=True`) partitions older than
+    `retain_months` months. Detached partitions stay as ordinary tables that
+    can be archived or queried directly. Returns (created, retired) names.
+    """
+    table = model._meta.db_table
+    if not is_partitioned(table):
+        return [], []
+
+    existing = {month for _, month in list_partitions(table) if month}
+    current = date.today().replace(day=1)
+
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        if month not in existing:
+            created.append(create_partition(table, month))
+
+    retired = []
+    if retain_months is not None:
+        cutoff = add_months(current, -retain_months)
+        with connection.cursor() as cursor:
+            for name, month in list_partitions(table):
+                if month is None or month >= cutoff:
+                    continue
+                cursor.execute(f"ALTER TABLE {_quote(table)} DETACH PARTITION {_quote(name)}")
+                if drop:
+                    cursor.execute(f"DROP TABLE {_quote(name)}")
+                retired.append(name)
+
+    return created, retired
@@ -0,0 +1,199 @@
+"""
+Month-end payroll run.
+
+`run_payroll(year, month)` creates the month's Payroll row for everyone on
+the payroll in a fixed number of queries, however many people there are.
+Everyone on the payroll means every approved user with an Employee, HR or
+Manager profile (PAYABLE_ROLES); CEO and Admin accounts are left out and are
+paid through create_payroll if at all:
+
+- LOP for everyone comes from one range-filtered query over Leave (approved
+  unpaid leaves overlapping the month); the working days of every leave
+  inside the month are counted in one vectorized call and summed per
+  employee (`lop_days_by_email`).
+- STD is the month's working days (Monday-Saturday minus holidays) unless
+  given explicitly; see working_days.py.
+- basic_salary is carried forward from each person's latest payroll.
+- New rows go in with one bulk_create.
+
+Users who already have a row for the month are reported as "exists" and
+left alone, so running the month again only fills in the missing rows;
+`update_pending` re-applies the computed LOP to rows still 'Pending'.
+
+Payroll.month is a string: new rows store it unpadded ("1"), and lookups also
+match the zero-padded spelling ("01") older rows may carry, so a month is
+never created twice under two spellings (`month_key`, `month_keys`).
+"""
+
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.db.models import OuterRef, Q, Subquery
+
+from .models import User, Leave, Payroll
+from .caching import bump_version_on_commit, model_resource
+from .summaries import month_bounds
+from .working_days import working_calendar
+
+# Roles whose users get a row in the month-end run; each has its own profile
+# table, created once the user is approved and removed on offboarding
+PAYABLE_ROLES = ("employee", "hr", "manager")
+
+
+def month_key(month):
+    """Stored form of a payroll month: "1".."12". Raises ValueError for anything else."""
+    value = int(month)
+    if not 1 <= value <= 12:
+        raise ValueError("month must be 1-12")
+    return str(value)
+
+
+def month_keys(month):
+    """Every spelling a stored payroll month may have ("1" and "01")."""
+    value = int(month_key(month))
+    return [str(value), f"{value:02d}"]
+
+
+def lop_days_by_email(year, month, emails=None, calendar=None):
+    """
+    {email: LOP days} from approved unpaid leaves overlapping the month (one
+    query). Only working days count: Sundays and holidays inside a leave are
+    not loss of pay.
+    """
+    first_day, last_day = month_bounds(year, month)
+    leaves = Leave.objects.filter(
+        status="Approved", paid_status="Unpaid", start_date__lte=last_day, end_date__gte=first_day,
+    )
+    if emails is not None:
+        leaves = leaves.filter(email_id__in=emails)
+    rows = list(leaves.values_list("email_id", "start_date", "end_date"))
+    if not rows:
+        return {}
+
+    calendar = calendar or working_calendar()
+    leave_emails, starts, ends = zip(*rows)
+    days = calendar.overlap_many(starts, ends, first_day, last_day)
+    index = {email: i for i, email in enumerate(dict.fromkeys(leave_emails))}
+    totals = np.bincount([index[email] for email in leave_emails], weights=days, minlength=len(index))
+    return {email: int(totals[i]) for email, i in index.items() if totals[i]}
+
+
+def payable_users():
+    """Users with an Employee, HR or Manager profile (one query)."""
+    has_profile = Q()
+    for role in PAYABLE_ROLES:
+        has_profile |= Q(**{f"{role}__isnull": False})
+    return User.objects.filter(has_profile)
+
+
+def _latest_salaries(emails):
+    latest = Payroll.objects.filter(email_id=OuterRef("email")).order_by("-year", "-pay_date", "-id")
+    return dict(
+        User.objects.filter(email__in=emails)
+        .annotate(salary=Subquery(latest.values("basic_salary")[:1]))
+        .values_list("email", "salary")
+    )
+
+
+def run_payroll(year, month, emails=None, std=None, update_pending=False, dry_run=False):
+    """
+    Create missing Payroll rows for (year, month); `std` defaults to the
+    month's working days. Returns
+    {"created", "existing", "updated", "results": [{email, status, LOP, ...}]}
+    where status is "created", "exists" or "updated".
+    """
+    key = month_key(month)
+    users = payable_users()
+    if emails is not None:
+        users = users.filter(email__in=emails)
+    employee_emails = list(users.order_by("email").values_list("email", flat=True))
+
+    calendar = working_calendar()
+    if std is None:
+        std = calendar.month_std(year, month)
+    lop = lop_days_by_email(year, month, employee_emails, calendar=calendar)
+    salaries = _latest_salaries(employee_emails)
+    existing = {
+        payroll.email_id: payroll
+        for payroll in Payroll.objects.filter(email_id__in=employee_emails, month__in=month_keys(month), year=year)
+    }
+
+    results, new_rows, changed = [], [], []
+    for email in employee_emails:
+        lop_days = lop.get(email, 0)
+        payroll = existing.get(email)
+        if payroll is None:
+            salary = salaries.get(email) or Decimal("0.00")
+            new_rows.append(Payroll(
+                email_id=email, month=key, year=year, STD=std, LOP=lop_days, basic_salary=salary,
+            ))
+            results.append({"email": email, "status": "created", "LOP": lop_days, "STD": std,
+                            "basic_salary": str(salary)})
+        elif update_pending and payroll.status == "Pending" and payroll.LOP != lop_days:
+            payroll.LOP = lop_days
+            changed.append(payroll)
+            results.append({"email": email, "status": "updated", "LOP": lop_days, "STD": payroll.STD,
+                            "basic_salary": str(payroll.basic_salary), "id": payroll.id})
+        else:
+            results.append({"email": email, "status": "exists", "LOP": payroll.LOP, "STD": payroll.STD,
+                            "basic_salary": str(payroll.basic_salary), "id": payroll.id,
+                            "payroll_status": payroll.status})
+
+    created = len(new_rows)
+    if not dry_run and (new_rows or changed):
+        created = _write(new_rows, changed, month, year, results)
+        # bulk writes send no signals; drop cached payroll payloads
+        bump_version_on_commit(model_resource(Payroll))
+
+    return {
+        "month": key,
+        "year": year,
+        "created": created,
+        "updated": len(changed),
+        "existing": len(results) - created - len(changed),
+        "dry_run": dry_run,
+        "results": results,
+    }
+
+
+def _write(new_rows, changed, month, year, results):
+    """
+    Insert `new_rows` and save `changed`; returns how many rows were really
+    created. Rows a concurrent run (or create_payroll) inserted first are
+    re-read and reported in `results` as "exists".
+    """
+    new_emails = [payroll.email_id for payroll in new_rows]
+    with transaction.atomic():
+        # Lock the users being created: a concurrent run waits here and
+        # then finds these rows in the re-check below
+        list(User.objects.select_for_update().filter(email__in=new_emails).values_list("pk", flat=True))
+        taken = set(
+            Payroll.objects.filter(email_id__in=new_emails, month__in=month_keys(month), year=year)
+            .values_list("email_id", flat=True)
+        )
+        # ignore_conflicts: a single create_payroll does not take the lock
+        Payroll.objects.bulk_create(
+            [payroll for payroll in new_rows if payroll.email_id not in taken], batch_size=500, ignore_conflicts=True,
+        )
+        Payroll.objects.bulk_update(changed, ["LOP"], batch_size=500)
+        stored = {
+            payroll.email_id: payroll
+            for payroll in Payroll.objects.filter(email_id__in=new_emails, month__in=month_keys(month), year=year)
+        }
+
+    created = 0
+    for result in results:
+        if result["status"] != "created":
+            continue
+        payroll = stored.get(result["email"])
+        if result["email"] in taken or payroll is None or payroll.LOP != result["LOP"] or payroll.STD != result["STD"]:
+            result["status"] = "exists"
+            if payroll is not None:
+                result.update({"LOP": payroll.LOP, "STD": payroll.STD, "basic_salary": str(payroll.basic_salary),
+                               "payroll_status": payroll.status})
+        else:
+            created += 1
+        if payroll is not None:
+            result["id"] = payroll.id
+    return created
@@ -0,0 +1,94 @@
+"""
+HTML -> PDF rendering with interchangeable backends.
+
+`render_pdf(html, backend)` renders with the named backend ("xhtml2pdf" or
+"weasyprint"); settings.PDF_BACKEND picks the one letters use. Backends import
+their engine lazily, so a missing engine (WeasyPrint needs Pango at the OS
+level) only fails when that backend is actually used.
+
+Deliberately free of Django imports, so worker processes started with the
+"spawn" method (batch letter generation) can import it without setting up
+Django.
+"""
+
+import hashlib
+from abc import ABC, abstractmethod
+from io import BytesIO
+
+DEFAULT_BACKEND = 'xhtml2pdf'
+
+
+class PdfRenderError(Exception):
+    pass
+
+
+class PdfBackend(ABC):
+    name = None
+
+    def available(self):
+        """(True, None) or (False, reason) depending on whether the engine can be loaded."""
+        try:
+            self._engine()
+        except Exception as e:
+            return False, str(e)
+        return True, None
+
+    @abstractmethod
+    def _engine(self):
+        """Import and return the rendering library."""
+
+    @abstractmethod
+    def render(self, html):
+        """PDF bytes for `html`; raises PdfRenderError."""
+
+
+class XHTML2PDFBackend(PdfBackend):
+    name = 'xhtml2pdf'
+
+    def _engine(self):
+        from xhtml2pdf import pisa
+        return pisa
+
+    def render(self, html):
+        buffer = BytesIO()
+        result = self._engine().CreatePDF(html, dest=buffer, encoding='UTF-8')
+        if getattr(result, 'err', None):
+            raise PdfRenderError("PDF generation failed")
+        return buffer.getvalue()
+
+
+class WeasyPrintBackend(PdfBackend):
+    name = 'weasyprint'
+
+    def _engine(self):
+        import weasyprint
+        return weasyprint
+
+    def render(self, html):
+        try:
+            return self._engine().HTML(string=html).write_pdf()
+        except Exception as e:
+            raise PdfRenderError(f"PDF generation failed: {e}")
+
+
+BACKENDS = {backend.name: backend for backend in (XHTML2PDFBackend(), WeasyPrintBackend())}
+
+
+def get_backend(name=None):
+    backend = BACKENDS.get(name or DEFAULT_BACKEND)
+    if backend is None:
+        raise PdfRenderError(f"Unknown PDF backend {name!r}; choose one of: {', '.join(BACKENDS)}")
+    return backend
+
+
+def render_pdf(html, backend=None):
+    """PDF bytes for `html`. Raises PdfRenderError on failure."""
+    return get_backend(backend).render(html)
+
+
+def content_hash(html, backend=None):
+    """
+    Cache key part for a rendered letter. The HTML is the template rendered
+    with its context, so it changes whenever either does.
+    """
+    return hashlib.sha256(f"{get_backend(backend).name}\0{html}".encode('utf-8')).hexdigest()
@@ -0,0 +1,220 @@
+"""
+Attendance photo retention.
+
+Check-in / check-out selfies are stored full size under
+attendance/<date>/<email>/ by `upload_attendance_photo`. Once a day
+(`run_photo_retention`, scheduler / `manage.py prune_attendance_photos`):
+
+1. Days older than RECOMPRESS_AFTER_DAYS: every original that is not WebP
+   yet is re-encoded as a small low-quality WebP next to it, the rows'
+   check_in_photo / check_out_photo are rewritten with bulk_update, and only
+   then are the originals deleted - just those whose URL was actually
+   rewritten. An original no row was found for (another base URL, another
+   date) is kept, and not re-encoded again, until its day expires.
+2. Days older than DELETE_AFTER_DAYS: the rows' photo URLs are cleared and
+   everything under the day's prefix (derivatives included) is deleted.
+
+Work is found by listing S3 one day prefix at a time, so a run only touches
+what is still left to do and can be interrupted and re-run. Transcodes and
+DeleteObjects batches run on a pool of CONCURRENCY threads.
+"""
+
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from PIL import Image
+
+from .models import Attendance
+from .caching import bump_version_on_commit, model_resource
+from .image_derivatives import derivative_key, is_derivative, open_image
+from .object_cleanup import DELETE_BATCH_SIZE, delete_batch, list_prefix
+from .storage import get_s3_client
+
+logger = logging.getLogger(__name__)
+
+PHOTO_PREFIX = "attendance/"
+PHOTO_FIELDS = ("check_in_photo", "check_out_photo")
+
+
+def retention_settings(**overrides):
+    options = dict(settings.ATTENDANCE_PHOTO_RETENTION)
+    options.update({name: value for name, value in overrides.items() if value is not None})
+    if options["DELETE_AFTER_DAYS"] and options["DELETE_AFTER_DAYS"] <= options["RECOMPRESS_AFTER_DAYS"]:
+        raise ValueError("DELETE_AFTER_DAYS must be greater than RECOMPRESS_AFTER_DAYS (or 0)")
+    if options["RECOMPRESS_AFTER_DAYS"] < 1:
+        raise ValueError("RECOMPRESS_AFTER_DAYS must be at least 1")
+    return options
+
+
+def photo_days(client, bucket_name):
+    """[(date, prefix)] of every attendance/<date>/ prefix in the bucket, oldest first."""
+    days = []
+    paginator = client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=PHOTO_PREFIX, Delimiter="/"):
+        for common in page.get("CommonPrefixes", []):
+            prefix = common["Prefix"]
+            try:
+                days.append((date.fromisoformat(prefix[len(PHOTO_PREFIX):].strip("/")), prefix))
+            except ValueError:
+                continue
+    return sorted(days)
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+# ------------------- RECOMPRESSION -------------------
+def transcode(client, bucket_name, key, quality, max_dimension):
+    """Write a WebP copy of `key` next to it. Returns (new_key, bytes_before, bytes_after)."""
+    original = client.get_object(Bucket=bucket_name, Key=key)["Body"].read()
+    image = open_image(original)
+    image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    image.save(buffer, format="WEBP", quality=quality, method=4)
+    data = buffer.getvalue()
+
+    # <stem>.webp keeps the stem, so the thumbnail / face crop keys stay valid
+    new_key = derivative_key(key, ".webp")
+    client.put_object(Bucket=bucket_name, Key=new_key, Body=data, ContentType="image/webp")
+    return new_key, len(original), len(data)
+
+
+def rewrite_photo_urls(day, replacements):
+    """
+    Point the day's rows at the new URLs ({old_url: new_url}). Returns
+    (rows updated, set of the old URLs that were found and rewritten).
+    """
+    if not replacements:
+        return 0, set()
+    old_urls = list(replacements)
+    rows = list(
+        Attendance.objects.filter(date=day)
+        .filter(Q(check_in_photo__in=old_urls) | Q(check_out_photo__in=old_urls))
+        .only("id", *PHOTO_FIELDS)
+    )
+    rewritten = set()
+    for row in rows:
+        for field in PHOTO_FIELDS:
+            url = getattr(row, field)
+            if url in replacements:
+                setattr(row, field, replacements[url])
+                rewritten.add(url)
+    Attendance.objects.bulk_update(rows, PHOTO_FIELDS, batch_size=500)
+    return len(rows), rewritten
+
+
+def recompress_day(client, bucket_name, executor, day, prefix, options, stats):
+    base_url = settings.BASE_BUCKET_URL
+    listed = list(list_prefix(client, bucket_name, prefix))
+    existing = set(listed)
+    keys = [
+        key for key in listed
+        if not is_derivative(key) and not key.endswith(".webp")
+        # Already re-encoded by an earlier run that found no row to rewrite
+        and derivative_key(key, ".webp") not in existing
+    ]
+
+    for batch in _chunks(keys, DELETE_BATCH_SIZE):
+        def convert(key):
+            try:
+                return key, transcode(client, bucket_name, key, options["WEBP_QUALITY"], options["MAX_DIMENSION"])
+            except Exception as e:
+                logger.warning(f"Could not recompress {key}: {e}")
+                return key, None
+
+        replacements = {}
+        for key, result in executor.map(convert, batch):
+            if result is None:
+                stats["failed"] += 1
+                continue
+            new_key, bytes_before, bytes_after = result
+            replacements[f"{base_url}{key}"] = f"{base_url}{new_key}"
+            stats["recompressed"] += 1
+            stats["bytes_before"] += bytes_before
+            stats["bytes_after"] += bytes_after
+
+        # Rows first: an original is only removed once its row points at the copy
+        rows, rewritten = rewrite_photo_urls(day, replacements)
+        stats["rows_rewritten"] += rows
+        done = [url[len(base_url):] for url in rewritten]
+        stats["kept"] += len(replacements) - len(done)
+        if done:
+            errors = delete_batch(client, bucket_name, done)
+            stats["failed"] += len(errors)
+
+
+# ------------------- EXPIRY -------------------
+def clear_photo_urls(before):
+    """Clear photo URLs of rows dated before `before`. Returns rows updated."""
+    attendance_url = f"{settings.BASE_BUCKET_URL}{PHOTO_PREFIX}"
+    updated = 0
+    for field in PHOTO_FIELDS:
+        updated += Attendance.objects.filter(
+            date__lt=before, **{f"{field}__startswith": attendance_url}
+        ).update(**{field: None})
+    return updated
+
+
+def expire_days(client, bucket_name, executor, prefixes, stats):
+    keys = [key for prefix in prefixes for key in list_prefix(client, bucket_name, prefix)]
+    batches = list(_chunks(keys, DELETE_BATCH_SIZE))
+    for batch, errors in zip(batches, executor.map(lambda batch: delete_batch(client, bucket_name, batch), batches)):
+        stats["deleted"] += len(batch) - len(errors)
+        stats["failed"] += len(errors)
+
+
+def run_photo_retention(recompress_after_days=None, delete_after_days=None, concurrency=None, dry_run=False):
+    """
+    Apply the retention policy to every stored day. Returns counters:
+    recompressed, deleted, failed, kept (originals no row was rewritten for),
+    rows_rewritten, rows_cleared,
+    bytes_before / bytes_after (of recompressed photos) and the days touched.
+    """
+    options = retention_settings(
+        RECOMPRESS_AFTER_DAYS=recompress_after_days,
+        DELETE_AFTER_DAYS=delete_after_days,
+        CONCURRENCY=concurrency,
+    )
+    today = timezone.localdate()
+    recompress_before = today - timedelta(days=options["RECOMPRESS_AFTER_DAYS"])
+    delete_before = today - timedelta(days=options["DELETE_AFTER_DAYS"]) if options["DELETE_AFTER_DAYS"] else None
+
+    client = get_s3_client()
+    bucket_name = settings.MINIO_STORAGE["BUCKET_NAME"]
+    days = photo_days(client, bucket_name)
+    expired = [(day, prefix) for day, prefix in days if delete_before and day < delete_before]
+    to_recompress = [(day, prefix) for day, prefix in days if day < recompress_before and (day, prefix) not in expired]
+
+    stats = {
+        "recompressed": 0, "deleted": 0, "failed": 0, "kept": 0, "rows_rewritten": 0, "rows_cleared": 0,
+        "bytes_before": 0, "bytes_after": 0,
+        "expired_days": [day.isoformat() for day, _ in expired],
+        "recompressed_days": [day.isoformat() for day, _ in to_recompress],
+    }
+    if dry_run:
+        return stats
+
+    with ThreadPoolExecutor(max_workers=max(1, options["CONCURRENCY"]), thread_name_prefix="photo-retention") as executor:
+        if delete_before:
+            stats["rows_cleared"] = clear_photo_urls(delete_before)
+            expire_days(client, bucket_name, executor, [prefix for _, prefix in expired], stats)
+        for day, prefix in to_recompress:
+            recompress_day(client, bucket_name, executor, day, prefix, options, stats)
+
+    if stats["rows_rewritten"] or stats["rows_cleared"]:
+        # bulk_update / update() send no signals; drop cached attendance payloads
+        bump_version_on_commit(model_resource(Attendance))
+
+    logger.info(
+        f"Attendance photo retention: {stats['recompressed']} recompressed "
+        f"({stats['bytes_before']} -> {stats['bytes_after']} bytes), {stats['deleted']} deleted, "
+        f"{stats['failed']} failed"
+    )
+    return stats
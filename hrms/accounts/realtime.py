@@ -0,0 +1,64 @@
+"""
+Push attendance events to the WebSocket attendance board (see consumers.py).
+
+Events are sent to a channel-layer group once the write commits. A failure
+to publish is logged and never breaks the attendance write itself.
+"""
+
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.utils import timezone
+
+from .constants import IST
+
+logger = logging.getLogger(__name__)
+
+ATTENDANCE_BOARD_GROUP = "attendance_board"
+
+
+def board_date():
+    """The business day the board shows: today in IST."""
+    return timezone.localtime(timezone.now(), IST).date()
+
+
+def attendance_event_row(attendance):
+    return {
+        "email": attendance.email_id,
+        "role": attendance.email.role,
+        "fullname": attendance.fullname,
+        "department": attendance.department,
+        "date": str(attendance.date),
+        "check_in": str(attendance.check_in) if attendance.check_in else "",
+        "check_out": str(attendance.check_out) if attendance.check_out else "",
+        "location_type": attendance.location_type,
+    }
+
+
+def absence_event_row(absence):
+    return {
+        "email": absence.email_id,
+        "fullname": absence.fullname,
+        "department": absence.department,
+        "date": str(absence.date),
+    }
+
+
+def _send(event, payload):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    try:
+        async_to_sync(channel_layer.group_send)(
+            ATTENDANCE_BOARD_GROUP,
+            {"type": "attendance.event", "event": event, "data": payload},
+        )
+    except Exception as e:
+        logger.warning(f"Could not publish attendance board event '{event}': {e}")
+
+
+def publish_attendance_event(event, payload):
+    """Queue `event` for the board; sent after the current transaction commits."""
+    transaction.on_commit(lambda: _send(event, payload))
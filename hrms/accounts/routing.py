@@ -0,0 +1,6 @@
+from django.urls import path
+from .consumers import AttendanceBoardConsumer
+
+websocket_urlpatterns = [
+    path('ws/attendance/today/', AttendanceBoardConsumer.as_asgi()),
+]
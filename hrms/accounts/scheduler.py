@@ -5,6 +5,7 @@ Runs daily at 10:45 AM IST to mark employees as absent
 
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from django.conf import settings
 from django.utils import timezone
 from datetime import time
@@ -107,10 +108,95 @@ def mark_absent_employees():
         logger.error("="*60)
 
 
+def reset_today_board():
+    """
+    Build the new IST day's attendance board (on-leave set filled in, nobody
+    present yet) right after midnight, so the first viewer does not pay for it.
+    """
+    from .today_board import rebuild_board
+
+    try:
+        board = rebuild_board()
+        logger.info(f"Today board reset for {board['date']} ({len(board['on_leave'])} on leave)")
+    except Exception as e:
+        logger.error(f"Error resetting today board: {str(e)}", exc_info=True)
+
+
+def maintain_attendance_partitions():
+    """
+    Create the coming months' partitions for tables converted with
+    `manage_attendance_partitions --convert`. No-op everywhere else.
+    """
+    from .partitioning import PARTITIONED_MODELS, maintain_partitions
+
+    try:
+        for model in PARTITIONED_MODELS.values():
+            created, _ = maintain_partitions(model)
+            if created:
+                logger.info(f"Created partitions: {', '.join(created)}")
+    except Exception as e:
+        logger.error(f"Error maintaining attendance partitions: {str(e)}", exc_info=True)
+
+
+def wake_email_outbox():
+    """Make sure queued and retry-due emails get sent even if nothing new is queued."""
+    if not getattr(settings, 'EMAIL_OUTBOX_WORKER', True):
+        return
+    from .outbox import worker
+
+    worker.wake()
+
+
+def run_pending_storage_deletions():
+    """Finish MinIO deletion jobs whose background run never started (e.g. after a restart)."""
+    from .object_cleanup import run_pending_deletion_jobs
+
+    try:
+        job_ids = run_pending_deletion_jobs()
+        if job_ids:
+            logger.info(f"Ran pending storage deletion jobs: {job_ids}")
+    except Exception as e:
+        logger.error(f"Error running storage deletion jobs: {str(e)}", exc_info=True)
+
+
+def run_pending_letters():
+    """Finish letter jobs whose background run never started (e.g. after a restart)."""
+    from .letters import run_pending_letter_jobs
+
+    try:
+        job_ids = run_pending_letter_jobs()
+        if job_ids:
+            logger.info(f"Ran pending letter jobs: {job_ids}")
+    except Exception as e:
+        logger.error(f"Error running letter jobs: {str(e)}", exc_info=True)
+
+
+def run_letter_batches():
+    """Run queued letter batches here, so their PDF worker processes never start in a web worker."""
+    from .letters import run_pending_letter_batches
+
+    try:
+        batch_ids = run_pending_letter_batches()
+        if batch_ids:
+            logger.info(f"Ran letter batches: {batch_ids}")
+    except Exception as e:
+        logger.error(f"Error running letter batches: {str(e)}", exc_info=True)
+
+
+def apply_photo_retention():
+    """Recompress and expire old attendance photos (settings.ATTENDANCE_PHOTO_RETENTION)."""
+    from .photo_retention import run_photo_retention
+
+    try:
+        run_photo_retention()
+    except Exception as e:
+        logger.error(f"Error applying attendance photo retention: {str(e)}", exc_info=True)
+
+
 def start_scheduler():
     """
     Start the APScheduler background scheduler.
-    This is called when Django starts.
+    Called by `manage.py run_scheduler` (the scheduler process) and by the dev server.
     """
     scheduler = BackgroundScheduler(timezone=IST)
     
@@ -126,6 +212,83 @@ def start_scheduler():
         misfire_grace_time=60  # Allow up to 60 seconds delay
     )
     
+    scheduler.add_job(
+        reset_today_board,
+        trigger=CronTrigger(hour=0, minute=0, timezone=IST),  # IST midnight
+        id='reset_today_board',
+        name='Reset Today Attendance Board',
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+        misfire_grace_time=300
+    )
+
+    scheduler.add_job(
+        maintain_attendance_partitions,
+        trigger=CronTrigger(day=25, hour=1, minute=0, timezone=IST),  # monthly, well before the 1st
+        id='maintain_attendance_partitions',
+        name='Create Upcoming Attendance Partitions',
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+        misfire_grace_time=3600
+    )
+
+    scheduler.add_job(
+        wake_email_outbox,
+        trigger=IntervalTrigger(minutes=1),
+        id='wake_email_outbox',
+        name='Send Queued Emails',
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+        misfire_grace_time=60
+    )
+
+    scheduler.add_job(
+        run_pending_storage_deletions,
+        trigger=IntervalTrigger(minutes=10),
+        id='run_pending_storage_deletions',
+        name='Run Pending Storage Deletions',
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+        misfire_grace_time=300
+    )
+
+    scheduler.add_job(
+        run_pending_letters,
+        trigger=IntervalTrigger(minutes=10),
+        id='run_pending_letters',
+        name='Run Pending Letter Jobs',
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+        misfire_grace_time=300
+    )
+
+    scheduler.add_job(
+        run_letter_batches,
+        trigger=IntervalTrigger(minutes=1),
+        id='run_letter_batches',
+        name='Run Letter Batches',
+        replace_existing=True,
+        max_instances=1,  # one batch pool at a time
+        coalesce=True,
+        misfire_grace_time=60
+    )
+
+    scheduler.add_job(
+        apply_photo_retention,
+        trigger=CronTrigger(hour=2, minute=30, timezone=IST),  # nightly, off-hours
+        id='apply_photo_retention',
+        name='Attendance Photo Retention',
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+        misfire_grace_time=3600
+    )
+
     logger.info("Scheduler started! Absent marking will run daily at 10:45 AM IST")
     logger.info("   Configuration: max_instances=1, coalesce=True (prevents duplicates)")
     scheduler.start()
@@ -3,7 +3,8 @@ from collections import Counter
 import textstat
 
 from rest_framework import serializers
-from .models import User, CEO, HR, Manager, Employee, Admin, Leave, Attendance, Report, Project, Notice, Document, Award, Department, Ticket, EmployeeDetails, Holiday, AbsentEmployeeDetails, AppliedJobs, JobPosting, ReleavedEmployee, PettyCash, Shift
+from .models import User, CEO, HR, Manager, Employee, Admin, Leave, Attendance, Report, Project, Notice, Document, Award, Department, Ticket, EmployeeDetails, Holiday, AbsentEmployeeDetails, AppliedJobs, JobPosting, ReleavedEmployee, PettyCash, Shift, AttendanceMonthlySummary, ReleavedAttendance
+from .image_derivatives import thumbnail_url
 from typing import Any, Dict, Optional, TYPE_CHECKING
 
 if TYPE_CHECKING:
@@ -45,25 +46,32 @@ class DepartmentSerializer(serializers.ModelSerializer):
         fields = ['id', 'department_name', 'description', 'created_at', 'updated_at']
 
 
-class CEOSerializer(serializers.ModelSerializer):
+class ProfilePictureThumbnailMixin(serializers.Serializer):
+    profile_picture_thumbnail = serializers.SerializerMethodField()
+
+    def get_profile_picture_thumbnail(self, obj):
+        return thumbnail_url(obj.profile_picture)
+
+
+class CEOSerializer(ProfilePictureThumbnailMixin, serializers.ModelSerializer):
     class Meta:  # type: ignore
         model = CEO
         fields = '__all__'
 
 
-class HRSerializer(serializers.ModelSerializer):
+class HRSerializer(ProfilePictureThumbnailMixin, serializers.ModelSerializer):
     class Meta:  # type: ignore
         model = HR
         fields = '__all__'
 
 
-class ManagerSerializer(serializers.ModelSerializer):
+class ManagerSerializer(ProfilePictureThumbnailMixin, serializers.ModelSerializer):
     class Meta:  # type: ignore
         model = Manager
         fields = '__all__'
 
 
-class EmployeeSerializer(serializers.ModelSerializer):
+class EmployeeSerializer(ProfilePictureThumbnailMixin, serializers.ModelSerializer):
     class Meta:  # type: ignore
         model = Employee
         fields = '__all__'
@@ -75,7 +83,7 @@ class EmployeeDetailsSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class AdminSerializer(serializers.ModelSerializer):
+class AdminSerializer(ProfilePictureThumbnailMixin, serializers.ModelSerializer):
     class Meta:  # type: ignore
         model = Admin
         fields = '__all__'
@@ -259,10 +267,15 @@ class DocumentSerializer(serializers.ModelSerializer):
 
 
 class AwardSerializer(serializers.ModelSerializer):
+    photo_thumbnail = serializers.SerializerMethodField()
+
     class Meta:  # type: ignore
         model = Award
         fields = '__all__'
 
+    def get_photo_thumbnail(self, obj):
+        return thumbnail_url(obj.photo)
+
 
 class TicketSerializer(serializers.ModelSerializer):
     assigned_by = serializers.SlugRelatedField(
@@ -311,6 +324,16 @@ class AbsentEmployeeDetailsSerializer(serializers.ModelSerializer):
         fields = ['email', 'fullname', 'department', 'date']
 
 
+class AttendanceMonthlySummarySerializer(serializers.ModelSerializer):
+    class Meta:  # type: ignore
+        model = AttendanceMonthlySummary
+        fields = [
+            'email', 'fullname', 'department', 'year', 'month',
+            'present_days', 'absent_days', 'late_days', 'office_days', 'wfh_days',
+            'total_hours', 'updated_at',
+        ]
+
+
 class FlexibleCharField(serializers.CharField):
     """Custom CharField that handles arrays and strings"""
     def __init__(self, *args, **kwargs):
@@ -406,6 +429,11 @@ class ReleavedEmployeeSerializer(serializers.ModelSerializer):
         model = ReleavedEmployee
         fields = '__all__'
 
+class ReleavedAttendanceSerializer(serializers.ModelSerializer):
+    class Meta:  # type: ignore
+        model = ReleavedAttendance
+        fields = '__all__'
+
 class PettyCashSerializer(serializers.ModelSerializer):
     class Meta:
         model = PettyCash
@@ -1,7 +1,22 @@
 # accounts/signals.py
-from django.db.models.signals import post_save, pre_delete
+import logging
+import threading
+from contextlib import contextmanager
+from django.db import connection, transaction
+from django.db.models.signals import post_save, post_delete, pre_delete
 from django.dispatch import receiver
-from .models import User, HR, CEO, Manager, Admin, Employee, ReleavedEmployee, EmployeeDetails
+from django.utils import timezone
+from .models import (
+    User, HR, CEO, Manager, Admin, Employee, ReleavedEmployee, EmployeeDetails,
+    Attendance, AbsentEmployeeDetails, Leave, ReleavedAttendance, ReleavedAbsence, AttendanceMonthlySummary,
+)
+from .caching import VERSIONED_CACHE_MODELS, invalidate_model_cache, bump_version_on_commit, model_resource
+from .summaries import schedule_summary_refresh
+from .realtime import publish_attendance_event, attendance_event_row, absence_event_row, board_date
+from .object_cleanup import collect_user_keys, schedule_deletion
+from . import today_board
+
+logger = logging.getLogger(__name__)
 
 # ------------------- CREATE OR UPDATE ROLE TABLES -------------------
 @receiver(post_save, sender=User)
@@ -70,15 +85,50 @@ def manage_role_tables(sender, instance, created, **kwargs):
             )
 
 # ------------------- BACKUP THEN CLEANUP ON USER DELETE -------------------
+@contextmanager
+def offboarding(user):
+    """
+    Wraps a User delete (see User.delete): offboards the user before the
+    cascade collects related rows, all in one transaction. Attendance and
+    absence rows are already archived and removed in bulk by then, so the
+    cascade neither loads them nor sends a signal per row, and per-row
+    receivers of the other cascaded models skip the user. Cache versions are
+    bumped once at the end.
+    """
+    email = user.email  # the delete clears the primary key
+    emails = _offboarding_emails()
+    emails.add(email)
+    try:
+        with transaction.atomic():
+            offboard_user(user)
+            yield
+            for model in VERSIONED_CACHE_MODELS:
+                bump_version_on_commit(model_resource(model))
+    finally:
+        emails.discard(email)
+
+
 @receiver(pre_delete, sender=User)
 def backup_and_cleanup_on_user_delete(sender, instance, **kwargs):
+    # User.delete() has offboarded already; this covers QuerySet.delete(),
+    # whose cascade has loaded the rows by now but still must not lose them.
+    if instance.email not in _offboarding_emails():
+        offboard_user(instance)
+
+
+def offboard_user(instance):
     """
     Before deleting a User:
     1) Ensure a ReleavedEmployee backup exists (create if missing).
     2) Remove related rows from role profile tables (HR/Manager/Admin/Employee/CEO).
+    3) Move attendance and absence rows to ReleavedAttendance / ReleavedAbsence.
+    Their MinIO objects are queued for background deletion.
     
     ReleavedEmployee stores email as a string field, so it's completely independent
     from the User table and will NEVER be affected by User deletions.
+
+    Raises if the rows cannot be archived, which aborts the delete: the
+    cascade would otherwise destroy them.
     """
     # 1) Ensure backup exists - check by email string, not FK
     email_str = instance.email
@@ -149,6 +199,11 @@ def backup_and_cleanup_on_user_delete(sender, instance, **kwargs):
             except table.DoesNotExist:
                 continue
 
+    # MinIO objects (profile picture, documents, awards, attendance photos) are
+    # removed in the background once the delete commits
+    keys, prefixes = collect_user_keys(email_str)
+    schedule_deletion('user_delete', keys=keys, prefixes=prefixes, email=email_str)
+
     # 2) Clean up from role tables (ReleavedEmployee is not affected at all)
     role_tables = [Employee, HR, Manager, Admin, CEO]
     for table in role_tables:
@@ -158,34 +213,164 @@ def backup_and_cleanup_on_user_delete(sender, instance, **kwargs):
         except table.DoesNotExist:
             continue
 
-    # 3) Move attendance records to ReleavedAttendance before deletion
+    # 3) Archive attendance and absence rows, then remove the originals
+    releaved_employee = ReleavedEmployee.objects.filter(email=email_str).first()
+    releaved_employee_id = releaved_employee.id if releaved_employee else None
+    archive_user_data(email_str, releaved_employee_id)
+
+
+def archive_user_data(email_str, releaved_employee_id):
+    """
+    Move every Attendance / AbsentEmployeeDetails row of `email_str` into the
+    archive tables: one INSERT ... SELECT and one DELETE per table, so the
+    cost does not grow with the number of rows moved through Python.
+
+    The DELETEs send no post_delete, so what those receivers would have done
+    is done here once for the user: today's board and the live feed drop
+    them, their monthly summaries go and cached payloads are invalidated.
+    """
+    today = board_date()
     try:
-        from accounts.models import Attendance, ReleavedAttendance
-        
-        # Get the releaved employee record for reference
-        releaved_employee = ReleavedEmployee.objects.filter(email=email_str).first()
-        releaved_employee_id = releaved_employee.id if releaved_employee else None
-        
-        # Get all attendance records for this employee
-        attendance_records = Attendance.objects.filter(email=instance)
-        
-        # Move each attendance record to ReleavedAttendance
-        for attendance in attendance_records:
-            ReleavedAttendance.objects.create(
-                email=email_str,  # Store as string, not FK
-                fullname=attendance.fullname,
-                department=attendance.department,
-                date=attendance.date,
-                check_in=attendance.check_in,
-                check_out=attendance.check_out,
-                latitude=attendance.latitude,
-                longitude=attendance.longitude,
-                location_type=attendance.location_type,
-                releaved_employee_id=releaved_employee_id
-            )
-        
-        # Delete all attendance records for this employee
-        attendance_records.delete()
-        
-    except Exception as e:
-        print(f"Failed to move attendance records for {email_str}: {str(e)}")
\ No newline at end of file
+        with transaction.atomic():
+            on_board = {
+                model: model.objects.filter(email_id=email_str, date=today).exists()
+                for model in (Attendance, AbsentEmployeeDetails)
+            }
+            moved = _archive_rows(Attendance, ReleavedAttendance, ATTENDANCE_ARCHIVE_FIELDS, email_str, releaved_employee_id)
+            moved_absences = _archive_rows(AbsentEmployeeDetails, ReleavedAbsence, ABSENCE_ARCHIVE_FIELDS, email_str, releaved_employee_id)
+            AttendanceMonthlySummary.objects.filter(email_id=email_str).delete()
+    except Exception:
+        logger.exception(f"Failed to archive attendance records for {email_str}; aborting the delete")
+        raise
+
+    today_board.attendance_deleted(email_str, today)
+    today_board.absence_deleted(email_str, today)
+    if on_board[Attendance]:
+        publish_attendance_event("attendance_deleted", {"email": email_str, "date": str(today)})
+    if on_board[AbsentEmployeeDetails]:
+        publish_attendance_event("absence_removed", {"email": email_str, "date": str(today)})
+    for model in (Attendance, AbsentEmployeeDetails):
+        bump_version_on_commit(model_resource(model))
+
+    logger.info(f"Archived {moved} attendance and {moved_absences} absence records for {email_str}")
+    return moved, moved_absences
+
+
+ATTENDANCE_ARCHIVE_FIELDS = [
+    'fullname', 'department', 'date', 'check_in', 'check_out', 'latitude', 'longitude', 'location_type',
+]
+ABSENCE_ARCHIVE_FIELDS = ['fullname', 'department', 'date']
+
+
+def _archive_rows(source_model, archive_model, fields, email_str, releaved_employee_id):
+    """
+    Copy every `source_model` row of `email_str` into `archive_model` with a
+    single INSERT ... SELECT, then delete the originals with a single DELETE
+    (no per-row signals, see archive_user_data; nothing references these
+    rows). Returns the number of rows moved.
+    """
+    quote = connection.ops.quote_name
+    archive_columns = [archive_model._meta.get_field(name).column for name in ['email', *fields, 'archived_at', 'releaved_employee_id']]
+    source_columns = [source_model._meta.get_field(name).column for name in fields]
+    email_column = source_model._meta.get_field('email').column
+
+    sql = (
+        f"INSERT INTO {quote(archive_model._meta.db_table)} ({', '.join(quote(c) for c in archive_columns)}) "
+        f"SELECT %s, {', '.join(quote(c) for c in source_columns)}, %s, %s "
+        f"FROM {quote(source_model._meta.db_table)} WHERE {quote(email_column)} = %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [email_str, timezone.now(), releaved_employee_id, email_str])
+        copied = cursor.rowcount
+        cursor.execute(
+            f"DELETE FROM {quote(source_model._meta.db_table)} WHERE {quote(email_column)} = %s", [email_str],
+        )
+        deleted = cursor.rowcount
+    if deleted != copied:
+        raise RuntimeError(f"{source_model.__name__}: copied {copied} rows but deleted {deleted}")
+    return copied
+
+
+# Users being deleted through `offboarding` right now. Per-row receivers skip
+# them and one bulk invalidation runs once the User itself is gone.
+_offboarding = threading.local()
+
+
+def _offboarding_emails():
+    emails = getattr(_offboarding, 'emails', None)
+    if emails is None:
+        emails = _offboarding.emails = set()
+    return emails
+
+
+# ------------------- CACHE INVALIDATION -------------------
+# Each model has its own version counter in the shared cache; any write to it
+# makes every cached payload built from it stale.
+def _invalidate_cache(sender, instance, **kwargs):
+    if getattr(instance, 'email_id', None) in _offboarding_emails():
+        return
+    invalidate_model_cache(sender)
+
+
+for _model in VERSIONED_CACHE_MODELS:
+    post_save.connect(_invalidate_cache, sender=_model, dispatch_uid=f"cache_version_save_{_model.__name__}")
+    post_delete.connect(_invalidate_cache, sender=_model, dispatch_uid=f"cache_version_delete_{_model.__name__}")
+
+
+# ------------------- MONTHLY ATTENDANCE SUMMARY -------------------
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+@receiver(post_save, sender=AbsentEmployeeDetails)
+@receiver(post_delete, sender=AbsentEmployeeDetails)
+def update_attendance_summary(sender, instance, **kwargs):
+    """Re-tally the AttendanceMonthlySummary row for the employee-month that changed."""
+    # A departing user's summaries are removed by the cascade
+    if instance.email_id and instance.date and instance.email_id not in _offboarding_emails():
+        schedule_summary_refresh(instance.email_id, instance.date)
+
+
+# ------------------- LIVE ATTENDANCE BOARD -------------------
+@receiver(post_save, sender=Attendance)
+def push_attendance_saved(sender, instance, created, update_fields=None, **kwargs):
+    """Update today's board and push check-in / check-out to connected dashboards."""
+    if instance.date != board_date():
+        return
+    if created:
+        event = "check_in"
+    elif instance.check_out and (update_fields is None or 'check_out' in update_fields):
+        event = "check_out"
+    else:
+        event = "attendance_updated"
+    today_board.attendance_saved(instance)
+    publish_attendance_event(event, attendance_event_row(instance))
+
+
+@receiver(post_delete, sender=Attendance)
+def push_attendance_deleted(sender, instance, **kwargs):
+    if instance.date == board_date():
+        today_board.attendance_deleted(instance.email_id, instance.date)
+        publish_attendance_event("attendance_deleted", {"email": instance.email_id, "date": str(instance.date)})
+
+
+@receiver(post_save, sender=AbsentEmployeeDetails)
+def push_absence_saved(sender, instance, created, **kwargs):
+    if instance.date == board_date():
+        today_board.absence_saved(instance)
+        if created:
+            publish_attendance_event("absent", absence_event_row(instance))
+
+
+@receiver(post_delete, sender=AbsentEmployeeDetails)
+def push_absence_deleted(sender, instance, **kwargs):
+    if instance.date == board_date():
+        today_board.absence_deleted(instance.email_id, instance.date)
+        publish_attendance_event("absence_removed", {"email": instance.email_id, "date": str(instance.date)})
+
+
+@receiver(post_save, sender=Leave)
+@receiver(post_delete, sender=Leave)
+def update_board_leave(sender, instance, **kwargs):
+    """Keep today's on-leave set current when a leave covering today changes."""
+    today = board_date()
+    if instance.start_date <= today <= instance.end_date:
+        today_board.leave_changed(instance.email_id)
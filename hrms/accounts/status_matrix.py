@@ -0,0 +1,128 @@
+"""
+Org-wide month status matrix: one int8 status per person per day.
+
+Rows are everyone with an Employee, HR or Manager profile (the same people
+as the payroll run, see payroll_run.PAYABLE_ROLES), read in one query.
+
+Attendance, absences, approved leaves and holidays for the month are read
+with one set-based query each. Calendar statuses (weekend, holiday) are
+computed once over the date axis and broadcast to every row; leave
+intervals are painted with a difference array and a cumulative sum, so the
+whole grid is filled with array operations.
+"""
+
+import base64
+
+import numpy as np
+from django.db.models import F
+from django.db.models.functions import Coalesce
+
+from .constants import WORKING_WEEKMASK
+from .models import Attendance, AbsentEmployeeDetails, Leave, Holiday
+from .payroll_run import PAYABLE_ROLES, payable_users
+from .summaries import month_bounds
+
+# Status codes, in increasing precedence: a later status overwrites an earlier one
+NONE, WEEKEND, HOLIDAY, ABSENT, LEAVE, PRESENT, WFH = range(7)
+
+STATUS_LABELS = {
+    NONE: "none",
+    WEEKEND: "weekend",
+    HOLIDAY: "holiday",
+    ABSENT: "absent",
+    LEAVE: "leave",
+    PRESENT: "present",
+    WFH: "wfh",
+}
+
+# One character per status for the compact row encoding
+STATUS_CHARS = np.array(list(".WHALPR"))
+
+
+def build_status_matrix(year, month, department=None):
+    """
+    Returns (employees, days, matrix) where `employees` is a list of
+    {"email", "fullname", "department"} rows, `days` the month's dates and
+    `matrix` an int8 array of shape (len(employees), len(days)).
+    """
+    start, end = month_bounds(year, month)
+    days = np.arange(np.datetime64(start), np.datetime64(end) + 1)
+    n_days = len(days)
+    start_ordinal = start.toordinal()
+
+    # Each user has one profile; take its name and department, whichever table it is in
+    employees = payable_users().annotate(
+        fullname=Coalesce(*(f"{role}__fullname" for role in PAYABLE_ROLES)),
+        department=Coalesce(*(f"{role}__department" for role in PAYABLE_ROLES)),
+    )
+    if department:
+        employees = employees.filter(department=department)
+    employees = list(
+        employees.order_by('fullname', 'email').values('fullname', 'department', email_id=F('email'))
+    )
+    index = {row['email_id']: i for i, row in enumerate(employees)}
+    emails = list(index)
+
+    matrix = np.full((len(employees), n_days), NONE, dtype=np.int8)
+
+    # Calendar statuses, once for the date axis
+    calendar_row = np.full(n_days, NONE, dtype=np.int8)
+    calendar_row[~np.is_busday(days, weekmask=WORKING_WEEKMASK)] = WEEKEND
+    holiday_days = [
+        day.toordinal() - start_ordinal
+        for day in Holiday.objects.filter(date__range=(start, end)).values_list('date', flat=True)
+    ]
+    calendar_row[holiday_days] = HOLIDAY
+    matrix[:] = calendar_row
+
+    if not employees:
+        return employees, days, matrix
+
+    def cells(rows):
+        rows = [(index[email], day.toordinal() - start_ordinal) for email, day in rows if email in index]
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        emp, day = np.array(rows, dtype=np.int64).T
+        return emp, day
+
+    emp, day = cells(
+        AbsentEmployeeDetails.objects.filter(date__range=(start, end), email_id__in=emails)
+        .values_list('email_id', 'date')
+    )
+    matrix[emp, day] = ABSENT
+
+    # Leave intervals: +1 at the first day, -1 after the last, cumulative sum > 0 is on leave
+    leaves = (
+        Leave.objects.filter(status='Approved', start_date__lte=end, end_date__gte=start, email_id__in=emails)
+        .values_list('email_id', 'start_date', 'end_date')
+    )
+    spans = [
+        (index[email], max(s, start).toordinal() - start_ordinal, min(e, end).toordinal() - start_ordinal)
+        for email, s, e in leaves
+    ]
+    if spans:
+        emp, first, last = np.array(spans, dtype=np.int64).T
+        diff = np.zeros((len(employees), n_days + 1), dtype=np.int32)
+        np.add.at(diff, (emp, first), 1)
+        np.add.at(diff, (emp, last + 1), -1)
+        matrix[np.cumsum(diff[:, :n_days], axis=1) > 0] = LEAVE
+
+    attendance = list(
+        Attendance.objects.filter(date__range=(start, end), email_id__in=emails)
+        .values_list('email_id', 'date', 'location_type')
+    )
+    emp, day = cells((email, day) for email, day, _ in attendance)
+    wfh = np.array([location == 'work' for email, _, location in attendance if email in index], dtype=bool)
+    matrix[emp, day] = np.where(wfh, WFH, PRESENT).astype(np.int8)
+
+    return employees, days, matrix
+
+
+def encode_rows(matrix):
+    """Each employee row as a string with one STATUS_CHARS character per day."""
+    return ["".join(row) for row in STATUS_CHARS[matrix]]
+
+
+def encode_base64(matrix):
+    """The whole matrix as base64 of its row-major int8 bytes."""
+    return base64.b64encode(np.ascontiguousarray(matrix, dtype=np.int8).tobytes()).decode("ascii")
@@ -0,0 +1,172 @@
+"""
+Process-wide MinIO (S3) client.
+
+boto3 clients are thread-safe and keep their own urllib3 connection pool, so
+one client per process is shared by every request thread instead of paying
+for client construction and a fresh TLS handshake on each call. The pool size
+and timeouts come from settings.MINIO_STORAGE (MAX_POOL_CONNECTIONS,
+CONNECT_TIMEOUT, READ_TIMEOUT).
+
+The bucket-existence check runs once per process (`ensure_bucket`) rather than
+before every upload, and every S3 operation is timed through botocore's event
+hooks; `s3_metrics()` returns this process's per-operation counts and latencies.
+
+`run_parallel` fans independent transfers (the files of one request) out over
+a bounded thread pool shared by the process, so a multi-file request costs
+about as long as its slowest file.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from botocore.config import Config
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_POOL_CONNECTIONS = 32
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 60
+DEFAULT_IO_WORKERS = 8
+
+
+class S3ClientManager:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._client = None
+        self._bucket_ready = set()
+        self._metrics = {}
+        self._pool = None
+
+    # ---------- client ----------
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._build_client()
+        return self._client
+
+    def _build_client(self):
+        minio_conf = settings.MINIO_STORAGE
+        protocol = "https" if minio_conf.get("USE_SSL", False) else "http"
+        # A session of its own: the default boto3 session is not thread-safe
+        session = boto3.session.Session()
+        client = session.client(
+            "s3",
+            endpoint_url=f"{protocol}://{minio_conf['ENDPOINT']}",
+            aws_access_key_id=minio_conf["ACCESS_KEY"],
+            aws_secret_access_key=minio_conf["SECRET_KEY"],
+            verify=True,
+            config=Config(
+                max_pool_connections=minio_conf.get("MAX_POOL_CONNECTIONS", DEFAULT_MAX_POOL_CONNECTIONS),
+                connect_timeout=minio_conf.get("CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT),
+                read_timeout=minio_conf.get("READ_TIMEOUT", DEFAULT_READ_TIMEOUT),
+                retries={"max_attempts": 3, "mode": "standard"},
+                signature_version="s3v4",
+            ),
+        )
+        client.meta.events.register("before-call.s3", self._before_call)
+        client.meta.events.register("after-call.s3", self._after_call)
+        client.meta.events.register("after-call-error.s3", self._after_call_error)
+        return client
+
+    def pool(self):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    workers = settings.MINIO_STORAGE.get("IO_WORKERS", DEFAULT_IO_WORKERS)
+                    self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="s3-io")
+        return self._pool
+
+    # ---------- bucket ----------
+    def ensure_bucket(self, bucket_name=None):
+        """Create the bucket if it is missing; checked once per process per bucket."""
+        bucket_name = bucket_name or settings.MINIO_STORAGE["BUCKET_NAME"]
+        if bucket_name in self._bucket_ready:
+            return
+        client = self.client()
+        try:
+            client.head_bucket(Bucket=bucket_name)
+        except Exception:
+            try:
+                client.create_bucket(Bucket=bucket_name)
+            except Exception as e:
+                # Not memoized, so the next upload checks again
+                logger.warning(f"Could not create bucket {bucket_name}: {e}")
+                return
+        self._bucket_ready.add(bucket_name)
+
+    # ---------- metrics ----------
+    def _before_call(self, context=None, **kwargs):
+        if context is not None:
+            context["hrms_started"] = time.perf_counter()
+
+    def _record(self, operation, context, failed):
+        started = (context or {}).get("hrms_started")
+        if started is None:
+            return
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            stats = self._metrics.setdefault(operation, {"calls": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+            stats["calls"] += 1
+            stats["errors"] += int(failed)
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+
+    def _after_call(self, event_name, http_response=None, parsed=None, context=None, **kwargs):
+        failed = (http_response is not None and http_response.status_code >= 400) or bool((parsed or {}).get("Error"))
+        # event_name is "after-call.s3.<OperationName>"
+        self._record(event_name.rsplit(".", 1)[-1], context, failed)
+
+    def _after_call_error(self, event_name, context=None, **kwargs):
+        self._record(event_name.rsplit(".", 1)[-1], context, True)
+
+    def metrics(self):
+        with self._lock:
+            return {
+                operation: {
+                    "calls": stats["calls"],
+                    "errors": stats["errors"],
+                    "avg_ms": round(stats["total_ms"] / stats["calls"], 2) if stats["calls"] else 0.0,
+                    "max_ms": round(stats["max_ms"], 2),
+                }
+                for operation, stats in sorted(self._metrics.items())
+            }
+
+    def reset_metrics(self):
+        with self._lock:
+            self._metrics = {}
+
+
+s3_manager = S3ClientManager()
+
+
+def get_s3_client():
+    return s3_manager.client()
+
+
+def ensure_bucket(bucket_name=None):
+    s3_manager.ensure_bucket(bucket_name)
+
+
+def s3_metrics():
+    return s3_manager.metrics()
+
+
+def run_parallel(tasks):
+    """
+    Run {name: callable} on the shared S3 I/O pool and wait for all of them.
+    Returns {name: (True, result)} or {name: (False, exception)} per task.
+    """
+    pool = s3_manager.pool()
+    futures = {name: pool.submit(task) for name, task in tasks.items()}
+    results = {}
+    for name, future in futures.items():
+        try:
+            results[name] = (True, future.result())
+        except Exception as e:
+            results[name] = (False, e)
+    return results
@@ -0,0 +1,173 @@
+"""
+Maintenance of AttendanceMonthlySummary.
+
+Every Attendance / AbsentEmployeeDetails write re-tallies just the affected
+(employee, month) row from that employee's raw rows for the month (at most a
+month of rows), so readers get monthly counts without scanning the raw tables.
+`rebuild_monthly_summaries` recomputes whole months in one pass for the
+rebuild command.
+"""
+
+import calendar
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+from .constants import LATE_CHECK_IN_AFTER
+from .models import Attendance, AbsentEmployeeDetails, AttendanceMonthlySummary
+
+REBUILD_CHUNK_SIZE = 2000
+
+# Fields of Attendance the tally reads
+_TALLY_FIELDS = ("check_in", "check_out", "location_type", "fullname", "department")
+
+
+def month_bounds(year, month):
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def worked_seconds(check_in, check_out):
+    """Seconds between check-in and check-out; a check-out before check-in crosses midnight."""
+    if not check_in or not check_out:
+        return 0
+    delta = (datetime.combine(date.min, check_out) - datetime.combine(date.min, check_in)).total_seconds()
+    return delta + 86400 if delta < 0 else delta
+
+
+class _Tally:
+    def __init__(self):
+        self.present = 0
+        self.late = 0
+        self.office = 0
+        self.wfh = 0
+        self.seconds = 0
+        self.absent = 0
+        self.fullname = None
+        self.department = None
+
+    def add_attendance(self, check_in, check_out, location_type, fullname, department):
+        self.present += 1
+        if check_in and check_in > LATE_CHECK_IN_AFTER:
+            self.late += 1
+        if location_type == 'work':
+            self.wfh += 1
+        else:
+            self.office += 1
+        self.seconds += worked_seconds(check_in, check_out)
+        self.fullname = fullname or self.fullname
+        self.department = department or self.department
+
+    def fields(self):
+        return {
+            "fullname": self.fullname,
+            "department": self.department,
+            "present_days": self.present,
+            "absent_days": self.absent,
+            "late_days": self.late,
+            "office_days": self.office,
+            "wfh_days": self.wfh,
+            "total_hours": (Decimal(self.seconds) / Decimal(3600)).quantize(Decimal("0.01")),
+        }
+
+
+def refresh_monthly_summary(email, year, month):
+    """Recompute the summary row for one employee-month from the raw tables."""
+    start, end = month_bounds(year, month)
+    tally = _Tally()
+
+    rows = (
+        Attendance.objects
+        .filter(email_id=email, date__range=(start, end))
+        .order_by('date')
+        .values_list(*_TALLY_FIELDS)
+    )
+    for row in rows:
+        tally.add_attendance(*row)
+
+    absences = AbsentEmployeeDetails.objects.filter(email_id=email, date__range=(start, end))
+    tally.absent = absences.count()
+    if tally.absent and not tally.fullname:
+        latest = absences.order_by('-date').values('fullname', 'department').first()
+        tally.fullname = latest['fullname'] or None
+        tally.department = latest['department'] or tally.department
+
+    if not tally.present and not tally.absent:
+        AttendanceMonthlySummary.objects.filter(email_id=email, year=year, month=month).delete()
+        return None
+
+    summary, _ = AttendanceMonthlySummary.objects.update_or_create(
+        email_id=email, year=year, month=month, defaults=tally.fields()
+    )
+    return summary
+
+
+def schedule_summary_refresh(email, day):
+    """
+    Refresh the summary once the surrounding transaction commits, so cascaded
+    deletes (e.g. a User being removed) have finished before it is re-tallied.
+    """
+    transaction.on_commit(lambda: refresh_monthly_summary(email, day.year, day.month))
+
+
+def rebuild_monthly_summaries(year=None, month=None):
+    """
+    Recompute summaries from scratch, for one month, one year or everything.
+    Returns the number of summary rows written.
+    """
+    attendance = Attendance.objects.all()
+    absences = AbsentEmployeeDetails.objects.all()
+    existing = AttendanceMonthlySummary.objects.all()
+
+    if year is not None:
+        attendance = attendance.filter(date__year=year)
+        absences = absences.filter(date__year=year)
+        existing = existing.filter(year=year)
+    if month is not None:
+        attendance = attendance.filter(date__month=month)
+        absences = absences.filter(date__month=month)
+        existing = existing.filter(month=month)
+
+    tallies = {}
+    rows = attendance.order_by('date').values_list('email_id', 'date', *_TALLY_FIELDS)
+    for email, day, *fields in rows.iterator(chunk_size=REBUILD_CHUNK_SIZE):
+        key = (email, day.year, day.month)
+        tally = tallies.get(key)
+        if tally is None:
+            tally = tallies[key] = _Tally()
+        tally.add_attendance(*fields)
+
+    absence_counts = (
+        absences
+        .annotate(year=ExtractYear('date'), month=ExtractMonth('date'))
+        .values('email_id', 'year', 'month')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    for row in absence_counts:
+        key = (row['email_id'], row['year'], row['month'])
+        tally = tallies.get(key)
+        if tally is None:
+            tally = tallies[key] = _Tally()
+        tally.absent = row['total']
+
+    # Names for employees who were only ever absent in a month
+    missing_names = {key for key, tally in tallies.items() if not tally.present}
+    if missing_names:
+        name_rows = absences.order_by('date').values_list('email_id', 'date', 'fullname', 'department')
+        for email, day, fullname, department in name_rows.iterator(chunk_size=REBUILD_CHUNK_SIZE):
+            key = (email, day.year, day.month)
+            if key in missing_names:
+                tallies[key].fullname = fullname or tallies[key].fullname
+                tallies[key].department = department or tallies[key].department
+
+    summaries = [
+        AttendanceMonthlySummary(email_id=email, year=y, month=m, **tally.fields())
+        for (email, y, m), tally in tallies.items()
+    ]
+    with transaction.atomic():
+        existing.delete()
+        AttendanceMonthlySummary.objects.bulk_create(summaries, batch_size=1000)
+    return len(summaries)
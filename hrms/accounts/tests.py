@@ -1,3 +1,1073 @@
-from django.test import TestCase
+import base64
+import csv
+import io
+import json
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time, timedelta
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from botocore.exceptions import ClientError
+from PIL import Image
+
+from django.core import mail
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import image_derivatives, letters, object_cleanup, outbox, photo_retention, signals, status_matrix, today_board
+from .archives import keyset_page
+from .caching import ATTENDANCE_RESOURCE, cache_stats, get_or_build, get_version
+from .employee_calendar import build_calendar
+from .exports import parse_export_params
+from .jobs import requeue_stale_running
+from .models import (
+    User, Employee, HR, Manager, Attendance, AbsentEmployeeDetails, Leave, Payroll, Holiday,
+    ReleavedAttendance, ReleavedAbsence, AttendanceMonthlySummary, OutboundEmail, StorageDeletionJob,
+    Document, LetterJob, LetterBatch,
+)
+from .payroll_run import lop_days_by_email, run_payroll
+from .pdf_rendering import PdfRenderError, content_hash, get_backend
+from .realtime import board_date
+from .status_matrix import build_status_matrix, encode_rows
+from .summaries import refresh_monthly_summary
+from .working_days import WorkingCalendar, working_calendar
+
+# March 2026: the 1st, 8th, 15th, 22nd and 29th are Sundays
+MARCH = (2026, 3)
+
+
+def make_employee(email):
+    # is_staff makes the role signal create the Employee row
+    return User.objects.create(email=email, role='Employee', is_staff=True)
+
+
+# ------------------- WORKING DAYS -------------------
+class WorkingCalendarTests(SimpleTestCase):
+    def test_count_skips_sundays_and_includes_both_ends(self):
+        calendar = WorkingCalendar()
+        self.assertEqual(calendar.count(date(2026, 3, 1), date(2026, 3, 7)), 6)
+        self.assertEqual(calendar.count(date(2026, 3, 2), date(2026, 3, 2)), 1)
+        self.assertEqual(calendar.count(date(2026, 3, 1), date(2026, 3, 1)), 0)
+
+    def test_count_is_zero_for_reversed_interval(self):
+        self.assertEqual(WorkingCalendar().count(date(2026, 3, 5), date(2026, 3, 4)), 0)
+
+    def test_holidays_are_not_working_days(self):
+        calendar = WorkingCalendar(['2026-03-10'])
+        self.assertFalse(calendar.is_working_day(date(2026, 3, 10)))
+        self.assertEqual(calendar.count(date(2026, 3, 9), date(2026, 3, 11)), 2)
+
+    def test_overlap_many_clips_to_the_month(self):
+        calendar = WorkingCalendar(['2026-03-10'])
+        days = calendar.overlap_many(
+            [date(2026, 2, 25), date(2026, 3, 30), date(2026, 3, 9), date(2026, 1, 5), date(2026, 2, 1)],
+            [date(2026, 3, 3), date(2026, 4, 5), date(2026, 3, 11), date(2026, 1, 9), date(2026, 4, 30)],
+            date(2026, 3, 1), date(2026, 3, 31),
+        )
+        # Feb 25 - Mar 3: Mar 2, 3 (Mar 1 is a Sunday); Mar 30 - Apr 5: Mar 30, 31;
+        # Mar 9 - 11 around the holiday: 2; entirely before March: 0; spanning March: 25
+        self.assertEqual(list(days), [2, 2, 2, 0, 25])
+
+    def test_month_and_year_std(self):
+        self.assertEqual(WorkingCalendar().month_std(*MARCH), 26)
+        calendar = WorkingCalendar(['2026-03-10'])
+        self.assertEqual(calendar.month_std(*MARCH), 25)
+        self.assertEqual(calendar.year_std(2026)[3], 25)
+        self.assertEqual(calendar.year_std(2026)[2], 24)
+
+
+# ------------------- LOP / PAYROLL RUN -------------------
+class PayrollRunTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = make_employee('alice@example.com')
+        self.bob = make_employee('bob@example.com')
+
+    def leave(self, user, start, end, status='Approved', paid_status='Unpaid'):
+        return Leave.objects.create(email=user, start_date=start, end_date=end, status=status, paid_status=paid_status)
+
+    def add_holiday(self, day):
+        # The holiday list is cached; the version bump runs on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            Holiday.objects.create(name='Holiday', date=day, type='Public', year=day.year, month=day.month)
+
+    def test_lop_counts_working_days_inside_the_month(self):
+        self.leave(self.alice, date(2026, 2, 25), date(2026, 3, 3))
+        self.leave(self.alice, date(2026, 3, 10), date(2026, 3, 10))
+        self.leave(self.bob, date(2026, 3, 30), date(2026, 4, 5))
+        self.assertEqual(lop_days_by_email(*MARCH), {'alice@example.com': 3, 'bob@example.com': 2})
+
+    def test_lop_ignores_paid_pending_and_holidays(self):
+        self.leave(self.alice, date(2026, 3, 9), date(2026, 3, 11))
+        self.leave(self.alice, date(2026, 3, 16), date(2026, 3, 16), paid_status='Paid')
+        self.leave(self.bob, date(2026, 3, 16), date(2026, 3, 16), status='Pending')
+        self.add_holiday(date(2026, 3, 10))
+        self.assertEqual(working_calendar().month_std(*MARCH), 25)
+        self.assertEqual(lop_days_by_email(*MARCH), {'alice@example.com': 2})
+
+    def test_lop_of_a_leave_over_sunday_only_is_zero(self):
+        self.leave(self.alice, date(2026, 3, 8), date(2026, 3, 8))
+        self.assertEqual(lop_days_by_email(*MARCH), {})
+
+    def test_run_payroll_creates_rows_with_lop_and_std(self):
+        self.leave(self.alice, date(2026, 3, 2), date(2026, 3, 3))
+        result = run_payroll(*MARCH)
+        self.assertEqual(result['created'], 2)
+        payroll = Payroll.objects.get(email=self.alice, month='3', year=2026)
+        self.assertEqual((payroll.LOP, payroll.STD), (2, 26))
+        self.assertEqual(Payroll.objects.get(email=self.bob, month='3', year=2026).LOP, 0)
+
+    def test_run_payroll_covers_hr_and_managers(self):
+        for email, role in (('hr@example.com', 'HR'), ('manager@example.com', 'Manager'),
+                            ('ceo@example.com', 'CEO'), ('admin@example.com', 'Admin')):
+            User.objects.create(email=email, role=role, is_staff=True)
+        User.objects.create(email='pending@example.com', role='Employee')
+        self.leave(User.objects.get(email='hr@example.com'), date(2026, 3, 2), date(2026, 3, 2))
+
+        result = run_payroll(*MARCH)
+        self.assertEqual(
+            [row['email'] for row in result['results']],
+            ['alice@example.com', 'bob@example.com', 'hr@example.com', 'manager@example.com'],
+        )
+        self.assertEqual(Payroll.objects.get(email_id='hr@example.com', month='3', year=2026).LOP, 1)
+
+    def test_run_payroll_is_idempotent(self):
+        run_payroll(*MARCH)
+        result = run_payroll(*MARCH)
+        self.assertEqual((result['created'], result['existing']), (0, 2))
+        self.assertEqual({row['status'] for row in result['results']}, {'exists'})
+        self.assertEqual(Payroll.objects.filter(month='3', year=2026).count(), 2)
+
+    def test_run_payroll_sees_rows_created_with_a_padded_month(self):
+        Payroll.objects.create(email=self.alice, month='03', year=2026, STD=26)
+        result = run_payroll(*MARCH)
+        self.assertEqual((result['created'], result['existing']), (1, 1))
+        self.assertEqual(Payroll.objects.filter(email=self.alice, year=2026).count(), 1)
+
+    def test_dry_run_writes_nothing(self):
+        result = run_payroll(*MARCH, dry_run=True)
+        self.assertEqual(result['created'], 2)
+        self.assertFalse(Payroll.objects.exists())
+
+    def test_update_pending_reapplies_lop(self):
+        run_payroll(*MARCH)
+        self.leave(self.alice, date(2026, 3, 2), date(2026, 3, 2))
+        result = run_payroll(*MARCH, update_pending=True)
+        self.assertEqual(result['updated'], 1)
+        self.assertEqual(Payroll.objects.get(email=self.alice, month='3', year=2026).LOP, 1)
+
+    def test_create_payroll_normalizes_the_month(self):
+        response = self.client.post(
+            '/api/accounts/create_payroll/',
+            json.dumps({'email': 'alice@example.com', 'month': '03', 'year': 2026}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['payroll']['month'], '3')
+        response = self.client.post(
+            '/api/accounts/create_payroll/',
+            json.dumps({'email': 'alice@example.com', 'month': '3', 'year': 2026}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+# ------------------- CACHE VERSIONS -------------------
+class CacheVersionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = make_employee('carol@example.com')
+
+    def test_payload_is_served_from_cache_until_a_write_commits(self):
+        builds = []
+
+        def build():
+            builds.append(1)
+            return len(builds)
+
+        self.assertEqual(get_or_build(ATTENDANCE_RESOURCE, ('test',), build), 1)
+        self.assertEqual(get_or_build(ATTENDANCE_RESOURCE, ('test',), build), 1)
+
+        version = get_version(ATTENDANCE_RESOURCE)
+        with self.captureOnCommitCallbacks(execute=True):
+            Attendance.objects.create(email=self.user, date=date(2026, 3, 2))
+            # Not before commit: a concurrent reader would cache pre-commit data
+            self.assertEqual(get_version(ATTENDANCE_RESOURCE), version)
+        self.assertGreater(get_version(ATTENDANCE_RESOURCE), version)
+        self.assertEqual(get_or_build(ATTENDANCE_RESOURCE, ('test',), build), 2)
+
+    def test_rolled_back_write_does_not_bump(self):
+        version = get_version(ATTENDANCE_RESOURCE)
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            Attendance.objects.create(email=self.user, date=date(2026, 3, 2))
+        self.assertTrue(callbacks)
+        self.assertEqual(get_version(ATTENDANCE_RESOURCE), version)
+
+
+# ------------------- ARCHIVE KEYSET PAGINATION -------------------
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        # Several rows per date, so the id tie-break matters
+        for offset in range(5):
+            for _ in range(3):
+                ReleavedAttendance.objects.create(email='gone@example.com', date=date(2026, 1, 1) + timedelta(days=offset))
+        ReleavedAttendance.objects.create(email='other@example.com', date=date(2026, 1, 3))
+
+    def test_pages_cover_every_row_once_newest_first(self):
+        queryset = ReleavedAttendance.objects.filter(email='gone@example.com')
+        seen, cursor = [], None
+        while True:
+            rows, cursor = keyset_page(queryset, cursor, page_size=4)
+            seen.extend((row.date, row.id) for row in rows)
+            if cursor is None:
+                break
+        self.assertEqual(len(seen), 15)
+        self.assertEqual(seen, sorted(seen, reverse=True))
+        self.assertEqual(len(set(seen)), 15)
+
+    def test_rows_added_behind_the_cursor_do_not_shift_pages(self):
+        queryset = ReleavedAttendance.objects.filter(email='gone@example.com')
+        first, cursor = keyset_page(queryset, None, page_size=4)
+        ReleavedAttendance.objects.create(email='gone@example.com', date=date(2026, 1, 10))
+        second, _ = keyset_page(queryset, cursor, page_size=4)
+        self.assertTrue(all((row.date, row.id) < (first[-1].date, first[-1].id) for row in second))
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(ValueError):
+            keyset_page(ReleavedAttendance.objects.all(), 'not-a-cursor', page_size=4)
+
+    def test_endpoint_filters_and_pages(self):
+        response = self.client.get('/api/accounts/releaved/attendance/', {'email': 'gone@example.com', 'page_size': 10})
+        body = response.json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(body['attendance']), 10)
+        self.assertTrue(body['pagination']['has_more'])
+        response = self.client.get('/api/accounts/releaved/attendance/', {
+            'email': 'gone@example.com', 'page_size': 10, 'cursor': body['pagination']['next_cursor'],
+        })
+        self.assertEqual(len(response.json()['attendance']), 5)
+        self.assertFalse(response.json()['pagination']['has_more'])
+        self.assertEqual(
+            self.client.get('/api/accounts/releaved/attendance/', {'cursor': 'x'}).status_code, 400,
+        )
+
+
+# ------------------- OFFBOARDING ARCHIVE -------------------
+class OffboardingArchiveTests(TestCase):
+    def setUp(self):
+        self.user = make_employee('leaver@example.com')
+        Attendance.objects.bulk_create([
+            Attendance(email=self.user, date=date(2025, 1, 1) + timedelta(days=day)) for day in range(30)
+        ])
+        AbsentEmployeeDetails.objects.bulk_create([
+            AbsentEmployeeDetails(email=self.user, date=date(2024, 1, 1) + timedelta(days=day)) for day in range(4)
+        ])
+
+    def test_delete_moves_rows_to_the_archive(self):
+        self.user.delete()
+        self.assertFalse(User.objects.filter(email='leaver@example.com').exists())
+        self.assertEqual(ReleavedAttendance.objects.filter(email='leaver@example.com').count(), 30)
+        self.assertEqual(ReleavedAbsence.objects.filter(email='leaver@example.com').count(), 4)
+        self.assertFalse(Attendance.objects.filter(email_id='leaver@example.com').exists())
+        self.assertFalse(AbsentEmployeeDetails.objects.filter(email_id='leaver@example.com').exists())
+        self.assertEqual(signals._offboarding_emails(), set())
+
+    def test_query_count_does_not_grow_with_rows(self):
+        other = make_employee('short@example.com')
+        Attendance.objects.create(email=other, date=date(2025, 1, 1))
+        with CaptureQueriesContext(connection) as few:
+            other.delete()
+        with CaptureQueriesContext(connection) as many:
+            self.user.delete()
+        self.assertEqual(len(few), len(many))
+
+    def test_failed_archive_aborts_the_delete(self):
+        with mock.patch.object(signals, '_archive_rows', side_effect=RuntimeError('archive failed')):
+            with self.assertRaises(RuntimeError):
+                self.user.delete()
+        self.assertTrue(User.objects.filter(email='leaver@example.com').exists())
+        self.assertEqual(Attendance.objects.filter(email_id='leaver@example.com').count(), 30)
+        self.assertFalse(ReleavedAttendance.objects.filter(email='leaver@example.com').exists())
+        self.assertEqual(signals._offboarding_emails(), set())
+
+    def test_queryset_delete_still_archives(self):
+        User.objects.filter(email='leaver@example.com').delete()
+        self.assertEqual(ReleavedAttendance.objects.filter(email='leaver@example.com').count(), 30)
+        self.assertFalse(Attendance.objects.filter(email_id='leaver@example.com').exists())
+
+    def test_board_feed_and_summaries_drop_the_user(self):
+        cache.clear()
+        today = board_date()
+        with self.captureOnCommitCallbacks(execute=True):
+            Attendance.objects.create(email=self.user, date=today, check_in=time(9, 0))
+        refresh_monthly_summary('leaver@example.com', 2025, 1)
+        self.assertIn('leaver@example.com', today_board.get_board()['present'])
+        self.assertTrue(AttendanceMonthlySummary.objects.filter(email_id='leaver@example.com').exists())
+        version = get_version(ATTENDANCE_RESOURCE)
+
+        with mock.patch.object(signals, 'publish_attendance_event') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                signals.archive_user_data('leaver@example.com', None)
+
+        self.assertNotIn('leaver@example.com', today_board.get_board()['present'])
+        publish.assert_called_once_with('attendance_deleted', {'email': 'leaver@example.com', 'date': str(today)})
+        self.assertFalse(AttendanceMonthlySummary.objects.filter(email_id='leaver@example.com').exists())
+        self.assertNotEqual(get_version(ATTENDANCE_RESOURCE), version)
+
+
+# ------------------- EXPORTS -------------------
+class ExportTests(TestCase):
+    def setUp(self):
+        self.user = make_employee('dave@example.com')
+        for day in (2, 3, 4):
+            Attendance.objects.create(email=self.user, date=date(2026, 3, day), check_in=time(9, 30))
+
+    def test_params_are_validated(self):
+        factory = RequestFactory()
+        with self.assertRaises(ValueError):
+            parse_export_params(factory.get('/', {'from': '2026-02-30'}))
+        with self.assertRaises(ValueError):
+            parse_export_params(factory.get('/', {'from': '2026-03-05', 'to': '2026-03-01'}))
+        with self.assertRaises(ValueError):
+            parse_export_params(factory.get('/', {'format': 'pdf'}))
+        params = parse_export_params(factory.get('/', {'from': '2026-03-01', 'format': 'XLSX'}))
+        self.assertEqual((params['from'], params['to'], params['format']), (date(2026, 3, 1), None, 'xlsx'))
+
+    def test_csv_streams_rows_in_the_range(self):
+        response = self.client.get('/api/accounts/attendance/export/', {'from': '2026-03-03', 'to': '2026-03-04'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn('attendance_2026-03-03_2026-03-04.csv', response['Content-Disposition'])
+        rows = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(rows[0][:5], ['email', 'role', 'fullname', 'department', 'date'])
+        self.assertEqual([row[4] for row in rows[1:]], ['2026-03-03', '2026-03-04'])
+        self.assertEqual(rows[1][5], '09:30:00')
+
+    def test_xlsx_is_a_valid_workbook(self):
+        response = self.client.get('/api/accounts/attendance/export/', {'format': 'xlsx'})
+        self.assertEqual(response.status_code, 200)
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertIn('xl/workbook.xml', archive.namelist())
+        sheet = archive.read('xl/worksheets/sheet1.xml').decode()
+        self.assertEqual(sheet.count('<row '), 4)
+        self.assertIn('dave@example.com', sheet)
+
+    def test_bad_params_are_a_400(self):
+        response = self.client.get('/api/accounts/attendance/export/', {'to': 'tomorrow'})
+        self.assertEqual(response.status_code, 400)
+
+
+# ------------------- CACHE STATS -------------------
+class CacheStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def read_twice(self):
+        get_or_build(ATTENDANCE_RESOURCE, ('stats',), lambda: 'payload')
+        get_or_build(ATTENDANCE_RESOURCE, ('stats',), lambda: 'payload')
+        return cache_stats([ATTENDANCE_RESOURCE])['resources'][ATTENDANCE_RESOURCE]
+
+    def test_counters_are_off_by_default(self):
+        with self.settings(CACHE_STATS_ENABLED=False):
+            stats = self.read_twice()
+        self.assertEqual((stats['hits'], stats['misses']), (0, 0))
+
+    def test_counters_when_enabled(self):
+        with self.settings(CACHE_STATS_ENABLED=True):
+            stats = self.read_twice()
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_ratio']), (1, 1, 0.5))
+
+    def test_endpoint_is_limited_to_admins(self):
+        self.assertIn(self.client.get('/api/accounts/cache/stats/').status_code, (401, 403))
+        self.client.force_login(make_employee('erin@example.com'))
+        self.assertEqual(self.client.get('/api/accounts/cache/stats/').status_code, 403)
+        self.client.force_login(User.objects.create(email='admin@example.com', role='Admin'))
+        response = self.client.get('/api/accounts/cache/stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(ATTENDANCE_RESOURCE, response.json()['resources'])
+
+
+# ------------------- STATUS MATRIX -------------------
+class StatusMatrixTests(TestCase):
+    def setUp(self):
+        self.alice = make_employee('alice@example.com')
+        self.bob = make_employee('bob@example.com')
+        Employee.objects.filter(email=self.alice).update(fullname='Alice', department='Sales')
+        Employee.objects.filter(email=self.bob).update(fullname='Bob', department='Ops')
+        Holiday.objects.create(name='Holiday', date=date(2026, 3, 10), type='Public', year=2026, month=3)
+
+        Attendance.objects.create(email=self.alice, date=date(2026, 3, 2), check_in=time(9, 0))
+        Attendance.objects.create(email=self.alice, date=date(2026, 3, 3), check_in=time(9, 0), location_type='work')
+        AbsentEmployeeDetails.objects.create(email=self.alice, date=date(2026, 3, 11))
+        AbsentEmployeeDetails.objects.create(email=self.alice, date=date(2026, 3, 4))
+        # Starts in February; present days inside it win over the leave
+        Leave.objects.create(email=self.alice, start_date=date(2026, 2, 27), end_date=date(2026, 3, 5), status='Approved')
+        Leave.objects.create(email=self.alice, start_date=date(2026, 3, 12), end_date=date(2026, 3, 12), status='Pending')
+        Leave.objects.create(email=self.bob, start_date=date(2026, 3, 30), end_date=date(2026, 4, 2), status='Approved')
+
+    def test_statuses_by_precedence(self):
+        employees, days, matrix = build_status_matrix(*MARCH)
+        self.assertEqual([row['email_id'] for row in employees], ['alice@example.com', 'bob@example.com'])
+        self.assertEqual(matrix.shape, (2, 31))
+        alice = list(matrix[0])
+        # Mar 1 is a Sunday inside the leave, Mar 2 / 3 checked in, Mar 4 absent under the leave
+        self.assertEqual(alice[:6], [status_matrix.LEAVE, status_matrix.PRESENT, status_matrix.WFH,
+                                     status_matrix.LEAVE, status_matrix.LEAVE, status_matrix.NONE])
+        self.assertEqual(alice[7], status_matrix.WEEKEND)
+        self.assertEqual(alice[9], status_matrix.HOLIDAY)
+        self.assertEqual(alice[10], status_matrix.ABSENT)
+        self.assertEqual(alice[11], status_matrix.NONE)  # pending leave is not painted
+        # Bob's leave is clipped to the end of the month
+        self.assertEqual(list(matrix[1][28:]), [status_matrix.WEEKEND, status_matrix.LEAVE, status_matrix.LEAVE])
+        self.assertEqual(encode_rows(matrix)[0][:12], 'LPRLL..W.HA.')
+
+    def test_hr_and_managers_have_rows(self):
+        hr = User.objects.create(email='hr@example.com', role='HR', is_staff=True)
+        manager = User.objects.create(email='manager@example.com', role='Manager', is_staff=True)
+        User.objects.create(email='ceo@example.com', role='CEO', is_staff=True)
+        HR.objects.filter(email=hr).update(fullname='Hiro', department='Ops')
+        Manager.objects.filter(email=manager).update(fullname='Mia', department='Sales')
+        Attendance.objects.create(email=hr, date=date(2026, 3, 2), check_in=time(9, 0))
+        AbsentEmployeeDetails.objects.create(email=manager, date=date(2026, 3, 2))
+
+        employees, _, matrix = build_status_matrix(*MARCH)
+        self.assertEqual([row['email_id'] for row in employees],
+                         ['alice@example.com', 'bob@example.com', 'hr@example.com', 'manager@example.com'])
+        self.assertEqual(employees[2], {'email_id': 'hr@example.com', 'fullname': 'Hiro', 'department': 'Ops'})
+        self.assertEqual((matrix[2][1], matrix[3][1]), (status_matrix.PRESENT, status_matrix.ABSENT))
+
+        employees, _, _ = build_status_matrix(*MARCH, department='Ops')
+        self.assertEqual([row['email_id'] for row in employees], ['bob@example.com', 'hr@example.com'])
+
+    def test_department_filter(self):
+        employees, _, matrix = build_status_matrix(*MARCH, department='Ops')
+        self.assertEqual([row['email_id'] for row in employees], ['bob@example.com'])
+        self.assertEqual(matrix.shape, (1, 31))
+
+    def test_endpoint_encodings(self):
+        response = self.client.get('/api/accounts/attendance/matrix/', {'year': 2026, 'month': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['rows'][0][:3], 'LPR')
+        response = self.client.get('/api/accounts/attendance/matrix/', {'year': 2026, 'month': 3, 'encoding': 'base64'})
+        body = response.json()
+        raw = np.frombuffer(base64.b64decode(body['matrix']), dtype=np.int8).reshape(body['shape'])
+        self.assertEqual(int(raw[0][1]), status_matrix.PRESENT)
+        self.assertEqual(self.client.get('/api/accounts/attendance/matrix/', {'month': 13}).status_code, 400)
+
+
+# ------------------- EMPLOYEE CALENDAR -------------------
+class EmployeeCalendarTests(TestCase):
+    url = '/api/accounts/calendar/frank@example.com/'
+    params = {'from': '2026-03-01', 'to': '2026-03-12'}
+
+    def setUp(self):
+        cache.clear()
+        self.user = make_employee('frank@example.com')
+        Holiday.objects.create(name='Holiday', date=date(2026, 3, 10), type='Public', year=2026, month=3)
+        Attendance.objects.create(email=self.user, date=date(2026, 3, 2), check_in=time(9, 0), location_type='work')
+        AbsentEmployeeDetails.objects.create(email=self.user, date=date(2026, 3, 3))
+        Leave.objects.create(email=self.user, start_date=date(2026, 3, 4), end_date=date(2026, 3, 5),
+                             status='Approved', leave_type='Sick')
+        Leave.objects.create(email=self.user, start_date=date(2026, 3, 11), end_date=date(2026, 3, 11), status='Pending')
+        Leave.objects.create(email=self.user, start_date=date(2026, 3, 12), end_date=date(2026, 3, 12), status='Rejected')
+
+    def test_sources_are_merged_by_date(self):
+        days = build_calendar('frank@example.com', date(2026, 3, 1), date(2026, 3, 12))
+        self.assertEqual(len(days), 12)
+        self.assertEqual(days['2026-03-01']['status'], 'weekend')
+        self.assertEqual(days['2026-03-02']['status'], 'wfh')
+        self.assertEqual(days['2026-03-02']['attendance']['check_in'], '09:00:00')
+        self.assertEqual(days['2026-03-03']['status'], 'absent')
+        self.assertEqual(days['2026-03-04']['status'], 'leave')
+        self.assertEqual(days['2026-03-05']['leave']['leave_type'], 'Sick')
+        self.assertEqual(days['2026-03-10']['holiday']['name'], 'Holiday')
+        # A pending leave is shown but does not change the status; a rejected one is left out
+        self.assertEqual((days['2026-03-11']['status'], days['2026-03-11']['leave']['status']), ('none', 'Pending'))
+        self.assertIsNone(days['2026-03-12']['leave'])
+
+    def test_etag_revalidation(self):
+        response = self.client.get(self.url, self.params)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        response = self.client.get(self.url, self.params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Attendance.objects.create(email=self.user, date=date(2026, 3, 6), check_in=time(9, 0))
+        response = self.client.get(self.url, self.params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['days']['2026-03-06']['status'], 'present')
+
+    def test_invalid_ranges(self):
+        self.assertEqual(self.client.get(self.url, {'from': '2026-03-05', 'to': '2026-03-01'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'from': '2025-01-01', 'to': '2026-03-01'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'from': 'yesterday'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'from': '2026-02-30'}).status_code, 400)
+
+
+# ------------------- USER UIDS -------------------
+class UserUidTests(TestCase):
+    def test_new_users_get_increasing_uids(self):
+        first, second = make_employee('lena@example.com'), make_employee('mark@example.com')
+        self.assertIsNotNone(first.uid)
+        self.assertEqual(second.uid, first.uid + 1)
+
+        first.role = 'HR'
+        first.save(update_fields=['role'])
+        first.refresh_from_db()
+        self.assertEqual(first.uid, second.uid - 1)
+
+    def test_attendance_copies_the_owner_uid(self):
+        user = make_employee('lena@example.com')
+        row = Attendance.objects.create(email=user, date=date(2026, 3, 2))
+        self.assertEqual(Attendance.objects.get(pk=row.pk).user_uid, user.uid)
+
+        other = make_employee('mark@example.com')
+        row.email = other
+        row.save()
+        self.assertEqual(Attendance.objects.get(pk=row.pk).user_uid, other.uid)
+
+
+# ------------------- EMAIL OUTBOX -------------------
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend', EMAIL_OUTBOX_WORKER=False)
+class EmailOutboxTests(TestCase):
+    def queue(self, subject='Hello'):
+        return outbox.enqueue_email(subject, 'Body', 'to@example.com', attachments=[('a.txt', b'data', 'text/plain')])
+
+    def test_drain_sends_over_one_connection(self):
+        first, second = self.queue('One'), self.queue('Two')
+        with mock.patch.object(outbox, 'get_connection', wraps=outbox.get_connection) as get_connection:
+            self.assertEqual(outbox.drain_outbox(), (2, 0))
+        self.assertEqual(get_connection.call_count, 1)
+        self.assertEqual(sorted(message.subject for message in mail.outbox), ['One', 'Two'])
+        self.assertEqual(mail.outbox[0].attachments[0][:2], ('a.txt', 'data'))
+        first.refresh_from_db()
+        self.assertEqual((first.status, first.attempts), (OutboundEmail.STATUS_SENT, 1))
+        self.assertEqual(outbox.drain_outbox(), (0, 0))
+
+    def test_claimed_rows_are_leased(self):
+        row = self.queue()
+        claimed = outbox.claim_batch()
+        self.assertEqual([r.pk for r in claimed], [row.pk])
+        row.refresh_from_db()
+        self.assertEqual(row.status, OutboundEmail.STATUS_SENDING)
+        self.assertGreater(row.next_attempt_at, timezone.now())
+        self.assertEqual(outbox.claim_batch(), [])
+
+        # An expired lease (crashed worker) is claimed again
+        OutboundEmail.objects.filter(pk=row.pk).update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual([r.pk for r in outbox.claim_batch()], [row.pk])
+
+    def test_row_claimed_by_another_worker_is_not_sent(self):
+        self.queue()
+        claimed = outbox.claim_batch()
+        # Our lease ran out and another worker took the row with its own lease
+        OutboundEmail.objects.filter(pk=claimed[0].pk).update(next_attempt_at=timezone.now() + timedelta(minutes=9))
+        self.assertFalse(outbox.renew_lease(claimed[0]))
+
+        with mock.patch.object(outbox, 'claim_batch', return_value=claimed):
+            self.assertEqual(outbox.drain_outbox(), (0, 0))
+        self.assertEqual(mail.outbox, [])
+
+    def test_failures_back_off_then_give_up(self):
+        row = self.queue()
+        connection = mock.Mock()
+        connection.send_messages.side_effect = OSError('connection reset')
+        with mock.patch.object(outbox, 'get_connection', return_value=connection):
+            self.assertEqual(outbox.drain_outbox(), (0, 1))
+            row.refresh_from_db()
+            self.assertEqual((row.status, row.attempts, row.last_error), (OutboundEmail.STATUS_PENDING, 1, 'connection reset'))
+            self.assertGreater(row.next_attempt_at, timezone.now() + timedelta(seconds=25))
+
+            OutboundEmail.objects.filter(pk=row.pk).update(
+                attempts=outbox.MAX_ATTEMPTS - 1, next_attempt_at=timezone.now(),
+            )
+            self.assertEqual(outbox.drain_outbox(), (0, 1))
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.attempts), (OutboundEmail.STATUS_FAILED, outbox.MAX_ATTEMPTS))
+        self.assertEqual(outbox.claim_batch(), [])
+
+
+# ------------------- STORAGE DELETION JOBS -------------------
+class StorageDeletionJobTests(TestCase):
+    def setUp(self):
+        self.client_mock = mock.Mock()
+        self.client_mock.get_paginator.return_value.paginate.return_value = [
+            {'Contents': [{'Key': f'images/gone@example.com/{i}.png'} for i in range(600)]},
+            {'Contents': [{'Key': 'images/gone@example.com/last.png'}]},
+        ]
+        self.client_mock.delete_objects.return_value = {}
+        # Jobs close their connection when done, which would end the test's transaction
+        for patcher in (
+            mock.patch.object(object_cleanup, 'get_s3_client', return_value=self.client_mock),
+            mock.patch.object(object_cleanup, 'close_old_connections'),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def make_job(self, **fields):
+        return StorageDeletionJob.objects.create(
+            reason='user', email='gone@example.com',
+            keys=[f'documents/gone/{i}.pdf' for i in range(1500)], prefixes=['images/gone@example.com/'],
+            **fields,
+        )
+
+    def deleted_batches(self):
+        return [
+            [item['Key'] for item in call.kwargs['Delete']['Objects']]
+            for call in self.client_mock.delete_objects.call_args_list
+        ]
+
+    def test_keys_and_prefixes_are_deleted_in_batches(self):
+        job = self.make_job()
+        self.client_mock.delete_objects.side_effect = [
+            {'Errors': [{'Key': 'documents/gone/0.pdf', 'Code': 'AccessDenied', 'Message': 'no'}]}, {}, {},
+        ]
+        object_cleanup.run_deletion_job(job.pk)
+
+        batches = self.deleted_batches()
+        self.assertEqual([len(batch) for batch in batches], [1000, 1000, 101])
+        self.assertEqual(len({key for batch in batches for key in batch}), 2101)
+        job.refresh_from_db()
+        self.assertEqual(job.status, StorageDeletionJob.STATUS_DONE)
+        self.assertEqual((job.total_keys, job.deleted_count, job.error_count), (2101, 2100, 1))
+        self.assertEqual(job.errors[0]['code'], 'AccessDenied')
+
+    def test_job_runs_once(self):
+        job = self.make_job()
+        object_cleanup.run_deletion_job(job.pk)
+        object_cleanup.run_deletion_job(job.pk)
+        self.assertEqual(self.client_mock.delete_objects.call_count, 3)
+
+    def test_stale_running_job_is_requeued_and_rerun(self):
+        stale = self.make_job(
+            status=StorageDeletionJob.STATUS_RUNNING, started_at=timezone.now() - timedelta(hours=2),
+            deleted_count=1000,
+        )
+        StorageDeletionJob.objects.filter(pk=stale.pk).update(created_at=timezone.now() - timedelta(hours=2))
+        live = self.make_job(status=StorageDeletionJob.STATUS_RUNNING, started_at=timezone.now())
+
+        self.assertEqual(object_cleanup.run_pending_deletion_jobs(), [stale.pk])
+        stale.refresh_from_db()
+        self.assertEqual((stale.status, stale.deleted_count), (StorageDeletionJob.STATUS_DONE, 2101))
+        live.refresh_from_db()
+        self.assertEqual(live.status, StorageDeletionJob.STATUS_RUNNING)
+
+
+# ------------------- FACE CROPS -------------------
+class FaceCropTests(SimpleTestCase):
+    def photo_with_face(self, size, box):
+        # A white photo with the "face" painted red at `box` (left, top, right, bottom)
+        image = Image.new('RGB', size, 'white')
+        image.paste((255, 0, 0), box)
+        return image
+
+    def crop_for(self, size, box):
+        left, top, right, bottom = box
+        with mock.patch('face_recognition.face_locations', return_value=[(top, right, bottom, left)]):
+            data, location = image_derivatives.make_face_crop(self.photo_with_face(size, box))
+        return Image.open(io.BytesIO(data)).convert('RGB'), location
+
+    def assert_location_is_the_face(self, crop, location):
+        top, right, bottom, left = location
+        self.assertEqual(crop.size, (image_derivatives.FACE_CROP_SIZE, image_derivatives.FACE_CROP_SIZE))
+        red, green, _ = crop.getpixel(((left + right) // 2, (top + bottom) // 2))
+        self.assertGreater(red, 200)
+        self.assertLess(green, 60)
+        # Just outside the box on each side is background again
+        for point in ((left - 4, (top + bottom) // 2), (right + 3, (top + bottom) // 2),
+                      ((left + right) // 2, top - 4), ((left + right) // 2, bottom + 3)):
+            if 0 <= point[0] < crop.width and 0 <= point[1] < crop.height:
+                self.assertGreater(crop.getpixel(point)[1], 190, point)
+
+    def test_centered_face(self):
+        crop, location = self.crop_for((600, 600), (250, 250, 350, 350))
+        self.assertEqual(location, (33, 167, 167, 33))
+        self.assert_location_is_the_face(crop, location)
+
+    def test_face_near_the_corner(self):
+        crop, location = self.crop_for((1000, 600), (5, 10, 105, 110))
+        top, right, bottom, left = location
+        self.assertLess(left, 20)
+        self.assertLess(top, 20)
+        self.assert_location_is_the_face(crop, location)
+
+    def test_face_box_round_trips_through_metadata(self):
+        self.assertEqual(image_derivatives.decode_face_box(image_derivatives.encode_face_box((1, 2, 3, 4))), (1, 2, 3, 4))
+        self.assertIsNone(image_derivatives.decode_face_box(None))
+        self.assertIsNone(image_derivatives.decode_face_box('1,2'))
+
+    @override_settings(BASE_BUCKET_URL='http://minio/bucket/')
+    def test_reference_encodings_use_the_stored_face_box(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (200, 200)).save(buffer, format='WEBP')
+        client = mock.Mock()
+        client.exceptions.ClientError = ClientError
+        client.get_object.return_value = {'Body': io.BytesIO(buffer.getvalue()), 'Metadata': {'face-box': '10,150,160,5'}}
+        with mock.patch.object(image_derivatives, 'get_s3_client', return_value=client), \
+                mock.patch('face_recognition.face_encodings', return_value=['encoding']) as face_encodings:
+            self.assertEqual(image_derivatives.reference_face_encodings('http://minio/bucket/images/a/p.png'), ['encoding'])
+        self.assertEqual(client.get_object.call_args.kwargs['Key'], 'images/a/p.face.webp')
+        self.assertEqual(face_encodings.call_args.kwargs['known_face_locations'], [(10, 150, 160, 5)])
+
+    @override_settings(BASE_BUCKET_URL='http://minio/bucket/')
+    def test_missing_crop_falls_back_to_the_original(self):
+        client = mock.Mock()
+        client.exceptions.ClientError = ClientError
+        client.get_object.side_effect = ClientError({'Error': {'Code': '404'}}, 'GetObject')
+        buffer = io.BytesIO()
+        Image.new('RGB', (50, 50)).save(buffer, format='PNG')
+        original = mock.Mock(status_code=200, content=buffer.getvalue())
+        with mock.patch.object(image_derivatives, 'get_s3_client', return_value=client), \
+                mock.patch('requests.get', return_value=original) as get, \
+                mock.patch('face_recognition.face_encodings', return_value=[]) as face_encodings:
+            image_derivatives.reference_face_encodings('http://minio/bucket/images/a/p.png')
+        get.assert_called_once()
+        self.assertNotIn('known_face_locations', face_encodings.call_args.kwargs)
+
+
+class FakeS3:
+    """In-memory stand-in for the few S3 client calls the storage jobs make."""
+
+    def __init__(self, objects=None):
+        self.objects = dict(objects or {})
+        self.deleted_batches = []
+
+    def get_paginator(self, operation):
+        fake = self
+
+        class Paginator:
+            def paginate(self, Bucket, Prefix='', Delimiter=None):
+                keys = sorted(key for key in fake.objects if key.startswith(Prefix))
+                if Delimiter:
+                    prefixes = sorted({
+                        Prefix + key[len(Prefix):].split(Delimiter, 1)[0] + Delimiter
+                        for key in keys if Delimiter in key[len(Prefix):]
+                    })
+                    return [{'CommonPrefixes': [{'Prefix': prefix} for prefix in prefixes]}]
+                return [{'Contents': [{'Key': key} for key in keys]}]
+
+        return Paginator()
+
+    def get_object(self, Bucket, Key):
+        return {'Body': io.BytesIO(self.objects[Key])}
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.objects[Key] = Body
+
+    def delete_objects(self, Bucket, Delete):
+        keys = [item['Key'] for item in Delete['Objects']]
+        self.deleted_batches.append(keys)
+        for key in keys:
+            self.objects.pop(key, None)
+        return {}
+
+
+def jpeg_bytes(size=(1200, 900)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'blue').save(buffer, format='JPEG', quality=95)
+    return buffer.getvalue()
+
+
+# ------------------- PHOTO RETENTION -------------------
+@override_settings(BASE_BUCKET_URL='http://minio/bucket/')
+class PhotoRetentionTests(TestCase):
+    base = 'http://minio/bucket/'
+
+    def setUp(self):
+        self.user = make_employee('gina@example.com')
+        today = timezone.localdate()
+        self.old_day = today - timedelta(days=40)
+        self.expired_day = today - timedelta(days=400)
+        self.recent_day = today - timedelta(days=2)
+
+        def photo_key(day, name):
+            return f'attendance/{day.isoformat()}/gina@example.com/{name}.jpg'
+
+        self.check_in = photo_key(self.old_day, 'in')
+        self.check_out = photo_key(self.old_day, 'out')
+        self.orphan = photo_key(self.old_day, 'orphan')  # no row points at it
+        self.expired = photo_key(self.expired_day, 'in')
+        self.recent = photo_key(self.recent_day, 'in')
+        self.s3 = FakeS3({key: jpeg_bytes() for key in (self.check_in, self.check_out, self.orphan, self.expired, self.recent)})
+
+        self.row = Attendance.objects.create(
+            email=self.user, date=self.old_day,
+            check_in_photo=self.base + self.check_in, check_out_photo=self.base + self.check_out,
+        )
+        self.expired_row = Attendance.objects.create(
+            email=self.user, date=self.expired_day, check_in_photo=self.base + self.expired,
+        )
+        patcher = mock.patch.object(photo_retention, 'get_s3_client', return_value=self.s3)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_retention(self, **kwargs):
+        return photo_retention.run_photo_retention(recompress_after_days=30, delete_after_days=365, **kwargs)
+
+    def test_rows_are_rewritten_before_originals_are_deleted(self):
+        delete_objects = self.s3.delete_objects
+
+        def checked_delete(Bucket, Delete):
+            for item in Delete['Objects']:
+                if item['Key'].startswith(f'attendance/{self.old_day.isoformat()}/'):
+                    # The row already points at the WebP copy when its original goes
+                    self.assertFalse(Attendance.objects.filter(check_in_photo=self.base + item['Key']).exists())
+                    self.assertFalse(Attendance.objects.filter(check_out_photo=self.base + item['Key']).exists())
+            return delete_objects(Bucket, Delete)
+
+        self.s3.delete_objects = checked_delete
+        stats = self.run_retention()
+
+        self.row.refresh_from_db()
+        self.assertEqual(self.row.check_in_photo, self.base + self.check_in[:-4] + '.webp')
+        self.assertEqual(self.row.check_out_photo, self.base + self.check_out[:-4] + '.webp')
+        self.assertNotIn(self.check_in, self.s3.objects)
+        self.assertNotIn(self.check_out, self.s3.objects)
+        self.assertLess(len(self.s3.objects[self.check_in[:-4] + '.webp']), len(jpeg_bytes()))
+        self.assertEqual((stats['recompressed'], stats['rows_rewritten'], stats['kept']), (3, 1, 1))
+
+    def test_original_without_a_row_is_kept_and_not_redone(self):
+        self.run_retention()
+        self.assertIn(self.orphan, self.s3.objects)
+        self.assertIn(self.orphan[:-4] + '.webp', self.s3.objects)
+        stats = self.run_retention()
+        self.assertEqual(stats['recompressed'], 0)
+
+    def test_expired_days_are_cleared_and_deleted(self):
+        stats = self.run_retention()
+        self.expired_row.refresh_from_db()
+        self.assertIsNone(self.expired_row.check_in_photo)
+        self.assertNotIn(self.expired, self.s3.objects)
+        self.assertIn(self.recent, self.s3.objects)
+        self.assertEqual((stats['rows_cleared'], stats['deleted']), (1, 1))
+
+    def test_dry_run_touches_nothing(self):
+        objects = dict(self.s3.objects)
+        stats = self.run_retention(dry_run=True)
+        self.assertEqual(stats['recompressed_days'], [self.old_day.isoformat()])
+        self.assertEqual(stats['expired_days'], [self.expired_day.isoformat()])
+        self.assertEqual(self.s3.objects, objects)
+
+
+# ------------------- LETTER JOBS -------------------
+@override_settings(EMAIL_OUTBOX_WORKER=False, BASE_BUCKET_URL='http://minio/bucket/')
+class LetterJobTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        make_employee('hana@example.com')
+        Employee.objects.filter(email_id='hana@example.com').update(fullname='Hana Ito', department='Finance')
+        self.s3 = FakeS3()
+        for name, value in (('get_s3_client', self.s3), ('render_pdf', b'%PDF-1.4 letter')):
+            patcher = mock.patch.object(letters, name, return_value=value)
+            self.addCleanup(patcher.stop)
+            setattr(self, name, patcher.start())
+        # Jobs close their connection when done, which would end the test's transaction
+        patcher = mock.patch.object(letters, 'close_old_connections')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_one_render_is_stored_and_attached(self):
+        job = LetterJob.objects.create(kind='offer_letter', email='hana@example.com')
+        letters.run_letter_job(job.pk)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, LetterJob.STATUS_DONE)
+        self.assertEqual(job.file_url, 'http://minio/bucket/documents/hana/offer_letter.pdf')
+        self.assertEqual(self.render_pdf.call_count, 1)
+        self.assertEqual(self.s3.objects['documents/hana/offer_letter.pdf'], b'%PDF-1.4 letter')
+        self.assertEqual(Document.objects.get(email_id='hana@example.com').offer_letter, job.file_url)
+        attachment = OutboundEmail.objects.get(to=['hana@example.com']).attachments[0]
+        self.assertEqual(base64.b64decode(attachment['content']), b'%PDF-1.4 letter')
+
+    def test_job_runs_once(self):
+        job = LetterJob.objects.create(kind='offer_letter', email='hana@example.com')
+        letters.run_letter_job(job.pk)
+        letters.run_letter_job(job.pk)
+        self.assertEqual(OutboundEmail.objects.count(), 1)
+
+    def test_unknown_employee_fails_the_job(self):
+        job = LetterJob.objects.create(kind='offer_letter', email='nobody@example.com')
+        letters.run_letter_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (LetterJob.STATUS_FAILED, 'Employee not found'))
+
+    def test_stale_running_job_is_requeued_and_rerun(self):
+        stale = LetterJob.objects.create(
+            kind='offer_letter', email='hana@example.com',
+            status=LetterJob.STATUS_RUNNING, started_at=timezone.now() - timedelta(hours=1),
+        )
+        LetterJob.objects.filter(pk=stale.pk).update(created_at=timezone.now() - timedelta(hours=1))
+        live = LetterJob.objects.create(
+            kind='offer_letter', email='hana@example.com',
+            status=LetterJob.STATUS_RUNNING, started_at=timezone.now(),
+        )
+
+        self.assertEqual(letters.run_pending_letter_jobs(), [stale.pk])
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, LetterJob.STATUS_DONE)
+        live.refresh_from_db()
+        self.assertEqual(live.status, LetterJob.STATUS_RUNNING)
+
+    def test_stale_running_batch_is_requeued(self):
+        stale = LetterBatch.objects.create(
+            kind='offer_letter', filters={'emails': ['hana@example.com']},
+            status=LetterBatch.STATUS_RUNNING, started_at=timezone.now() - timedelta(hours=4),
+        )
+        live = LetterBatch.objects.create(
+            kind='offer_letter', filters={'emails': ['hana@example.com']},
+            status=LetterBatch.STATUS_RUNNING, started_at=timezone.now() - timedelta(hours=1),
+        )
+        self.assertEqual(requeue_stale_running(LetterBatch, letters.STALE_BATCH_RUNNING_AFTER), 1)
+        stale.refresh_from_db()
+        self.assertEqual((stale.status, stale.started_at), (LetterBatch.STATUS_QUEUED, None))
+        live.refresh_from_db()
+        self.assertEqual(live.status, LetterBatch.STATUS_RUNNING)
+
+
+# ------------------- LETTER BATCHES -------------------
+class LetterBatchFilterTests(SimpleTestCase):
+    def test_emails_are_split_deduplicated_and_sorted(self):
+        self.assertEqual(
+            letters.parse_batch_filters({'emails': 'b@example.com, a@example.com,,b@example.com'}),
+            {'emails': ['a@example.com', 'b@example.com']},
+        )
+
+    def test_department_and_join_range(self):
+        self.assertEqual(
+            letters.parse_batch_filters({'department': ' Finance ', 'joined_from': '2026-01-01', 'joined_to': '2026-03-31'}),
+            {'department': 'Finance', 'joined_from': '2026-01-01', 'joined_to': '2026-03-31'},
+        )
+
+    def test_bad_or_missing_criteria_are_rejected(self):
+        with self.assertRaisesMessage(ValueError, 'joined_from must be a date'):
+            letters.parse_batch_filters({'joined_from': '01/02/2026'})
+        with self.assertRaises(ValueError):
+            letters.parse_batch_filters({'emails': []})
+
+
+@override_settings(EMAIL_OUTBOX_WORKER=False, BASE_BUCKET_URL='http://minio/bucket/')
+class LetterBatchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        for email, department, joined in (
+            ('ida@example.com', 'Finance', date(2026, 1, 5)),
+            ('jon@example.com', 'Finance', date(2026, 3, 2)),
+            ('kim@example.com', 'Sales', date(2026, 1, 5)),
+        ):
+            make_employee(email)
+            Employee.objects.filter(email_id=email).update(fullname=email, department=department, date_joined=joined)
+        Document.objects.create(email_id='ida@example.com', resume='http://minio/bucket/resume.pdf')
+        self.s3 = FakeS3()
+        for patcher in (
+            mock.patch.object(letters, 'get_s3_client', return_value=self.s3),
+            mock.patch.object(letters, 'render_pdf', side_effect=lambda html, backend=None: html.encode()),
+            # Threads instead of spawned processes, so the patched renderer is used
+            mock.patch.object(letters, 'ProcessPoolExecutor', lambda max_workers, mp_context: ThreadPoolExecutor(max_workers)),
+            # Batches close their connection when done, which would end the test's transaction
+            mock.patch.object(letters, 'close_old_connections'),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def run_batch(self, filters, send_email=False):
+        batch = LetterBatch.objects.create(kind='bonafide_certificate', filters=filters, send_email=send_email)
+        letters.run_letter_batch(batch.pk, processes=2)
+        batch.refresh_from_db()
+        return batch
+
+    def test_endpoint_only_queues_and_the_scheduler_runs_it(self):
+        with mock.patch.object(letters, 'letter_pool') as letter_pool:
+            with self.captureOnCommitCallbacks(execute=True):
+                batch = letters.schedule_letter_batch('bonafide_certificate', {'department': 'Finance'}, send_email=False)
+        letter_pool.assert_not_called()
+        self.assertEqual(batch.status, LetterBatch.STATUS_QUEUED)
+
+        self.assertEqual(letters.run_pending_letter_batches(), [batch.pk])
+        batch.refresh_from_db()
+        self.assertEqual((batch.status, batch.done_count), (LetterBatch.STATUS_DONE, 2))
+
+    def test_department_filter_builds_one_zip_and_bulk_documents(self):
+        batch = self.run_batch({'department': 'finance'})
+
+        self.assertEqual(batch.status, LetterBatch.STATUS_DONE)
+        self.assertEqual((batch.total, batch.done_count, batch.failed_count), (2, 2, 0))
+        self.assertEqual(batch.zip_url, f'http://minio/bucket/letters/batches/{batch.pk}/bonafide_certificate.zip')
+        archive = zipfile.ZipFile(io.BytesIO(self.s3.objects[f'letters/batches/{batch.pk}/bonafide_certificate.zip']))
+        self.assertEqual(archive.namelist(), ['ida_bonafide_crt.pdf', 'jon_bonafide_crt.pdf'])
+        self.assertEqual(archive.read('jon_bonafide_crt.pdf'), self.s3.objects['documents/jon/bonafide_crt.pdf'])
+
+        ida = Document.objects.get(email_id='ida@example.com')
+        self.assertEqual(ida.resume, 'http://minio/bucket/resume.pdf')
+        self.assertEqual(ida.bonafide_crt, 'http://minio/bucket/documents/ida/bonafide_crt.pdf')
+        self.assertEqual(Document.objects.get(email_id='jon@example.com').bonafide_crt, 'http://minio/bucket/documents/jon/bonafide_crt.pdf')
+        self.assertFalse(Document.objects.filter(email_id='kim@example.com').exists())
+        self.assertEqual(OutboundEmail.objects.count(), 0)
+
+    def test_join_range_and_emails(self):
+        batch = self.run_batch({'joined_from': '2026-01-01', 'joined_to': '2026-01-31'}, send_email=True)
+        self.assertEqual(batch.done_count, 2)
+        self.assertEqual(sorted(row.to[0] for row in OutboundEmail.objects.all()), ['ida@example.com', 'kim@example.com'])
+
+        batch = self.run_batch({'emails': ['kim@example.com', 'nobody@example.com']})
+        self.assertEqual((batch.total, batch.done_count), (1, 1))
+
+    def test_failed_upload_is_recorded_and_left_out_of_the_zip(self):
+        put_object = self.s3.put_object
+
+        def flaky_put(Bucket, Key, Body, **kwargs):
+            if Key.startswith('documents/ida/'):
+                raise OSError('connection reset')
+            return put_object(Bucket, Key, Body, **kwargs)
+
+        self.s3.put_object = flaky_put
+        batch = self.run_batch({'department': 'Finance'})
+
+        self.assertEqual((batch.done_count, batch.failed_count), (1, 1))
+        self.assertEqual(batch.errors, [{'email': 'ida@example.com', 'error': 'connection reset'}])
+        archive = zipfile.ZipFile(io.BytesIO(self.s3.objects[f'letters/batches/{batch.pk}/bonafide_certificate.zip']))
+        self.assertEqual(archive.namelist(), ['jon_bonafide_crt.pdf'])
+        self.assertIsNone(Document.objects.get(email_id='ida@example.com').bonafide_crt)
+
+
+# ------------------- PDF RENDERING CACHE -------------------
+@override_settings(PDF_BACKEND='xhtml2pdf')
+class PdfCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(letters, 'render_pdf', side_effect=lambda html, backend=None: html.encode())
+        self.render_pdf = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_key_depends_on_html_and_backend(self):
+        self.assertEqual(content_hash('<p>a</p>', 'xhtml2pdf'), content_hash('<p>a</p>'))
+        self.assertNotEqual(content_hash('<p>a</p>', 'xhtml2pdf'), content_hash('<p>b</p>', 'xhtml2pdf'))
+        self.assertNotEqual(content_hash('<p>a</p>', 'xhtml2pdf'), content_hash('<p>a</p>', 'weasyprint'))
+        with self.assertRaises(PdfRenderError):
+            get_backend('nope')
+
+    def test_unchanged_letter_is_not_rendered_again(self):
+        self.assertEqual(letters.cached_pdf('<p>a</p>'), b'<p>a</p>')
+        self.assertEqual(letters.cached_pdf('<p>a</p>'), b'<p>a</p>')
+        self.assertEqual(self.render_pdf.call_count, 1)
+
+        letters.cached_pdf('<p>b</p>')
+        with override_settings(PDF_BACKEND='weasyprint'):
+            letters.cached_pdf('<p>a</p>')
+        self.assertEqual(self.render_pdf.call_count, 3)
+
+    def test_batches_reuse_cached_pdfs(self):
+        letters.cached_pdf('<p>a</p>')
+        with mock.patch.object(letters, 'ProcessPoolExecutor', lambda max_workers, mp_context: ThreadPoolExecutor(max_workers)):
+            pdfs, errors = letters.render_pdfs({'a': '<p>a</p>', 'b': '<p>b</p>'}, processes=2)
+            self.assertEqual((pdfs, errors), ({'a': b'<p>a</p>', 'b': b'<p>b</p>'}, {}))
+            self.assertEqual(self.render_pdf.call_count, 2)
+
+            self.assertEqual(letters.render_pdfs({'a': '<p>a</p>', 'b': '<p>b</p>'})[0], pdfs)
+        self.assertEqual(self.render_pdf.call_count, 2)
@@ -0,0 +1,225 @@
+"""
+Maintained "today" attendance board.
+
+The board for the current IST day lives in the shared cache as one entry:
+
+    {"date": "YYYY-MM-DD",
+     "present":     {email: row},   # checked in, not yet out
+     "checked_out": {email: row},
+     "absent":      {email: row},
+     "on_leave":    {email: row},
+     "departments": {department: {"present": n, "checked_out": n, "absent": n, "on_leave": n}}}
+
+It is built from the database once (first read of the day, or the midnight
+job) and afterwards patched by signals on Attendance, AbsentEmployeeDetails and
+Leave, so reading it costs no queries. Keys are per IST date, so the board
+resets itself at IST midnight. Rebuilds and read-modify-writes are serialised
+with a short cache lock; a patch that cannot take the lock drops the board so
+the next read rebuilds it, and a rebuild that cannot take it serves the board
+the lock holder stored (or builds one for that read only) without writing.
+"""
+
+import logging
+import time
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .exports import with_profile_columns
+from .models import Attendance, AbsentEmployeeDetails, Leave
+from .realtime import board_date, attendance_event_row, absence_event_row
+
+logger = logging.getLogger(__name__)
+
+BOARD_SETS = ("present", "checked_out", "absent", "on_leave")
+
+# Safety net: even without writes, rebuild from the database this often
+BOARD_TIMEOUT = 60 * 10
+
+_LOCK_TIMEOUT = 5
+_LOCK_WAIT = 2.0
+
+
+def _board_key(day):
+    return f"today_board:{day.isoformat()}"
+
+
+def _lock_key(day):
+    return f"today_board_lock:{day.isoformat()}"
+
+
+def _acquire(day):
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + _LOCK_WAIT
+    while time.monotonic() < deadline:
+        if cache.add(_lock_key(day), token, _LOCK_TIMEOUT):
+            return token
+        time.sleep(0.01)
+    return None
+
+
+def _release(day, token):
+    if cache.get(_lock_key(day)) == token:
+        cache.delete(_lock_key(day))
+
+
+def _department_counts(board):
+    counts = {}
+    for name in BOARD_SETS:
+        for row in board[name].values():
+            department = row.get("department") or "Unassigned"
+            bucket = counts.setdefault(department, {key: 0 for key in BOARD_SETS})
+            bucket[name] += 1
+    board["departments"] = counts
+    return board
+
+
+def _leave_row(email, fullname, department, leave_type, start_date, end_date):
+    return {
+        "email": email,
+        "fullname": fullname,
+        "department": department,
+        "leave_type": leave_type,
+        "start_date": str(start_date),
+        "end_date": str(end_date),
+    }
+
+
+def _leaves_on(day, email=None):
+    leaves = Leave.objects.filter(status='Approved', start_date__lte=day, end_date__gte=day)
+    if email is not None:
+        leaves = leaves.filter(email_id=email)
+    return with_profile_columns(leaves).values_list(
+        'email_id', 'export_fullname', 'export_department', 'leave_type', 'start_date', 'end_date'
+    )
+
+
+def build_board(day):
+    """Build the board for `day` from the database (three queries)."""
+    board = {"date": str(day), **{name: {} for name in BOARD_SETS}}
+
+    for attendance in Attendance.objects.filter(date=day).select_related('email'):
+        target = "checked_out" if attendance.check_out else "present"
+        board[target][attendance.email_id] = attendance_event_row(attendance)
+
+    for absence in AbsentEmployeeDetails.objects.filter(date=day):
+        board["absent"][absence.email_id] = absence_event_row(absence)
+
+    for row in _leaves_on(day):
+        board["on_leave"][row[0]] = _leave_row(*row)
+
+    return _department_counts(board)
+
+
+def rebuild_board(day=None):
+    day = day or board_date()
+    token = _acquire(day)
+    if token is None:
+        # Another worker holds the lock (rebuilding or patching): use the board
+        # it leaves behind, and never write one without the lock.
+        board = cache.get(_board_key(day))
+        if board is None:
+            logger.warning("today board lock busy; serving an uncached board")
+            board = build_board(day)
+        return board
+    try:
+        board = build_board(day)
+        cache.set(_board_key(day), board, BOARD_TIMEOUT)
+        return board
+    finally:
+        _release(day, token)
+
+
+def get_board(day=None):
+    day = day or board_date()
+    board = cache.get(_board_key(day))
+    if board is None:
+        board = rebuild_board(day)
+    return board
+
+
+def board_view(board, department=None):
+    """Client shape of the board, optionally restricted to one department."""
+    if department:
+        sets = {
+            name: [row for row in board[name].values() if row.get("department") == department]
+            for name in BOARD_SETS
+        }
+        departments = {department: board["departments"].get(department, {key: 0 for key in BOARD_SETS})}
+    else:
+        sets = {name: list(board[name].values()) for name in BOARD_SETS}
+        departments = board["departments"]
+
+    return {
+        "date": board["date"],
+        **sets,
+        "counts": {name: len(rows) for name, rows in sets.items()},
+        "departments": departments,
+    }
+
+
+def _patch(day, mutate):
+    token = _acquire(day)
+    if token is None:
+        # Could not serialise the update: drop the board so the next read rebuilds it
+        logger.warning("today board lock busy; dropping board for rebuild")
+        cache.delete(_board_key(day))
+        return
+    try:
+        board = cache.get(_board_key(day))
+        if board is None:
+            return  # Next read builds it from the database, including this write
+        mutate(board)
+        cache.set(_board_key(day), _department_counts(board), BOARD_TIMEOUT)
+    finally:
+        _release(day, token)
+
+
+def _after_commit(day, mutate):
+    if day != board_date():
+        return
+    transaction.on_commit(lambda: _patch(day, mutate))
+
+
+# ------------------- WRITE PATH HOOKS (called from signals.py) -------------------
+def attendance_saved(attendance):
+    row = attendance_event_row(attendance)
+
+    def mutate(board):
+        board["present"].pop(row["email"], None)
+        board["checked_out"].pop(row["email"], None)
+        board["checked_out" if row["check_out"] else "present"][row["email"]] = row
+
+    _after_commit(attendance.date, mutate)
+
+
+def attendance_deleted(email, day):
+    def mutate(board):
+        board["present"].pop(email, None)
+        board["checked_out"].pop(email, None)
+
+    _after_commit(day, mutate)
+
+
+def absence_saved(absence):
+    row = absence_event_row(absence)
+    _after_commit(absence.date, lambda board: board["absent"].__setitem__(row["email"], row))
+
+
+def absence_deleted(email, day):
+    _after_commit(day, lambda board: board["absent"].pop(email, None))
+
+
+def leave_changed(email):
+    """A leave was added, reviewed or removed: recheck whether `email` is on leave today."""
+    day = board_date()
+
+    def mutate(board):
+        rows = list(_leaves_on(day, email=email)[:1])
+        if rows:
+            board["on_leave"][email] = _leave_row(*rows[0])
+        else:
+            board["on_leave"].pop(email, None)
+
+    _after_commit(day, mutate)
@@ -2,26 +2,28 @@ from django.urls import path
 from .views import raise_attendance_request, list_attendance_requests, review_attendance_request
 from accounts.views import (
     LoginView, CreateSuperUserView, SignupView, approve_user, reject_user,
-    today_attendance, RegisterView, list_attendance, DepartmentViewSet,
+    today_attendance, today_board_view, RegisterView, list_attendance, cache_stats_view, storage_metrics_view, storage_deletion_status, DepartmentViewSet,
     UserViewSet, EmployeeViewSet, HRViewSet, ManagerViewSet, AdminViewSet, CEOViewSet,
     apply_leave, update_leave_status, leaves_today, list_leaves,
-    create_payroll, update_payroll_status, get_payroll, list_payrolls,
+    create_payroll, run_payroll_view, working_days_view, update_payroll_status, get_payroll, list_payrolls,
     list_tasks, get_task, update_task, delete_task, create_task,
     list_reports, create_report, update_report, delete_report,
     list_projects, create_project, get_project, update_project, delete_project,
     list_notices, create_notice, detail_notice, update_notice, delete_notice,
     get_employee_by_email, get_tasks_by_assigned_by, get_attendance, get_absent_employee,
-    create_document, list_documents, get_document, update_document, delete_document,
+    create_document, list_documents, get_document, update_document, delete_document, presign_upload_view, confirm_upload_view,
     create_award, list_awards, get_award, update_award, delete_award,
     attendance_page, mark_office_attendance_view, mark_work_attendance_view, mark_absent_employees, RequestPasswordResetView, PasswordResetConfirmView,
-    appointment_letter, offer_letter, releaving_letter, bonafide_certificate, TicketViewSet, 
-    HolidayViewSet, list_absent_employees, CareerViewSet, AppliedJobViewSet, 
-    transfer_to_releaved, approve_releaved, list_releaved_employees, get_releaved_employee, create_pettycash, 
+    appointment_letter, offer_letter, releaving_letter, bonafide_certificate, letter_job_status, create_letter_batch, letter_batch_status, TicketViewSet, 
+    HolidayViewSet, list_absent_employees, attendance_summary, employee_attendance_summary, attendance_status_matrix, employee_calendar, CareerViewSet, AppliedJobViewSet, 
+    transfer_to_releaved, approve_releaved, list_releaved_employees, get_releaved_employee, list_releaved_attendance, create_pettycash, 
     list_pettycash, get_pettycash, update_pettycash, delete_pettycash,
     contact_view, geocoding_view,
     create_shift, list_shifts, get_shift, update_shift, delete_shift, bulk_create_shifts, bulk_delete_shifts,
     create_ot, list_ot, get_ot, update_ot, delete_ot,
-    create_break, list_breaks, get_break, update_break, delete_break
+    create_break, list_breaks, get_break, update_break, delete_break,
+    export_attendance, export_payrolls, export_leaves,
+    worked_hours_report
 )
 
 urlpatterns = [
@@ -57,11 +59,15 @@ urlpatterns = [
     path('update_leave/<int:leave_id>/', update_leave_status, name='update_leave_status'),
     path('leaves_today/', leaves_today, name='leaves_today'),
     path('list_leaves/', list_leaves, name='list_leaves'),
+    path('leaves/export/', export_leaves, name='export-leaves'),
 
     path('create_payroll/', create_payroll, name='create_payroll'),
+    path('payroll/run/', run_payroll_view, name='run-payroll'),
+    path('working_days/', working_days_view, name='working-days'),
     path('update_payroll/<int:payroll_id>/', update_payroll_status, name='update_payroll_status'),
     path('get_payroll/<path:email>/', get_payroll, name='get_payroll'),
     path('list_payrolls/', list_payrolls, name='list_payrolls'),
+    path('payrolls/export/', export_payrolls, name='export-payrolls'),
 
     path('list_tasks/', list_tasks, name='list_tasks'),
     path('get_task/<int:task_id>/', get_task, name='get_task'),
@@ -92,6 +98,8 @@ urlpatterns = [
     path('get_document/<str:email>/', get_document, name='get_document'),
     path('update_document/<str:email>/', update_document, name='update_document'),
     path('delete_document/<str:email>/', delete_document, name='delete_document'),
+    path('uploads/presign/', presign_upload_view, name='presign-upload'),
+    path('uploads/confirm/', confirm_upload_view, name='confirm-upload'),
 
     path('create_award/', create_award, name='create_award'),
     path('list_awards/', list_awards, name='list_awards'),
@@ -105,8 +113,14 @@ urlpatterns = [
     path('work_attendance/', mark_work_attendance_view, name='mark_work_attendance'),
     path('mark_absent/', mark_absent_employees, name='mark_absent_employees'),
     path("today_attendance/", today_attendance, name="today_attendance"),
+    path('attendance/today/board/', today_board_view, name='today-board'),
     path('list_attendance/', list_attendance, name='attendance-list'),
+    path('cache/stats/', cache_stats_view, name='cache-stats'),
+    path('storage/metrics/', storage_metrics_view, name='storage-metrics'),
+    path('storage/deletions/<int:pk>/', storage_deletion_status, name='storage-deletion-status'),
     path('get_attendance/<str:email>/', get_attendance, name='get_attendance'),
+    path('attendance/export/', export_attendance, name='export-attendance'),
+    path('worked-hours/', worked_hours_report, name='worked-hours'),
 
     path('password_reset/', RequestPasswordResetView.as_view(), name='password-reset'),
     path('password_reset_confirm/<uidb64>/<token>/', PasswordResetConfirmView.as_view(), name='password-reset-confirm'),
@@ -115,6 +129,9 @@ urlpatterns = [
     path('offer_letter/', offer_letter, name='offer_letter'),
     path('releaving_letter/', releaving_letter, name='releaving_letter'),
     path('bonafide_certificate/', bonafide_certificate, name='bonafide_certificate'),
+    path('letters/jobs/<int:pk>/', letter_job_status, name='letter-job-status'),
+    path('letters/batch/', create_letter_batch, name='letter-batch'),
+    path('letters/batch/<int:pk>/', letter_batch_status, name='letter-batch-status'),
 
     path('tickets/', TicketViewSet.as_view({'get': 'list','post': 'create'}), name='ticket-list'),
     path('tickets/<int:pk>/', TicketViewSet.as_view({'get': 'retrieve', 'patch': 'partial_update', 'delete': 'destroy'}), name='ticket-detail'),
@@ -122,6 +139,10 @@ urlpatterns = [
     path('holidays/', HolidayViewSet.as_view({'get': 'list', 'post': 'create'}), name='holiday-list'),
     path('holidays/<int:pk>/', HolidayViewSet.as_view({'get': 'retrieve', 'patch': 'partial_update', 'delete': 'destroy'}), name='holiday-detail'),
     path('list_absent/', list_absent_employees, name='list-absent-employees'),
+    path('attendance/summary/', attendance_summary, name='attendance-summary'),
+    path('attendance/summary/<str:email>/', employee_attendance_summary, name='employee-attendance-summary'),
+    path('attendance/matrix/', attendance_status_matrix, name='attendance-status-matrix'),
+    path('calendar/<str:email>/', employee_calendar, name='employee-calendar'),
     path('get_absent/<str:email>/', get_absent_employee, name='get_absent_employee'),
 
     path('applied_jobs/', AppliedJobViewSet.as_view({'get': 'list', 'post': 'create'}), name='career-list'),
@@ -132,6 +153,7 @@ urlpatterns = [
 
     path('list_releaved/', list_releaved_employees, name='list-releaved-employees'),
     path('get_releaved/<int:pk>/', get_releaved_employee, name='get-releaved-employee'),
+    path('releaved/attendance/', list_releaved_attendance, name='list-releaved-attendance'),
     path('releaved/', transfer_to_releaved, name='transfer-to-releaved'),
     path('releaved/<int:pk>/', approve_releaved, name='approve-releaved'),
 
@@ -1,28 +1,23 @@
-import os, json, pytz, face_recognition, tempfile, requests, boto3, logging
+import os, json, pytz, face_recognition, tempfile, requests, logging
 
-from io import BytesIO
 from pathlib import Path
 from datetime import datetime, timedelta, time
+from itertools import islice
 from geopy.distance import geodesic
-from xhtml2pdf import pisa
-from threading import Thread
 
 from django.conf import settings
 from django.utils import timezone
-from django.http import Http404, JsonResponse, HttpResponse
+from django.http import Http404, JsonResponse, HttpResponse, HttpResponseNotModified
 from accounts.models import Document
 from django.shortcuts import get_object_or_404, render
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_GET, require_POST, require_http_methods
-from django.views.decorators.cache import cache_page
-from django.core.cache import cache
 from django.contrib.auth import authenticate, get_user_model
 from django.utils.dateparse import parse_date
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
 from django.utils.encoding import force_bytes, force_str
 from django.utils.decorators import method_decorator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
-from django.core.mail import send_mail, EmailMessage
 from django.contrib.sites.shortcuts import get_current_site
 from django.template.loader import render_to_string
 from django.db.models import Q 
@@ -34,7 +29,7 @@ from django.core.exceptions import ValidationError
 from rest_framework import status, viewsets, generics, filters
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, BasePermission
 from rest_framework.decorators import api_view, permission_classes, action
 
 # Models
@@ -42,14 +37,41 @@ from .models import (
     User, CEO, HR, Manager, Department, Employee, Attendance, Admin,
     Leave, Payroll, TaskTable, Project, Notice, Report,
     Document, Award, Ticket, EmployeeDetails, ReleavedEmployee, Holiday, AbsentEmployeeDetails, AppliedJobs, 
-    RaiseRequestAttendance, JobPosting, PettyCash, Shift, OT, Break
+    RaiseRequestAttendance, JobPosting, PettyCash, Shift, OT, Break, AttendanceMonthlySummary, StorageDeletionJob, LetterJob, LetterBatch
 )
+from .caching import (
+    ATTENDANCE_RESOURCE, VERSIONED_CACHE_MODELS, get_or_build, model_resource, cache_stats,
+    attendance_list_parts, build_attendance_list,
+    employee_attendance_parts, build_employee_attendance,
+)
+from .today_board import get_board, board_view
+from .summaries import month_bounds
+from .payroll_run import lop_days_by_email, month_key, month_keys, run_payroll
+from .working_days import working_calendar
+from .outbox import enqueue_email
+from .letters import (
+    LETTER_TYPES, schedule_letter, letter_job_result,
+    parse_batch_filters, schedule_letter_batch, letter_batch_result,
+)
+from .storage import get_s3_client, ensure_bucket, s3_metrics, run_parallel
+from .direct_uploads import DOCUMENT_FIELDS, parse_upload_request, presign_upload, confirm_upload
+from .object_cleanup import url_to_key, schedule_deletion, job_progress
+from .image_derivatives import schedule_derivatives, thumbnail_url, derivative_keys, reference_face_encodings
+from .archives import (
+    ARCHIVE_DEFAULT_PAGE_SIZE, ARCHIVE_MAX_PAGE_SIZE, ARCHIVE_EXPORT_COLUMNS,
+    parse_archive_filters, archived_attendance, keyset_page,
+)
+from .employee_calendar import calendar_etag, build_calendar, MAX_CALENDAR_DAYS
+from .status_matrix import build_status_matrix, encode_rows, encode_base64, STATUS_LABELS, STATUS_CHARS
+from .worked_hours import compute_worked_hours, monthly_worked_hours, emails_in_department
+from .exports import parse_export_params, with_profile_columns, streaming_export_response, EXPORT_CHUNK_SIZE
 
 # Serializers
 from .serializers import (
     UserSerializer, CEOSerializer, HRSerializer, ManagerSerializer, DepartmentSerializer,
     EmployeeSerializer, SuperUserCreateSerializer, UserRegistrationSerializer, ProjectSerializer,
-    AdminSerializer, ReportSerializer, RegisterSerializer, DocumentSerializer, AwardSerializer, TicketSerializer, EmployeeDetailsSerializer, HolidaySerializer, AbsentEmployeeDetailsSerializer, CareerSerializer, AppliedJobSerializer, ReleavedEmployeeSerializer, PettyCashSerializer, ShiftSerializer
+    AdminSerializer, ReportSerializer, RegisterSerializer, DocumentSerializer, AwardSerializer, TicketSerializer, EmployeeDetailsSerializer, HolidaySerializer, AbsentEmployeeDetailsSerializer, CareerSerializer, AppliedJobSerializer, ReleavedEmployeeSerializer, PettyCashSerializer, ShiftSerializer,
+    AttendanceMonthlySummarySerializer, ReleavedAttendanceSerializer
 )
 
 # Ensure User model points to custom one
@@ -100,14 +122,7 @@ def upload_attendance_photo(file_path_or_obj, email, date, content_type=None):
             extra_args = {}
             if content_type:
                 extra_args['ContentType'] = content_type
-            # Ensure bucket exists (idempotent)
-            try:
-                client.head_bucket(Bucket=bucket_name)
-            except Exception:
-                try:
-                    client.create_bucket(Bucket=bucket_name)
-                except Exception:
-                    pass
+            ensure_bucket(bucket_name)
 
             client.upload_file(file_path_or_obj, bucket_name, key, ExtraArgs=extra_args if extra_args else None)
         else:
@@ -121,6 +136,8 @@ def upload_attendance_photo(file_path_or_obj, email, date, content_type=None):
         # Return the full URL
         url = f"{base_bucket_url}{key}"
         print(f"Generated URL: {url}")
+        # Thumbnail only: face crops are made for profile pictures, the reference faces
+        schedule_derivatives(url, face=False)
         return url
     except Exception as e:
         print(f"Error uploading attendance photo: {str(e)}")
@@ -373,25 +390,21 @@ def mark_attendance_by_email(email_str, latitude=None, longitude=None):
 
 
 def today_attendance(request):
-    today = timezone.localdate()
-    attendances = Attendance.objects.filter(date=today)
-
+    board = get_board()
     data = [
-        {
-            "email": att.email.email,
-            "role": att.email.role,
-            "fullname": att.fullname,
-            "department": att.department,
-            "date": str(att.date),
-            "check_in": str(att.check_in) if att.check_in else "",
-            "check_out": str(att.check_out) if att.check_out else ""
-        }
-        for att in attendances
+        {key: row[key] for key in ("email", "role", "fullname", "department", "date", "check_in", "check_out")}
+        for name in ("present", "checked_out")
+        for row in board[name].values()
     ]
-
     return JsonResponse({"attendances": data})
 
 
+@require_GET
+def today_board_view(request):
+    """Today's present / checked-out / absent / on-leave sets and department counts. ?department= filters."""
+    return JsonResponse(board_view(get_board(), department=request.GET.get('department')), status=200)
+
+
 # Helper function to handle PATCH
 def handle_patch(request, ModelClass, SerializerClass):
     try:
@@ -422,20 +435,8 @@ def handle_delete(request, ModelClass):
         # Get instance in the given model (Employee, Manager, etc.)
         instance = ModelClass.objects.get(email=email)
 
-        # Delete associated image from MinIO if exists
-        client = get_s3_client()
-        bucket_name = settings.MINIO_STORAGE["BUCKET_NAME"]
-        base_url = settings.BASE_BUCKET_URL
-
-        if hasattr(instance, "profile_picture") and instance.profile_picture:
-            file_url = instance.profile_picture
-            if file_url.startswith(base_url):
-                key = file_url.replace(base_url, "")
-                try:
-                    client.delete_object(Bucket=bucket_name, Key=key)
-                    print(f"Deleted file from MinIO: {key}")
-                except Exception as e:
-                    print(f"Failed to delete file {key}: {e}")
+        # The profile picture and the user's other MinIO objects are removed in
+        # the background by the cleanup job queued when the User is deleted
 
         # Delete instance from role table
         instance.delete()
@@ -515,19 +516,6 @@ class UserViewSet(viewsets.ModelViewSet):
         return Response(response_data)
 
 
-# ------------------- MinIO Client -------------------
-def get_s3_client():
-    minio_conf = settings.MINIO_STORAGE
-    protocol = "https" if minio_conf.get("USE_SSL", False) else "http"
-    client = boto3.client(
-        "s3",
-        endpoint_url=f"{protocol}://{minio_conf['ENDPOINT']}",
-        aws_access_key_id=minio_conf["ACCESS_KEY"],
-        aws_secret_access_key=minio_conf["SECRET_KEY"],
-        verify=True
-    )
-    return client
-
 BASE_BUCKET_URL = settings.BASE_BUCKET_URL
 BUCKET_NAME = settings.MINIO_STORAGE["BUCKET_NAME"]
 
@@ -561,6 +549,7 @@ class BaseUserViewSet(viewsets.ModelViewSet):
         client.upload_fileobj(file_obj, BUCKET_NAME, key, ExtraArgs={"ContentType": file_obj.content_type})
         instance.profile_picture = f"{settings.BASE_BUCKET_URL}{key}"
         instance.save()
+        schedule_derivatives(instance.profile_picture, replaces_previous=True)
 
 
     def _update_employee_details(self, instance, data):
@@ -680,14 +669,8 @@ class BaseUserViewSet(viewsets.ModelViewSet):
             except Exception as e:
                 print(f"[WARN] Error deleting EmployeeDetails: {e}")
 
-            # 4️⃣ Delete profile picture from MinIO
-            if hasattr(employee, "profile_picture") and employee.profile_picture:
-                client = get_s3_client()
-                key = employee.profile_picture.replace(BASE_BUCKET_URL, "")
-                try:
-                    client.delete_object(Bucket=BUCKET_NAME, Key=key)
-                except Exception as e:
-                    print(f"[WARN] Failed to delete profile picture from MinIO: {e}")
+            # 4️⃣ Profile picture and other MinIO objects: removed in the background
+            #    by the cleanup job the User pre_delete signal queues
 
             # 5️⃣ Delete main Employee and related User safely
             employee.delete()
@@ -859,14 +842,8 @@ class ManagerViewSet(BaseUserViewSet):
             else:
                 email_str = manager.email
 
-            # 3️⃣ Delete profile picture from MinIO
-            if hasattr(manager, "profile_picture") and manager.profile_picture:
-                client = get_s3_client()
-                key = manager.profile_picture.replace(BASE_BUCKET_URL, "")
-                try:
-                    client.delete_object(Bucket=BUCKET_NAME, Key=key)
-                except Exception as e:
-                    print(f"[WARN] Failed to delete profile picture from MinIO: {e}")
+            # 3️⃣ Profile picture and other MinIO objects: removed in the background
+            #    by the cleanup job the User pre_delete signal queues
 
             # 4️⃣ Delete main Manager and related User safely
             manager.delete()
@@ -898,14 +875,8 @@ class AdminViewSet(BaseUserViewSet):
             else:
                 email_str = admin.email
 
-            # 3️⃣ Delete profile picture from MinIO
-            if hasattr(admin, "profile_picture") and admin.profile_picture:
-                client = get_s3_client()
-                key = admin.profile_picture.replace(BASE_BUCKET_URL, "")
-                try:
-                    client.delete_object(Bucket=BUCKET_NAME, Key=key)
-                except Exception as e:
-                    print(f"[WARN] Failed to delete profile picture from MinIO: {e}")
+            # 3️⃣ Profile picture and other MinIO objects: removed in the background
+            #    by the cleanup job the User pre_delete signal queues
 
             # 4️⃣ Delete main Admin and related User safely
             admin.delete()
@@ -937,14 +908,8 @@ class CEOViewSet(BaseUserViewSet):
             else:
                 email_str = ceo.email
 
-            # 3️⃣ Delete profile picture from MinIO
-            if hasattr(ceo, "profile_picture") and ceo.profile_picture:
-                client = get_s3_client()
-                key = ceo.profile_picture.replace(BASE_BUCKET_URL, "")
-                try:
-                    client.delete_object(Bucket=BUCKET_NAME, Key=key)
-                except Exception as e:
-                    print(f"[WARN] Failed to delete profile picture from MinIO: {e}")
+            # 3️⃣ Profile picture and other MinIO objects: removed in the background
+            #    by the cleanup job the User pre_delete signal queues
 
             # 4️⃣ Delete main CEO and related User safely
             ceo.delete()
@@ -1089,11 +1054,11 @@ def apply_leave(request):
         email = data.get("email")
         user = get_object_or_404(User, email=email)
 
-        new_start = data.get("start_date")
-        new_end = data.get("end_date")
+        new_start = parse_date(str(data.get("start_date") or ""))
+        new_end = parse_date(str(data.get("end_date") or ""))
 
         if not new_start or not new_end:
-            return JsonResponse({"error": "Start date and end date are required."}, status=400)
+            return JsonResponse({"error": "Start date and end date are required (YYYY-MM-DD)."}, status=400)
 
         # Check for overlapping leaves with status Pending or Approved
         overlapping_leave_exists = Leave.objects.filter(
@@ -1124,7 +1089,9 @@ def apply_leave(request):
                 "leave_type": leave.leave_type,
                 "reason": leave.reason,
                 "status": leave.status,
-                "paid_status": leave.paid_status
+                "paid_status": leave.paid_status,
+                # Days actually taken off: Sundays and holidays inside the range don't count
+                "working_days": working_calendar().count(new_start, new_end),
             }
         }, status=201)
     except Exception as e:
@@ -1270,35 +1237,7 @@ def calculate_lop_days(user, month, year):
     """
     Calculate LOP (Loss of Pay) days based on approved unpaid leaves for a given month/year
     """
-    # Get all approved unpaid leaves for this employee
-    unpaid_leaves = Leave.objects.filter(
-        email=user,
-        status="Approved",
-        paid_status="Unpaid"
-    )
-    
-    lop_days = 0
-    target_month = int(month)
-    target_year = int(year)
-    
-    import calendar
-    from datetime import date
-    
-    # Get the first and last day of the target month
-    first_day = date(target_year, target_month, 1)
-    last_day = date(target_year, target_month, calendar.monthrange(target_year, target_month)[1])
-    
-    for leave in unpaid_leaves:
-        # Check if the leave overlaps with the target month
-        if leave.start_date <= last_day and leave.end_date >= first_day:
-            # Calculate the overlapping period
-            overlap_start = max(leave.start_date, first_day)
-            overlap_end = min(leave.end_date, last_day)
-            
-            # Add the number of overlapping days (inclusive)
-            lop_days += (overlap_end - overlap_start).days + 1
-            
-    return lop_days
+    return lop_days_by_email(int(year), int(month), [user.email]).get(user.email, 0)
 
 
 @csrf_exempt
@@ -1312,11 +1251,15 @@ def create_payroll(request):
         email = data.get("email")
         user = get_object_or_404(User, email=email)
 
-        month = data.get("month")
+        try:
+            # Stored unpadded, as run_payroll stores it
+            month = month_key(data.get("month"))
+        except (TypeError, ValueError):
+            return JsonResponse({"error": "month must be a number 1-12"}, status=400)
         year = data.get("year", timezone.now().year)
 
-        # Check if payroll already exists for this month/year
-        if Payroll.objects.filter(email=user, month=month, year=year).exists():
+        # Check if payroll already exists for this month/year (in either spelling)
+        if Payroll.objects.filter(email=user, month__in=month_keys(month), year=year).exists():
             return JsonResponse({"error": "Payroll already exists for this month and year"}, status=400)
 
         # Calculate LOP (Loss of Pay) days based on unpaid leaves
@@ -1325,6 +1268,9 @@ def create_payroll(request):
         # Use provided LOP value or calculated one
         lop_value = data.get("LOP", calculated_lop)
 
+        # Before the create, so a failure here cannot report a 400 for a saved row
+        worked_hours = monthly_worked_hours(user.email, month, year)
+
         # Create new payroll entry
         payroll = Payroll.objects.create(
             email=user,
@@ -1332,7 +1278,7 @@ def create_payroll(request):
             month=month,
             year=year,
             status=data.get("status", "Pending"),
-            STD=data.get("STD", 0),
+            STD=data["STD"] if "STD" in data else working_calendar().month_std(int(year), int(month)),
             LOP=lop_value,
         )
 
@@ -1347,13 +1293,56 @@ def create_payroll(request):
                 "year": payroll.year,
                 "status": payroll.status,
                 "pay_date": str(payroll.pay_date),
-            }
+            },
+            "worked_hours": worked_hours,
         }, status=201)
 
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=400)
 
 
+@require_GET
+def working_days_view(request):
+    """Standard working days (Mon-Sat minus holidays) of each month of ?year= (default: this year)"""
+    try:
+        year = int(request.GET.get("year", timezone.localdate().year))
+    except ValueError:
+        return JsonResponse({"error": "year must be a number"}, status=400)
+    months = working_calendar().year_std(year)
+    return JsonResponse({"year": year, "months": months, "total": sum(months.values())}, status=200)
+
+
+@csrf_exempt
+@require_POST
+def run_payroll_view(request):
+    """
+    Create the month's payroll for every Employee, HR and Manager (or the given emails)
+    in one run; CEO and Admin accounts are not included.
+    Body: {"month", "year", "emails"?, "STD"?, "update_pending"?, "dry_run"?}; STD defaults
+    to the month's working days.
+    Safe to repeat: employees who already have the month's payroll are reported, not duplicated.
+    """
+    try:
+        data = json.loads(request.body or "{}")
+        month = int(data.get("month"))
+        year = int(data.get("year", timezone.now().year))
+        if not 1 <= month <= 12:
+            raise ValueError("month must be 1-12")
+        emails = data.get("emails")
+        if emails is not None and not isinstance(emails, list):
+            raise ValueError("emails must be a list")
+        std = int(data["STD"]) if data.get("STD") is not None else None
+    except (TypeError, ValueError) as e:
+        return JsonResponse({"error": f"Invalid request: {e}"}, status=400)
+
+    result = run_payroll(
+        year, month, emails=emails, std=std,
+        update_pending=bool(data.get("update_pending", False)),
+        dry_run=bool(data.get("dry_run", False)),
+    )
+    return JsonResponse(result, status=200)
+
+
 @csrf_exempt
 def update_payroll_status(request, payroll_id):
     """Update payroll status using payroll ID."""
@@ -1703,7 +1692,6 @@ class RegisterView(generics.CreateAPIView):
 
 
 @require_GET
-@cache_page(60 * 5)  # Cache for 5 minutes
 def list_attendance(request):
     """List attendance records - paginated if params provided, otherwise all records"""
     # Check if pagination parameters are provided
@@ -1714,64 +1702,14 @@ def list_attendance(request):
         # Use pagination if either parameter is provided
         page = int(page_param) if page_param else 1
         page_size = min(int(page_size_param) if page_size_param else 20, 100)
-        
-        # Calculate offset
-        offset = (page - 1) * page_size
-        
-        # Get total count
-        total_count = Attendance.objects.count()
-        
-        # Get paginated records
-        attendance_records = Attendance.objects.all().order_by('-date')[offset:offset + page_size]
-        
-        result = []
-        for record in attendance_records:
-            result.append({
-                "email": record.email.email,
-                "role": record.email.role,
-                "fullname": record.fullname,
-                "department": record.department,
-                "date": str(record.date),
-                "check_in": str(record.check_in) if record.check_in else None,
-                "check_out": str(record.check_out) if record.check_out else None,
-                "check_in_photo": record.check_in_photo if record.check_in_photo else None,
-                "check_out_photo": record.check_out_photo if record.check_out_photo else None,
-            })
-        
-        # Calculate pagination info
-        total_pages = (total_count + page_size - 1) // page_size
-        
-        response_data = {
-            "attendance": result,
-            "pagination": {
-                "current_page": page,
-                "page_size": page_size,
-                "total_pages": total_pages,
-                "total_count": total_count
-            }
-        }
     else:
-        # Fetch all records if no pagination parameters
-        attendance_records = Attendance.objects.all().order_by('-date')
-        
-        result = []
-        for record in attendance_records:
-            result.append({
-                "email": record.email.email,
-                "role": record.email.role,
-                "fullname": record.fullname,
-                "department": record.department,
-                "date": str(record.date),
-                "check_in": str(record.check_in) if record.check_in else None,
-                "check_out": str(record.check_out) if record.check_out else None,
-                "check_in_photo": record.check_in_photo if record.check_in_photo else None,
-                "check_out_photo": record.check_out_photo if record.check_out_photo else None,
-            })
-        
-        response_data = {
-            "attendance": result
-        }
-    
+        page = page_size = None
+
+    response_data = get_or_build(
+        ATTENDANCE_RESOURCE,
+        attendance_list_parts(page, page_size),
+        lambda: build_attendance_list(page, page_size),
+    )
     return JsonResponse(response_data, status=200)
 
 
@@ -1779,23 +1717,44 @@ def list_attendance(request):
 def get_attendance(request, email):
     """Get attendance records for a specific email"""
     user = get_object_or_404(User, email=email)
-    attendance_records = Attendance.objects.filter(email=user).order_by('-date')
-    
-    result = []
-    for record in attendance_records:
-        result.append({
-            "email": record.email.email,
-            "role": record.email.role,
-            "fullname": record.fullname,
-            "department": record.department,
-            "date": str(record.date),
-            "check_in": str(record.check_in) if record.check_in else None,
-            "check_out": str(record.check_out) if record.check_out else None,
-            "check_in_photo": record.check_in_photo if record.check_in_photo else None,
-            "check_out_photo": record.check_out_photo if record.check_out_photo else None,
-        })
-    
-    return JsonResponse({"attendance": result}, status=200)
+    data = get_or_build(
+        ATTENDANCE_RESOURCE,
+        employee_attendance_parts(user.email),
+        lambda: build_employee_attendance(user.email),
+    )
+    return JsonResponse(data, status=200)
+
+
+class IsAdminOrCEO(BasePermission):
+    """Authenticated Admin / CEO users and superusers"""
+
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(
+            user and user.is_authenticated
+            and (user.is_superuser or user.role in ('Admin', 'CEO'))
+        )
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminOrCEO])
+def cache_stats_view(request):
+    """Shared cache hit/miss counters (with CACHE_STATS_ENABLED) and current version per cached model"""
+    resources = [model_resource(model) for model in VERSIONED_CACHE_MODELS]
+    return Response(cache_stats(resources), status=status.HTTP_200_OK)
+
+
+@require_GET
+def storage_deletion_status(request, pk):
+    """Progress of a background MinIO deletion job"""
+    job = get_object_or_404(StorageDeletionJob, pk=pk)
+    return JsonResponse(job_progress(job), status=200)
+
+
+@require_GET
+def storage_metrics_view(request):
+    """Per-operation MinIO call counts and latencies for this worker process"""
+    return JsonResponse({"operations": s3_metrics()}, status=200)
 
 
 @csrf_exempt
@@ -2345,15 +2304,31 @@ def get_tasks_by_assigned_by(request, assigned_by_email):
         return JsonResponse({"error": str(e)}, status=500)
     
 
-DOCUMENT_FIELDS = [
-    "tenth", "twelth", "degree", "masters", "marks_card", "certificates",
-    "award", "resume", "id_proof", "appointment_letter", "offer_letter",
-    "releaving_letter", "resignation_letter", "achievement_crt", "bonafide_crt",
-]
-
 # Use BASE_BUCKET_URL from settings.py
 BASE_BUCKET_URL = settings.BASE_BUCKET_URL
 
+
+def _upload_document_files(client, bucket_name, uploads):
+    """
+    Upload {field: (key, file_obj)} in parallel on the shared S3 pool.
+    Returns ({field: url} for the files that made it, {field: status} for all of them).
+    """
+    results = run_parallel({
+        field: (lambda key=key, file_obj=file_obj: client.upload_fileobj(file_obj, bucket_name, key))
+        for field, (key, file_obj) in uploads.items()
+    })
+
+    urls, statuses = {}, {}
+    for field, (ok, error) in results.items():
+        key = uploads[field][0]
+        if ok:
+            urls[field] = f"{settings.BASE_BUCKET_URL}{key}"
+            statuses[field] = {"status": "uploaded", "url": urls[field]}
+        else:
+            print(f"Upload failed for {field}: {error}")
+            statuses[field] = {"status": "failed", "error": str(error)}
+    return urls, statuses
+
 # CREATE Document
 @csrf_exempt
 def create_document(request):
@@ -2370,48 +2345,64 @@ def create_document(request):
         client = get_s3_client()
         bucket_name = settings.MINIO_STORAGE["BUCKET_NAME"]
         
-        # Ensure bucket exists
-        try:
-            client.head_bucket(Bucket=bucket_name)
-        except Exception:
-            try:
-                client.create_bucket(Bucket=bucket_name)
-            except Exception as e:
-                print(f"Failed to create bucket: {e}")
-                pass
+        ensure_bucket(bucket_name)
         
-        uploaded_files = {}
-
+        uploads = {}
         for field in DOCUMENT_FIELDS:
             file_obj = request.FILES.get(field)
             if file_obj:
                 ext = file_obj.name.split(".")[-1]
-                key = f"documents/{folder_name}/{field}.{ext}"
                 # Upload without ACL parameter to avoid MinIO compatibility issues
-                client.upload_fileobj(file_obj, bucket_name, key)
-                uploaded_files[field] = f"{settings.BASE_BUCKET_URL}{key}"
-        document, created = Document.objects.get_or_create(
-            email=user,
-            defaults={field: uploaded_files.get(field) for field in DOCUMENT_FIELDS}
-        )
-        
-        # If document already exists, update the fields
-        if not created:
-            for field, url in uploaded_files.items():
-                setattr(document, field, url)
-            document.save()
+                uploads[field] = (f"documents/{folder_name}/{field}.{ext}", file_obj)
+
+        uploaded_files, file_statuses = _upload_document_files(client, bucket_name, uploads)
+        if uploads and not uploaded_files:
+            return JsonResponse({"error": "All uploads failed", "files": file_statuses}, status=500)
+
+        document, _ = Document.objects.update_or_create(email=user, defaults=uploaded_files)
 
         # Fixed: Document model doesn't have an id field, using email as identifier
         return JsonResponse({
             "message": "Document created successfully",
             "email": document.email.email,
-            "urls": uploaded_files
+            "urls": uploaded_files,
+            "files": file_statuses,
         })
     except Exception as e:
         print(f"Error creating document: {str(e)}")
         import traceback
         traceback.print_exc()
         return JsonResponse({"error": f"Internal server error: {str(e)}"}, status=500)
+
+
+@api_view(['POST'])
+def presign_upload_view(request):
+    """
+    Step 1 of a direct upload: presigned POST policy / PUT URL for one file.
+    Body: kind (document|resume|profile_picture), email, field (documents only),
+    filename, content_type
+    """
+    try:
+        target, email, field, key, content_type = parse_upload_request(request.data)
+        return Response(presign_upload(target, key, content_type), status=status.HTTP_200_OK)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['POST'])
+def confirm_upload_view(request):
+    """
+    Step 2 of a direct upload: verify the object in MinIO and save its URL.
+    Body: the same kind, email, field, filename and content_type sent to presign.
+    """
+    try:
+        target, email, field, key, _ = parse_upload_request(request.data)
+        url = confirm_upload(target, email, field, key)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({"message": "Upload confirmed", "kind": target.kind, "field": field, "url": url}, status=status.HTTP_200_OK)
+
+
 # UPDATE Document
 @csrf_exempt
 def update_document(request, email):
@@ -2434,39 +2425,45 @@ def update_document(request, email):
     folder_name = email.split("@")[0].lower()
     client = get_s3_client()
     bucket_name = settings.MINIO_STORAGE["BUCKET_NAME"]
-    updated_files = {}
-
+    uploads = {}
     for field in DOCUMENT_FIELDS:
         file_obj = files.get(field)
         if not file_obj:
             continue
-
         # ✅ Use fixed key name for this field to overwrite
         key = f"documents/{folder_name}/{field}{file_obj.name[file_obj.name.rfind('.'):]}"  # preserve new extension
+        uploads[field] = (key, file_obj)
+
+    if not uploads:
+        return JsonResponse({"message": "No files uploaded"}, status=400)
+
+    # Upload new files (each replaces its key if it exists)
+    updated_files, file_statuses = _upload_document_files(client, bucket_name, uploads)
+    if not updated_files:
+        return JsonResponse({"error": "All uploads failed", "files": file_statuses}, status=500)
 
-        # Optionally delete old file if the extension changed
+    # Only after the replacement is stored: delete old files whose extension changed
+    old_keys = {}
+    for field, new_url in updated_files.items():
         old_file_url = getattr(doc, field)
-        if old_file_url and old_file_url != f"{settings.BASE_BUCKET_URL}{key}":
-            old_key = old_file_url.replace(settings.BASE_BUCKET_URL, "")
-            try:
-                client.delete_object(Bucket=bucket_name, Key=old_key)
-                print(f"Deleted old file: {old_key}")
-            except Exception as e:
-                print(f"Failed to delete old file {old_key}: {e}")
+        if old_file_url and old_file_url != new_url:
+            old_keys[field] = old_file_url.replace(settings.BASE_BUCKET_URL, "")
+    deletions = run_parallel({
+        field: (lambda old_key=old_key: client.delete_object(Bucket=bucket_name, Key=old_key))
+        for field, old_key in old_keys.items()
+    })
+    for field, (ok, error) in deletions.items():
+        if not ok:
+            print(f"Failed to delete old file {old_keys[field]}: {error}")
 
-        # Upload new file (will replace if key exists)
-        try:
-            client.upload_fileobj(file_obj, bucket_name, key)
-            new_url = f"{settings.BASE_BUCKET_URL}{key}"
-            setattr(doc, field, new_url)
-            updated_files[field] = new_url
-        except Exception as e:
-            return JsonResponse({"error": f"Upload failed for {field}: {str(e)}"}, status=500)
-    if updated_files:
-        doc.save()
-        return JsonResponse({"message": "Document(s) updated successfully", "updated_files": updated_files})
-    else:
-        return JsonResponse({"message": "No files uploaded"}, status=400)
+    for field, new_url in updated_files.items():
+        setattr(doc, field, new_url)
+    doc.save(update_fields=list(updated_files))
+    return JsonResponse({
+        "message": "Document(s) updated successfully",
+        "updated_files": updated_files,
+        "files": file_statuses,
+    })
 
 
 @csrf_exempt
@@ -2524,29 +2521,15 @@ def delete_document(request, email):
     if not documents.exists():
         return JsonResponse({"message": "No documents found for this user"}, status=404)
 
-    client = get_s3_client()
-    bucket_name = settings.MINIO_STORAGE["BUCKET_NAME"]
-    deleted_files = []
-
-    for doc in documents:
-        folder_name = email.split("@")[0].lower()
-        prefix = f"documents/{folder_name}/"
-
-        # Delete all objects under this folder
-        response = client.list_objects_v2(Bucket=bucket_name, Prefix=prefix)
-        if "Contents" in response:
-            for obj in response["Contents"]:
-                try:
-                    client.delete_object(Bucket=bucket_name, Key=obj["Key"])
-                    deleted_files.append(obj["Key"])
-                except Exception as e:
-                    print(f"Failed to delete {obj['Key']}: {e}")
-
-        doc.delete()
+    # Every object under the user's documents folder goes, in the background
+    folder_name = email.split("@")[0].lower()
+    with transaction.atomic():
+        job = schedule_deletion('document_delete', prefixes=[f"documents/{folder_name}/"], email=email)
+        deleted_count, _ = documents.delete()
 
     return JsonResponse({
-        "message": f"{len(deleted_files)} file(s) and document record(s) deleted successfully",
-        "deleted_files": deleted_files
+        "message": f"{deleted_count} document record(s) deleted; file deletion queued",
+        "deletion_job": job.pk,
     })
 
 
@@ -2664,6 +2647,7 @@ def create_award(request):
                 # Use BASE_BUCKET_URL from settings
                 award.photo = f"{settings.BASE_BUCKET_URL}{key}"
                 award.save()
+                schedule_derivatives(award.photo, face=False)
             except Exception as e:
                 return JsonResponse({"error": f"File upload failed: {str(e)}"}, status=500)
 
@@ -2715,6 +2699,8 @@ def update_award(request, pk):
         award.photo = f"{settings.BASE_BUCKET_URL}{key}"
 
     award.save()
+    if photo_file:
+        schedule_derivatives(award.photo, face=False)
     return JsonResponse({"message": "Award updated"})
 def list_awards(request):
     """List all awards - paginated if params provided, otherwise all records"""
@@ -2745,6 +2731,7 @@ def list_awards(request):
                 "title": a.title,
                 "description": a.description,
                 "photo": a.photo if a.photo else None,
+                "photo_thumbnail": thumbnail_url(a.photo),
                 "created_at": a.created_at.strftime("%Y-%m-%d %H:%M:%S"),  # Format datetime as string
             })
         
@@ -2773,6 +2760,7 @@ def list_awards(request):
                 "title": a.title,
                 "description": a.description,
                 "photo": a.photo if a.photo else None,
+                "photo_thumbnail": thumbnail_url(a.photo),
                 "created_at": a.created_at.strftime("%Y-%m-%d %H:%M:%S"),  # Format datetime as string
             })
         
@@ -2792,6 +2780,7 @@ def get_award(request, pk):
         "title": a.title,
         "description": a.description,
         "photo": a.photo if a.photo else None,
+        "photo_thumbnail": thumbnail_url(a.photo),
         "created_at": a.created_at.strftime("%Y-%m-%d %H:%M:%S"),  # Include created_at
     }
     return JsonResponse(data)
@@ -2801,21 +2790,17 @@ def get_award(request, pk):
 def delete_award(request, pk):
     if request.method == "DELETE":
         award = get_object_or_404(Award, pk=pk)
-        client = get_s3_client()
-
-        # Delete photo from MinIO if it exists
-        if award.photo and award.photo.startswith(settings.BASE_BUCKET_URL):
-            old_key = award.photo.replace(settings.BASE_BUCKET_URL, "")
-            try:
-                # Get bucket name from settings
-                bucket_name = settings.MINIO_STORAGE["BUCKET_NAME"]
-                client.delete_object(Bucket=bucket_name, Key=old_key)
-                print(f"Deleted photo from MinIO: {old_key}")
-            except Exception as e:
-                print(f"Failed to delete photo from MinIO: {e}")
 
-        award.delete()
-        return JsonResponse({"message": "Award and photo deleted successfully"})
+        # Delete photo from MinIO (in the background) if it exists
+        photo_key = url_to_key(award.photo)
+        keys = [photo_key, *derivative_keys(photo_key)] if photo_key else []
+        with transaction.atomic():
+            job = schedule_deletion('award_delete', keys=keys, email=award.email_id)
+            award.delete()
+        return JsonResponse({
+            "message": "Award deleted successfully; photo deletion queued" if job else "Award deleted successfully",
+            "deletion_job": job.pk if job else None,
+        })
     else:
         return JsonResponse({"error": "DELETE method required"}, status=405)
 
@@ -2946,17 +2931,7 @@ def mark_office_attendance_view(request):
                 continue
 
             try:
-                response = requests.get(person.profile_picture, timeout=10)
-                if response.status_code != 200:
-                    continue
-
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as emp_tmp:
-                    emp_tmp.write(response.content)
-                    emp_tmp_path = emp_tmp.name
-
-                emp_img = face_recognition.load_image_file(emp_tmp_path)
-                emp_encodings = face_recognition.face_encodings(emp_img)
-                os.remove(emp_tmp_path)
+                emp_encodings = reference_face_encodings(person.profile_picture)
 
                 if not emp_encodings:
                     continue
@@ -3146,17 +3121,7 @@ def mark_work_attendance_view(request):
                 continue
 
             try:
-                response = requests.get(person.profile_picture, timeout=10)
-                if response.status_code != 200:
-                    continue
-
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as emp_tmp:
-                    emp_tmp.write(response.content)
-                    emp_tmp_path = emp_tmp.name
-
-                emp_img = face_recognition.load_image_file(emp_tmp_path)
-                emp_encodings = face_recognition.face_encodings(emp_img)
-                os.remove(emp_tmp_path)
+                emp_encodings = reference_face_encodings(person.profile_picture)
 
                 if not emp_encodings:
                     continue
@@ -3379,17 +3344,6 @@ def mark_absent_employees(request):
 
 token_generator = PasswordResetTokenGenerator()
 
-# Helper function to send email asynchronously
-def send_email_async(subject, plain_message, html_message, recipient_email):
-    send_mail(
-        subject=subject,
-        message=plain_message,
-        html_message=html_message,
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        recipient_list=[recipient_email],
-        fail_silently=False,
-    )
-
 class RequestPasswordResetView(APIView):
     permission_classes = []  # No auth required
 
@@ -3432,11 +3386,7 @@ Best regards,
 Your Company Name
 """
 
-        # Send email asynchronously using threading
-        Thread(
-            target=send_email_async,
-            args=('Password Reset Request', plain_message, html_message, email)
-        ).start()
+        enqueue_email('Password Reset Request', plain_message, email, html_body=html_message)
 
         return Response({'message': 'Password reset link sent successfully'}, status=status.HTTP_200_OK)
 
@@ -3461,442 +3411,85 @@ class PasswordResetConfirmView(APIView):
         return Response({'message': 'Password has been reset successfully'}, status=status.HTTP_200_OK)
 
 
-@api_view(['POST'])
-def appointment_letter(request):
+def _queue_letter(request, kind):
     email = request.data.get('email')
     if not email:
         return Response({"error": "Email is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-    # -------------------- Fetch Employee -------------------- #
     employee = Employee.objects.filter(email__email=email).first()
     if not employee:
         return Response({"error": "Employee not found"}, status=status.HTTP_404_NOT_FOUND)
 
-    # -------------------- Get corresponding User (directly from OneToOneField) -------------------- #
-    user = employee.email  # Already a User instance
-
-    # -------------------- Dates & File Setup -------------------- #
-    today = timezone.localtime().date()
-    acceptance_deadline = today + timedelta(days=5)
-    folder_name = email.split('@')[0].lower()
-
-    # -------------------- Render Context -------------------- #
-    context = {
-        'employee_name': employee.fullname,
-        'designation': employee.designation or 'Employee',
-        'joining_date': (
-            employee.date_joined.strftime('%d-%m-%Y') if employee.date_joined else today.strftime('%d-%m-%Y')
-        ),
-        'department': employee.department or 'N/A',
-        'reporting_manager': (
-            employee.reports_to.email if employee.reports_to else 'N/A'
-        ),
-        'logo_url': getattr(settings, 'LOGO_URL', ''),
-        'company_name': 'Global Tech Software Solutions',
-        'salary': 'Confidential',
-        'today_date': today.strftime('%d-%m-%Y'),
-        'acceptance_deadline': acceptance_deadline.strftime('%d-%m-%Y'),
-    }
-
-    # -------------------- Render HTML to PDF -------------------- #
-    html = render_to_string('letters/appointment_letter.html', context)
-
-    pdf_minio = BytesIO()
-    pdf_email = BytesIO()
-
-    pisa_status_minio = pisa.CreatePDF(html, dest=pdf_minio, encoding='UTF-8')
-    # Check if pisa_status_minio has an error by checking if it has the err attribute
-    if hasattr(pisa_status_minio, 'err'):
-        err_value = getattr(pisa_status_minio, 'err', None)
-        if err_value:
-            return Response({"error": "PDF generation failed (MinIO)"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    pdf_minio.seek(0)
-
-    pisa_status_email = pisa.CreatePDF(html, dest=pdf_email, encoding='UTF-8')
-    # Check if pisa_status_email has an error by checking if it has the err attribute
-    if hasattr(pisa_status_email, 'err'):
-        err_value = getattr(pisa_status_email, 'err', None)
-        if err_value:
-            return Response({"error": "PDF generation failed (Email)"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    pdf_email.seek(0)
-
-    # -------------------- Upload to MinIO -------------------- #
-    filename = "appointment_letter.pdf"
-    object_name = f"documents/{folder_name}/{filename}"
-
-    try:
-        minio_conf = settings.MINIO_STORAGE
-        protocol = "https" if minio_conf.get("USE_SSL", False) else "http"
-        s3 = boto3.client(
-            's3',
-            endpoint_url=f"{protocol}://{minio_conf['ENDPOINT']}",
-            aws_access_key_id=minio_conf['ACCESS_KEY'],
-            aws_secret_access_key=minio_conf['SECRET_KEY']
-        )
-
-        bucket_name = minio_conf['BUCKET_NAME']
-        s3.upload_fileobj(
-            pdf_minio,
-            bucket_name,
-            object_name,
-            ExtraArgs={'ContentType': 'application/pdf'}
-        )
-
-        # Use the BASE_BUCKET_URL for public access
-        file_url = f"{settings.BASE_BUCKET_URL}{object_name}"
-
-        # Save the MinIO file URL to Document model
-        document, _ = Document.objects.get_or_create(email=user)
-        document.appointment_letter = file_url
-        document.save()
-    except Exception as e:
-        return Response({"error": f"MinIO upload or DB save failed: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-    # -------------------- Send Email -------------------- #
-    try:
-        pdf_email.seek(0)
-        pdf_content = pdf_email.read()
-
-        mail = EmailMessage(
-            subject="Appointment Letter - Global Tech Software Solutions",
-            body=f"Dear {employee.fullname},\n\nPlease find attached your appointment letter.\n\nBest Regards,\nGlobal Tech HR",
-            to=[email]
-        )
-        mail.attach(filename, pdf_content, 'application/pdf')
-        mail.send(fail_silently=False)
-
-    except Exception as e:
-        return Response({"error": f"Failed to send email: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-    # -------------------- Success -------------------- #
+    # Rendering, upload and email run in the background; poll the job for the file URL
+    with transaction.atomic():
+        job = schedule_letter(kind, employee.email_id)
     return Response({
-        "message": "Appointment letter generated, uploaded to MinIO, saved in DB, and emailed successfully.",
+        "message": f"{LETTER_TYPES[kind].title} queued for generation and email.",
         "employee": employee.fullname,
-        "file_url": file_url
-    }, status=status.HTTP_200_OK)
+        "job_id": job.pk,
+        "status": job.status,
+    }, status=status.HTTP_202_ACCEPTED)
 
 
 @api_view(['POST'])
-def offer_letter(request):
-    email = request.data.get('email')
-    if not email:
-        return Response({"error": "Email is required"}, status=status.HTTP_400_BAD_REQUEST)
-
-    # -------------------- Fetch Employee -------------------- #
-    employee = Employee.objects.filter(email__email=email).first()
-    if not employee:
-        return Response({"error": "Employee not found"}, status=status.HTTP_404_NOT_FOUND)
-
-    # -------------------- Fetch corresponding User -------------------- #
-    user = employee.email  # Already a User instance due to OneToOneField
-
-    # -------------------- Prepare Context for Offer Letter -------------------- #
-    today = timezone.now().date()
-    acceptance_deadline = today + timedelta(days=5)
-    folder_name = email.split('@')[0].lower()
-
-    context = {
-        'candidate_name': employee.fullname,
-        'designation': employee.designation or 'Employee',
-        'location': employee.work_location or 'Bangalore',
-        'joining_date': employee.date_joined or today,
-        'today_date': today,
-        'probation_months': 6,
-        'acceptance_deadline': acceptance_deadline,
-        'logo_url': 'https://www.globaltechsoftwaresolutions.com/_next/image?url=%2Flogo%2FGlobal.jpg&w=64&q=75',
-        'company_name': 'Global Tech Software Solutions',
-    }
-
-    # -------------------- Render HTML to PDF -------------------- #
-    html = render_to_string('letters/offer_letter.html', context)
-
-    # Create in-memory PDFs
-    pdf_minio = BytesIO()
-    pdf_email = BytesIO()
-
-    pisa_status_minio = pisa.CreatePDF(html, dest=pdf_minio, encoding='UTF-8')
-    # Check if pisa_status_minio has an error by checking if it has the err attribute
-    if hasattr(pisa_status_minio, 'err'):
-        err_value = getattr(pisa_status_minio, 'err', None)
-        if err_value:
-            return Response({"error": "PDF generation failed (MinIO)"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    pdf_minio.seek(0)
-
-    pisa_status_email = pisa.CreatePDF(html, dest=pdf_email, encoding='UTF-8')
-    # Check if pisa_status_email has an error by checking if it has the err attribute
-    if hasattr(pisa_status_email, 'err'):
-        err_value = getattr(pisa_status_email, 'err', None)
-        if err_value:
-            return Response({"error": "PDF generation failed (Email)"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    pdf_email.seek(0)
-
-    # -------------------- Upload to MinIO -------------------- #
-    filename = "offer_letter.pdf"
-    object_name = f"documents/{folder_name}/{filename}"
-
-    try:
-        minio_conf = settings.MINIO_STORAGE
-        protocol = "https" if minio_conf.get("USE_SSL", False) else "http"
-        s3 = boto3.client(
-            's3',
-            endpoint_url=f"{protocol}://{minio_conf['ENDPOINT']}",
-            aws_access_key_id=minio_conf['ACCESS_KEY'],
-            aws_secret_access_key=minio_conf['SECRET_KEY']
-        )
-
-        bucket_name = minio_conf['BUCKET_NAME']
-        s3.upload_fileobj(
-            pdf_minio,
-            bucket_name,
-            object_name,
-            ExtraArgs={'ContentType': 'application/pdf'}
-        )
-
-        # Use the BASE_BUCKET_URL for public access
-        file_url = f"{settings.BASE_BUCKET_URL}{object_name}"
-
-        # Save the MinIO file URL to Document model
-        document, _ = Document.objects.get_or_create(email=user)
-        document.offer_letter = file_url
-        document.save()
-    except Exception as e:
-        return Response({"error": f"MinIO upload or DB save failed: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+def appointment_letter(request):
+    return _queue_letter(request, 'appointment_letter')
 
-    # -------------------- Send Offer Letter via Email -------------------- #
-    try:
-        pdf_email.seek(0)
-        pdf_content = pdf_email.read()
 
-        mail = EmailMessage(
-            subject="Offer Letter - Global Tech Software Solutions",
-            body=f"Dear {employee.fullname},\n\nPlease find attached your offer letter.\n\nBest Regards,\nGlobal Tech HR",
-            to=[email]
-        )
-        mail.attach(filename, pdf_content, 'application/pdf')
-        mail.send(fail_silently=False)
+@api_view(['POST'])
+def offer_letter(request):
+    return _queue_letter(request, 'offer_letter')
 
-    except Exception as e:
-        return Response({"error": f"Failed to send email: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    # -------------------- Success Response -------------------- #
-    return Response({
-        "message": "Offer letter generated, uploaded to MinIO, saved in DB, and emailed successfully.",
-        "employee": employee.fullname,
-        "file_url": file_url
-    }, status=status.HTTP_200_OK)
 @api_view(['POST'])
 def releaving_letter(request):
-    email = request.data.get('email')
-    if not email:
-        return Response({"error": "Email is required"}, status=status.HTTP_400_BAD_REQUEST)
-
-    # -------------------- Fetch Employee -------------------- #
-    employee = Employee.objects.filter(email__email=email).first()
-    if not employee:
-        return Response({"error": "Employee not found"}, status=status.HTTP_404_NOT_FOUND)
-
-    # -------------------- Fetch corresponding User -------------------- #
-    user = employee.email  # Already a User instance
-
-    today = timezone.now().date()
-    last_working_day = getattr(employee, 'last_working_date', today)
-    folder_name = email.split('@')[0].lower()
-
-    # -------------------- Render PDF -------------------- #
-    context = {
-        'employee_name': employee.fullname,
-        'candidate_name': employee.fullname,
-        'employee_id': getattr(employee, 'emp_id', '') or getattr(employee, 'id', ''),
-        'designation': employee.designation or 'Employee',
-        'department': employee.department or '',
-        'date_of_joining': employee.date_joined.strftime("%d-%m-%Y") if employee.date_joined else today.strftime("%d-%m-%Y"),
-        'last_working_day': last_working_day.strftime("%d-%m-%Y") if hasattr(last_working_day, 'strftime') else str(last_working_day),
-        'resignation_effective_date': last_working_day.strftime("%d-%m-%Y") if hasattr(last_working_day, 'strftime') else str(last_working_day),
-        'today_date': today.strftime("%d-%m-%Y"),
-        'issue_date': today.strftime("%d-%m-%Y"),
-        'company_name': 'Global Tech Software Solutions',
-        'logo_url': 'https://www.globaltechsoftwaresolutions.com/_next/image?url=%2Flogo%2FGlobal.jpg&w=64&q=75',
-    }
-    html = render_to_string('letters/releaving_letter.html', context)
-
-    # -------------------- Generate PDFs -------------------- #
-    pdf_minio = BytesIO()
-    pdf_email = BytesIO()
-
-    pisa_status_minio = pisa.CreatePDF(html, dest=pdf_minio, encoding='UTF-8')
-    # Check if pisa_status_minio has an error by checking if it has the err attribute
-    if hasattr(pisa_status_minio, 'err'):
-        err_value = getattr(pisa_status_minio, 'err', None)
-        if err_value:
-            return Response({"error": "PDF generation failed (MinIO)"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    pdf_minio.seek(0)
-
-    pisa_status_email = pisa.CreatePDF(html, dest=pdf_email, encoding='UTF-8')
-    # Check if pisa_status_email has an error by checking if it has the err attribute
-    if hasattr(pisa_status_email, 'err'):
-        err_value = getattr(pisa_status_email, 'err', None)
-        if err_value:
-            return Response({"error": "PDF generation failed (Email)"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    pdf_email.seek(0)
-
-    # -------------------- Upload to MinIO -------------------- #
-    filename = "releaving_letter.pdf"
-    object_name = f"documents/{folder_name}/{filename}"
-
-    try:
-        minio_conf = settings.MINIO_STORAGE
-        protocol = "https" if minio_conf.get("USE_SSL", False) else "http"
-        s3 = boto3.client(
-            's3',
-            endpoint_url=f"{protocol}://{minio_conf['ENDPOINT']}",
-            aws_access_key_id=minio_conf['ACCESS_KEY'],
-            aws_secret_access_key=minio_conf['SECRET_KEY']
-        )
-        bucket_name = minio_conf['BUCKET_NAME']
-        s3.upload_fileobj(pdf_minio, bucket_name, object_name, ExtraArgs={'ContentType': 'application/pdf'})
-
-        # Use the BASE_BUCKET_URL for public access
-        file_url = f"{settings.BASE_BUCKET_URL}{object_name}"
-
-        # Save URL to Document
-        document, _ = Document.objects.get_or_create(email=user)
-        document.releaving_letter = file_url
-        document.save()
-    except Exception as e:
-        return Response({"error": f"MinIO upload or DB save failed: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    # -------------------- Send Email -------------------- #
-    try:
-        pdf_email.seek(0)
-        pdf_content = pdf_email.read()
-
-        mail = EmailMessage(
-            subject="Relieving Letter - Global Tech Software Solutions",
-            body=f"Dear {employee.fullname},\n\nPlease find attached your relieving letter.\n\nBest Regards,\nGlobal Tech HR",
-            to=[email]
-        )
-        mail.attach(filename, pdf_content, 'application/pdf')
-        mail.send(fail_silently=False)
-
-    except Exception as e:
-        return Response({"error": f"Failed to send email: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-    return Response({
-        "message": "Relieving letter generated, uploaded to MinIO, saved in DB, and emailed successfully.",
-        "employee": employee.fullname,
-        "file_url": file_url
-    }, status=status.HTTP_200_OK)
+    return _queue_letter(request, 'releaving_letter')
 
 
 @api_view(['POST'])
 def bonafide_certificate(request):
-    email = request.data.get('email')
-    if not email:
-        return Response({"error": "Email is required"}, status=status.HTTP_400_BAD_REQUEST)
+    return _queue_letter(request, 'bonafide_certificate')
 
-    # -------------------- Fetch Employee -------------------- #
-    # Since Employee.email is a OneToOneField to User.email, use double lookup
-    employee = Employee.objects.filter(email__email=email).first()
-    if not employee:
-        return Response({"error": "Employee not found"}, status=status.HTTP_404_NOT_FOUND)
 
-    # -------------------- Get corresponding User instance -------------------- #
-    user = employee.email  # This is already a User object due to OneToOneField
-
-    # -------------------- Prepare Context -------------------- #
-    today = timezone.localtime().date()
-    last_working_day = today
-    folder_name = email.split('@')[0].lower()
-
-    context = {
-        'candidate_name': employee.fullname,
-        'email': user.email,
-        'designation': employee.designation or "Employee",
-        'department': employee.department or "N/A",
-        'date_of_joining': employee.date_joined.strftime("%d-%m-%Y") if employee.date_joined else "N/A",
-        'last_working_day': last_working_day.strftime("%d-%m-%Y"),
-        'resignation_effective_date': last_working_day.strftime("%d-%m-%Y"),
-        'issue_date': today.strftime("%d-%m-%Y"),
-        'company_name': 'Global Tech Software Solutions',
-        'logo_url': 'https://www.globaltechsoftwaresolutions.com/_next/image?url=%2Flogo%2FGlobal.jpg&w=64&q=75'
-    }
-
-    # -------------------- Render HTML to PDF -------------------- #
-    html = render_to_string('letters/bonafide_certificate.html', context)
-
-    # Create in-memory PDFs
-    pdf_minio = BytesIO()
-    pdf_email = BytesIO()
-
-    pisa_status_minio = pisa.CreatePDF(html, dest=pdf_minio, encoding='UTF-8')
-    # Check if pisa_status_minio has an error by checking if it has the err attribute
-    if hasattr(pisa_status_minio, 'err'):
-        err_value = getattr(pisa_status_minio, 'err', None)
-        if err_value:
-            return Response({"error": "PDF generation failed (MinIO)"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    pdf_minio.seek(0)
-
-    pisa_status_email = pisa.CreatePDF(html, dest=pdf_email, encoding='UTF-8')
-    # Check if pisa_status_email has an error by checking if it has the err attribute
-    if hasattr(pisa_status_email, 'err'):
-        err_value = getattr(pisa_status_email, 'err', None)
-        if err_value:
-            return Response({"error": "PDF generation failed (Email)"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    pdf_email.seek(0)
-
-    # -------------------- Upload to MinIO -------------------- #
-    filename = "bonafide_crt.pdf"
-    object_name = f"documents/{folder_name}/{filename}"
+@require_GET
+def letter_job_status(request, pk):
+    """Status of a background letter job, with the file URL once it is done"""
+    job = get_object_or_404(LetterJob, pk=pk)
+    return JsonResponse(letter_job_result(job), status=200)
 
-    try:
-        minio_conf = settings.MINIO_STORAGE
-        protocol = "https" if minio_conf.get("USE_SSL", False) else "http"
-        s3 = boto3.client(
-            's3',
-            endpoint_url=f"{protocol}://{minio_conf['ENDPOINT']}",
-            aws_access_key_id=minio_conf['ACCESS_KEY'],
-            aws_secret_access_key=minio_conf['SECRET_KEY']
-        )
 
-        bucket_name = minio_conf['BUCKET_NAME']
-        s3.upload_fileobj(
-            pdf_minio,
-            bucket_name,
-            object_name,
-            ExtraArgs={'ContentType': 'application/pdf'}
+@api_view(['POST'])
+def create_letter_batch(request):
+    """
+    Generate one letter type for many employees:
+    {"kind": "...", "emails": [...]} or a department / joined_from / joined_to filter.
+    The batch is queued and run by the scheduler process; poll letter_batch_status.
+    """
+    kind = request.data.get('kind')
+    if kind not in LETTER_TYPES:
+        return Response(
+            {"error": f"kind must be one of: {', '.join(LETTER_TYPES)}"}, status=status.HTTP_400_BAD_REQUEST
         )
-
-        # Use the BASE_BUCKET_URL for public access
-        file_url = f"{settings.BASE_BUCKET_URL}{object_name}"
-        # Save URL to DB
-        document, _ = Document.objects.get_or_create(email=user)
-        document.bonafide_crt = file_url
-        document.save()
-
-    except Exception as e:
-        return Response({"error": f"MinIO upload or DB save failed: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-    # -------------------- Send Email -------------------- #
     try:
-        pdf_email.seek(0)
-        pdf_content = pdf_email.read()
+        filters = parse_batch_filters(request.data)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        mail = EmailMessage(
-            subject="Bonafide Certificate - Global Tech Software Solutions",
-            body=f"Dear {employee.fullname},\n\nPlease find attached your Bonafide Certificate.\n\nBest Regards,\nGlobal Tech HR",
-            to=[user.email]
-        )
-        mail.attach(filename, pdf_content, 'application/pdf')
-        mail.send(fail_silently=False)
+    send_email = str(request.data.get('send_email', True)).lower() not in ['false', '0', 'f', 'no']
+    with transaction.atomic():
+        batch = schedule_letter_batch(kind, filters, send_email=send_email)
+    return Response({
+        "message": f"{LETTER_TYPES[kind].title} batch queued.",
+        "batch_id": batch.pk,
+        "status": batch.status,
+    }, status=status.HTTP_202_ACCEPTED)
 
-    except Exception as e:
-        return Response({"error": f"Failed to send email: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    # -------------------- Success Response -------------------- #
-    return Response({
-        "message": "Bonafide certificate generated, uploaded to MinIO, saved in DB, and emailed successfully.",
-        "employee": employee.fullname,
-        "file_url": file_url
-    }, status=status.HTTP_200_OK)
+@require_GET
+def letter_batch_status(request, pk):
+    """Progress of a letter batch, with the ZIP URL once it is done"""
+    batch = get_object_or_404(LetterBatch, pk=pk)
+    return JsonResponse(letter_batch_result(batch), status=200)
 
 
 class HolidayViewSet(viewsets.ModelViewSet):
@@ -4057,6 +3650,157 @@ def get_absent_employee(request, email):
     return Response(serializer.data)
 
 
+# ------------------- ATTENDANCE SUMMARY VIEWS -------------------
+@api_view(['GET'])
+def attendance_summary(request):
+    """
+    Monthly attendance counts for every employee, read from AttendanceMonthlySummary.
+    ?year=YYYY&month=M (default: current IST month), optional ?department=,
+    paginated if page / page_size are provided.
+    """
+    today = timezone.localtime(timezone.now(), IST).date()
+    try:
+        year = int(request.GET.get('year') or today.year)
+        month = int(request.GET.get('month') or today.month)
+    except ValueError:
+        return Response({"error": "year and month must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+    if not 1 <= month <= 12:
+        return Response({"error": "month must be between 1 and 12"}, status=status.HTTP_400_BAD_REQUEST)
+
+    summaries = AttendanceMonthlySummary.objects.filter(year=year, month=month).order_by('fullname', 'email')
+    department = request.GET.get('department')
+    if department:
+        summaries = summaries.filter(department=department)
+
+    page_param = request.GET.get('page')
+    page_size_param = request.GET.get('page_size')
+
+    if page_param is not None or page_size_param is not None:
+        page = int(page_param) if page_param else 1
+        page_size = min(int(page_size_param) if page_size_param else 20, 100)
+        offset = (page - 1) * page_size
+
+        total_count = summaries.count()
+        serializer = AttendanceMonthlySummarySerializer(summaries[offset:offset + page_size], many=True)
+        total_pages = (total_count + page_size - 1) // page_size
+
+        response_data = {
+            "year": year,
+            "month": month,
+            "summaries": serializer.data,
+            "pagination": {
+                "current_page": page,
+                "page_size": page_size,
+                "total_pages": total_pages,
+                "total_count": total_count
+            }
+        }
+    else:
+        serializer = AttendanceMonthlySummarySerializer(summaries, many=True)
+        response_data = {"year": year, "month": month, "summaries": serializer.data}
+
+    return Response(response_data)
+
+
+@api_view(['GET'])
+def employee_attendance_summary(request, email):
+    """Month-by-month attendance counts for one employee. ?year=YYYY (default: current year)"""
+    user = get_object_or_404(User, email=email)
+    try:
+        year = int(request.GET.get('year') or timezone.localtime(timezone.now(), IST).year)
+    except ValueError:
+        return Response({"error": "year must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+    summaries = AttendanceMonthlySummary.objects.filter(email=user, year=year).order_by('month')
+    serializer = AttendanceMonthlySummarySerializer(summaries, many=True)
+    return Response({"email": user.email, "year": year, "summaries": serializer.data})
+
+
+@api_view(['GET'])
+def attendance_status_matrix(request):
+    """
+    Month grid of present / WFH / absent / leave / holiday / weekend per employee per day.
+    ?year=YYYY&month=M (default: current IST month), optional ?department=,
+    ?encoding=chars (default, one string per employee) or base64 (whole int8 matrix).
+    """
+    today = timezone.localtime(timezone.now(), IST).date()
+    try:
+        year = int(request.GET.get('year') or today.year)
+        month = int(request.GET.get('month') or today.month)
+    except ValueError:
+        return Response({"error": "year and month must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+    if not 1 <= month <= 12:
+        return Response({"error": "month must be between 1 and 12"}, status=status.HTTP_400_BAD_REQUEST)
+
+    encoding = request.GET.get('encoding') or 'chars'
+    if encoding not in ('chars', 'base64'):
+        return Response({"error": "encoding must be 'chars' or 'base64'"}, status=status.HTTP_400_BAD_REQUEST)
+
+    employees, days, matrix = build_status_matrix(year, month, department=request.GET.get('department'))
+
+    response_data = {
+        "year": year,
+        "month": month,
+        "start_date": str(days[0]),
+        "days": len(days),
+        "employees": [
+            {"email": row['email_id'], "fullname": row['fullname'], "department": row['department']}
+            for row in employees
+        ],
+        "encoding": encoding,
+    }
+    if encoding == 'chars':
+        response_data["legend"] = {str(STATUS_CHARS[code]): label for code, label in STATUS_LABELS.items()}
+        response_data["rows"] = encode_rows(matrix)
+    else:
+        response_data["legend"] = {str(code): label for code, label in STATUS_LABELS.items()}
+        response_data["shape"] = list(matrix.shape)
+        response_data["matrix"] = encode_base64(matrix)
+
+    return Response(response_data)
+
+
+@require_GET
+def employee_calendar(request, email):
+    """
+    Attendance, absence, leave and holiday for one employee, keyed by date.
+    ?from=YYYY-MM-DD&to=YYYY-MM-DD (default: current IST month). Supports
+    If-None-Match; the ETag changes whenever any of the four tables is written.
+    """
+    today = timezone.localtime(timezone.now(), IST).date()
+    month_start, month_end = month_bounds(today.year, today.month)
+    raw_from, raw_to = request.GET.get('from'), request.GET.get('to')
+    try:
+        # parse_date returns None for malformed input and raises ValueError for impossible dates
+        start = parse_date(raw_from) if raw_from else month_start
+        end = parse_date(raw_to) if raw_to else month_end
+    except ValueError:
+        start = end = None
+    if start is None or end is None:
+        return JsonResponse({"error": "Dates must be valid YYYY-MM-DD dates"}, status=400)
+    if start > end:
+        return JsonResponse({"error": "'from' must be on or before 'to'"}, status=400)
+    if (end - start).days + 1 > MAX_CALENDAR_DAYS:
+        return JsonResponse({"error": f"Range cannot be longer than {MAX_CALENDAR_DAYS} days"}, status=400)
+
+    etag = calendar_etag(email, start, end)
+    if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    user = get_object_or_404(User, email=email)
+    response = JsonResponse({
+        "email": user.email,
+        "from": str(start),
+        "to": str(end),
+        "days": build_calendar(user.email, start, end),
+    }, status=200)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
 # ===== Attendance Correction Requests =====
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -4371,11 +4115,10 @@ HR Department
 Global Tech Software Solutions
 """
         try:
-            email_msg = EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [instance.email])
-            email_msg.send(fail_silently=False)
-            print(f"✅ Hired email sent to {instance.email}")
+            enqueue_email(subject, body, instance.email, from_email=settings.DEFAULT_FROM_EMAIL)
+            print(f"✅ Hired email queued for {instance.email}")
         except Exception as e:
-            print(f"⚠️ Failed to send hired email: {e}")
+            print(f"⚠️ Failed to queue hired email: {e}")
 
     def destroy(self, request, email=None):
         """Delete application and remove resume from S3 if exists"""
@@ -4588,7 +4331,7 @@ Global Tech Software Solutions
 """
             
             try:
-                Thread(target=send_email_async, args=(subject, plain_message, html_message, email)).start()
+                enqueue_email(subject, plain_message, email, html_body=html_message)
             except Exception as e:
                 print(f"Failed to send manager approval email to {email}: {str(e)}")
             
@@ -4631,7 +4374,7 @@ Global Tech Software Solutions
 """
             
             try:
-                Thread(target=send_email_async, args=(subject, plain_message, html_message, email)).start()
+                enqueue_email(subject, plain_message, email, html_body=html_message)
             except Exception as e:
                 print(f"Failed to send manager rejection email to {email}: {str(e)}")
             
@@ -4701,7 +4444,7 @@ Global Tech Software Solutions
 """
             
             try:
-                Thread(target=send_email_async, args=(subject, plain_message, html_message, email)).start()
+                enqueue_email(subject, plain_message, email, html_body=html_message)
             except Exception as e:
                 print(f"Failed to send HR approval email to {email}: {str(e)}")
             
@@ -4752,14 +4495,14 @@ Global Tech Software Solutions
                 # Send to CEOs
                 for ceo in ceos:
                     try:
-                        Thread(target=send_email_async, args=(leadership_subject, leadership_plain_message, leadership_html_message, ceo.email.email)).start()
+                        enqueue_email(leadership_subject, leadership_plain_message, ceo.email.email, html_body=leadership_html_message)
                     except Exception as e:
                         print(f"Failed to send offboarding notification to CEO {ceo.email.email}: {str(e)}")
                 
                 # Send to Managers
                 for manager in managers:
                     try:
-                        Thread(target=send_email_async, args=(leadership_subject, leadership_plain_message, leadership_html_message, manager.email.email)).start()
+                        enqueue_email(leadership_subject, leadership_plain_message, manager.email.email, html_body=leadership_html_message)
                     except Exception as e:
                         print(f"Failed to send offboarding notification to Manager {manager.email.email}: {str(e)}")
                 
@@ -4818,7 +4561,7 @@ Global Tech Software Solutions
 """
             
             try:
-                Thread(target=send_email_async, args=(subject, plain_message, html_message, email)).start()
+                enqueue_email(subject, plain_message, email, html_body=html_message)
             except Exception as e:
                 print(f"Failed to send HR rejection email to {email}: {str(e)}")
             
@@ -4922,6 +4665,54 @@ def get_releaved_employee(request, pk):
         }, status=status.HTTP_404_NOT_FOUND)
 
 
+@require_GET
+def list_releaved_attendance(request):
+    """
+    Archived attendance of offboarded employees, newest first.
+    Query params:
+    - email, releaved_employee_id, from, to (YYYY-MM-DD): filters
+    - page_size: rows per page (default: 50, max: 500)
+    - cursor: `next_cursor` from the previous page
+    - format=csv|xlsx: stream every matching row as a file instead
+    """
+    try:
+        filters = parse_archive_filters(request)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    queryset = archived_attendance(filters)
+
+    if request.GET.get('format'):
+        try:
+            params = parse_export_params(request)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        rows = queryset.order_by('-date', '-id').values_list(*ARCHIVE_EXPORT_COLUMNS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        filename = _export_filename("releaved_attendance", {"from": filters["from"], "to": filters["to"]})
+        return streaming_export_response(filename, ARCHIVE_EXPORT_COLUMNS, rows, params["format"])
+
+    try:
+        page_size = min(int(request.GET.get('page_size') or ARCHIVE_DEFAULT_PAGE_SIZE), ARCHIVE_MAX_PAGE_SIZE)
+        if page_size < 1:
+            raise ValueError
+    except ValueError:
+        return JsonResponse({"error": "page_size must be a positive integer"}, status=400)
+
+    try:
+        rows, next_cursor = keyset_page(queryset, request.GET.get('cursor'), page_size)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    return JsonResponse({
+        "attendance": ReleavedAttendanceSerializer(rows, many=True).data,
+        "pagination": {
+            "page_size": page_size,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None,
+        },
+    })
+
+
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
@@ -5076,22 +4867,10 @@ Please follow up with this customer at your earliest convenience.
             
             # Send emails
             # Confirmation email to user
-            send_mail(
-                user_subject,
-                user_message,
-                company_email,
-                [email],
-                fail_silently=False,
-            )
+            enqueue_email(user_subject, user_message, email, from_email=company_email)
             
             # Notification email to company
-            send_mail(
-                company_subject,
-                company_message,
-                company_email,
-                [company_email],
-                fail_silently=False,
-            )
+            enqueue_email(company_subject, company_message, company_email, from_email=company_email)
             
             # Return success response
             return JsonResponse({
@@ -5696,3 +5475,176 @@ def delete_break(request, break_id):
             return Response({
                 'error': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+# ------------------- WORKED HOURS VIEWS -------------------
+
+@api_view(['GET'])
+def worked_hours_report(request):
+    """
+    Gross, break, net and OT hours per employee for a period.
+    ?from=YYYY-MM-DD&to=YYYY-MM-DD (default: current IST month),
+    optional ?email= or ?department=, ?daily=true for per-day rows.
+    """
+    today = timezone.localtime(timezone.now(), IST).date()
+    try:
+        # parse_date raises ValueError on well-formed but impossible dates (2026-02-30)
+        start = parse_date(request.GET.get('from') or '') or today.replace(day=1)
+        end = parse_date(request.GET.get('to') or '') or today
+    except ValueError:
+        start = end = None
+    if (request.GET.get('from') and start is None) or (request.GET.get('to') and end is None):
+        return Response({"error": "Dates must be valid YYYY-MM-DD dates"}, status=status.HTTP_400_BAD_REQUEST)
+
+    emails = None
+    email = request.GET.get('email')
+    department = request.GET.get('department')
+    if email:
+        emails = [email]
+    elif department:
+        emails = emails_in_department(department)
+
+    try:
+        result = compute_worked_hours(start, end, emails=emails)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    include_daily = (request.GET.get('daily') or '').lower() in ['true', '1']
+    return Response({
+        "from": str(start),
+        "to": str(end),
+        "employees": result.as_dict(include_daily=include_daily),
+    }, status=status.HTTP_200_OK)
+
+
+# ------------------- EXPORT VIEWS -------------------
+
+def _export_filename(prefix, params):
+    parts = [prefix]
+    if params["from"]:
+        parts.append(params["from"].isoformat())
+    if params["to"]:
+        parts.append(params["to"].isoformat())
+    return "_".join(parts)
+
+
+@require_GET
+def export_attendance(request):
+    """
+    Stream attendance rows as CSV or XLSX.
+    Query params: from, to (YYYY-MM-DD), department, role, format (csv|xlsx)
+    """
+    try:
+        params = parse_export_params(request)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    queryset = Attendance.objects.all()
+    if params["from"]:
+        queryset = queryset.filter(date__gte=params["from"])
+    if params["to"]:
+        queryset = queryset.filter(date__lte=params["to"])
+    if params["department"]:
+        queryset = queryset.filter(department__iexact=params["department"])
+    if params["role"]:
+        queryset = queryset.filter(email__role__iexact=params["role"])
+
+    header = [
+        "email", "role", "fullname", "department", "date", "check_in", "check_out",
+        "location_type", "latitude", "longitude",
+    ]
+    rows = queryset.order_by("date", "email_id").values_list(
+        "email_id", "email__role", "fullname", "department", "date", "check_in", "check_out",
+        "location_type", "latitude", "longitude",
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+    return streaming_export_response(_export_filename("attendance", params), header, rows, params["format"])
+
+
+@require_GET
+def export_payrolls(request):
+    """
+    Stream payroll rows as CSV or XLSX, joined with employee fullname/department.
+    Query params: from, to (pay_date, YYYY-MM-DD), month, year, status, department, role, format (csv|xlsx)
+    """
+    try:
+        params = parse_export_params(request)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    queryset = with_profile_columns(Payroll.objects.all())
+    if params["from"]:
+        queryset = queryset.filter(pay_date__gte=params["from"])
+    if params["to"]:
+        queryset = queryset.filter(pay_date__lte=params["to"])
+    if request.GET.get("month"):
+        queryset = queryset.filter(month=request.GET["month"])
+    if request.GET.get("year"):
+        queryset = queryset.filter(year=request.GET["year"])
+    if request.GET.get("status"):
+        queryset = queryset.filter(status=request.GET["status"])
+    if params["department"]:
+        queryset = queryset.filter(export_department__iexact=params["department"])
+    if params["role"]:
+        queryset = queryset.filter(email__role__iexact=params["role"])
+
+    header = [
+        "id", "email", "fullname", "department", "month", "year", "basic_salary",
+        "STD", "LOP", "status", "pay_date",
+    ]
+    rows = queryset.order_by("year", "month", "email_id").values_list(
+        "id", "email_id", "export_fullname", "export_department", "month", "year", "basic_salary",
+        "STD", "LOP", "status", "pay_date",
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+    return streaming_export_response(_export_filename("payrolls", params), header, rows, params["format"])
+
+
+def _with_working_days(rows, start_index, end_index):
+    """Append each row's working-day count, computed one chunk of rows per numpy call."""
+    calendar = working_calendar()
+    iterator = iter(rows)
+    while True:
+        chunk = list(islice(iterator, EXPORT_CHUNK_SIZE))
+        if not chunk:
+            return
+        counts = calendar.count_many([row[start_index] for row in chunk], [row[end_index] for row in chunk])
+        for row, count in zip(chunk, counts):
+            yield (*row, int(count))
+
+
+@require_GET
+def export_leaves(request):
+    """
+    Stream leave rows as CSV or XLSX, joined with employee fullname/department.
+    Leaves overlapping the from/to range are included.
+    Query params: from, to (YYYY-MM-DD), status, department, role, format (csv|xlsx)
+    """
+    try:
+        params = parse_export_params(request)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    queryset = with_profile_columns(Leave.objects.all())
+    if params["from"]:
+        queryset = queryset.filter(end_date__gte=params["from"])
+    if params["to"]:
+        queryset = queryset.filter(start_date__lte=params["to"])
+    if request.GET.get("status"):
+        queryset = queryset.filter(status=request.GET["status"])
+    if params["department"]:
+        queryset = queryset.filter(export_department__iexact=params["department"])
+    if params["role"]:
+        queryset = queryset.filter(email__role__iexact=params["role"])
+
+    header = [
+        "id", "email", "fullname", "department", "leave_type", "start_date", "end_date",
+        "status", "paid_status", "reason", "applied_on", "working_days",
+    ]
+    rows = queryset.order_by("start_date", "email_id").values_list(
+        "id", "email_id", "export_fullname", "export_department", "leave_type", "start_date", "end_date",
+        "status", "paid_status", "reason", "applied_on",
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    rows = _with_working_days(rows, start_index=5, end_index=6)
+
+    return streaming_export_response(_export_filename("leaves", params), header, rows, params["format"])
@@ -0,0 +1,211 @@
+"""
+Worked-hours engine.
+
+Loads a period's Attendance, Break and OT rows with one query each and lays
+them out on an (employee x day) grid of NumPy arrays, so gross, break,
+net (break-deducted) and overtime seconds for every employee and day are
+computed with array operations instead of per-row Python.
+
+Attendance check_in / check_out are IST wall-clock times; Break and OT are
+timezone-aware datetimes, converted to IST and assigned to the IST day on
+which they start. Only the part of a break that falls inside that day's
+check-in/check-out window is deducted.
+"""
+
+import calendar
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from .constants import IST
+from .models import Attendance, Break, OT, Employee, HR, Manager
+
+SECONDS_PER_DAY = 86400
+
+# Longest period a single computation may cover
+MAX_PERIOD_DAYS = 366
+
+# IST has no DST, so one offset converts every timestamp
+_IST_OFFSET_SECONDS = IST.utcoffset(datetime(2000, 1, 1)).total_seconds()
+
+
+def _seconds_of_day(value):
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def _hours(seconds):
+    return round(float(seconds) / 3600, 2)
+
+
+def emails_in_department(department):
+    emails = set()
+    for model in (Employee, HR, Manager):
+        emails.update(model.objects.filter(department=department).values_list('email_id', flat=True))
+    return emails
+
+
+class WorkedHours:
+    """
+    Result of `compute_worked_hours`. Every grid is float64 seconds with
+    shape (len(emails), len(days)).
+    """
+
+    def __init__(self, start, emails, gross, breaks, ot):
+        self.start = start
+        self.emails = emails
+        self.index = {email: i for i, email in enumerate(emails)}
+        self.gross = gross
+        self.breaks = breaks
+        self.net = np.maximum(gross - breaks, 0)
+        self.ot = ot
+
+    @property
+    def days(self):
+        return [self.start + timedelta(days=i) for i in range(self.gross.shape[1])]
+
+    def totals(self, email):
+        i = self.index.get(email)
+        if i is None:
+            return {"days_worked": 0, "gross_hours": 0.0, "break_hours": 0.0, "net_hours": 0.0,
+                    "ot_hours": 0.0, "total_hours": 0.0}
+        net, ot = self.net[i].sum(), self.ot[i].sum()
+        return {
+            "days_worked": int(np.count_nonzero(self.gross[i])),
+            "gross_hours": _hours(self.gross[i].sum()),
+            "break_hours": _hours(self.breaks[i].sum()),
+            "net_hours": _hours(net),
+            "ot_hours": _hours(ot),
+            "total_hours": _hours(net + ot),
+        }
+
+    def daily(self, email):
+        """Per-day rows for one employee, skipping days with nothing recorded."""
+        i = self.index.get(email)
+        if i is None:
+            return []
+        active = np.flatnonzero((self.gross[i] > 0) | (self.ot[i] > 0) | (self.breaks[i] > 0))
+        return [
+            {
+                "date": str(self.start + timedelta(days=int(d))),
+                "gross_hours": _hours(self.gross[i, d]),
+                "break_hours": _hours(self.breaks[i, d]),
+                "net_hours": _hours(self.net[i, d]),
+                "ot_hours": _hours(self.ot[i, d]),
+            }
+            for d in active
+        ]
+
+    def as_dict(self, include_daily=False):
+        employees = []
+        for email in self.emails:
+            row = {"email": email, **self.totals(email)}
+            if include_daily:
+                row["days"] = self.daily(email)
+            employees.append(row)
+        return employees
+
+
+def _interval_arrays(rows, start_ordinal):
+    """
+    (email, start, end) datetimes -> email list plus IST day index, start and
+    end seconds relative to that day's IST midnight.
+    """
+    emails = [row[0] for row in rows]
+    starts = np.fromiter((row[1].timestamp() for row in rows), dtype=np.float64, count=len(rows))
+    ends = np.fromiter((row[2].timestamp() for row in rows), dtype=np.float64, count=len(rows))
+
+    local_starts = starts + _IST_OFFSET_SECONDS
+    day_numbers = np.floor(local_starts / SECONDS_PER_DAY)
+    midnight = day_numbers * SECONDS_PER_DAY
+    # Unix day 0 is 1970-01-01, ordinal 719163
+    day_index = (day_numbers + 719163 - start_ordinal).astype(np.int64)
+    return emails, day_index, local_starts - midnight, ends + _IST_OFFSET_SECONDS - midnight
+
+
+def compute_worked_hours(start, end, emails=None):
+    """
+    Worked hours for every employee with attendance, breaks or OT between
+    `start` and `end` (inclusive dates). `emails` optionally restricts the
+    employees. Raises ValueError for an empty or over-long period.
+    """
+    n_days = (end - start).days + 1
+    if n_days <= 0:
+        raise ValueError("'from' must be on or before 'to'")
+    if n_days > MAX_PERIOD_DAYS:
+        raise ValueError(f"Period cannot be longer than {MAX_PERIOD_DAYS} days")
+
+    attendance = Attendance.objects.filter(date__range=(start, end))
+    # Intervals starting just before IST midnight on `start` are still in UTC on the previous day
+    window = (
+        datetime.combine(start, datetime.min.time()) - timedelta(days=1),
+        datetime.combine(end, datetime.min.time()) + timedelta(days=2),
+    )
+    breaks = Break.objects.filter(break_start__range=[IST.localize(value) for value in window])
+    overtime = OT.objects.filter(ot_start__range=[IST.localize(value) for value in window])
+    if emails is not None:
+        emails = list(emails)
+        attendance = attendance.filter(email_id__in=emails)
+        breaks = breaks.filter(email_id__in=emails)
+        overtime = overtime.filter(email_id__in=emails)
+
+    att_rows = list(attendance.values_list('email_id', 'date', 'check_in', 'check_out'))
+    break_rows = list(breaks.values_list('email_id', 'break_start', 'break_end'))
+    ot_rows = list(overtime.values_list('email_id', 'ot_start', 'ot_end'))
+
+    start_ordinal = start.toordinal()
+    break_emails, break_day, break_from, break_to = _interval_arrays(break_rows, start_ordinal)
+    ot_emails, ot_day, ot_from, ot_to = _interval_arrays(ot_rows, start_ordinal)
+    att_emails = [row[0] for row in att_rows]
+
+    all_emails, inverse = np.unique(
+        np.array(att_emails + break_emails + ot_emails, dtype=object), return_inverse=True
+    )
+    n_att, n_break = len(att_emails), len(break_emails)
+    att_emp = inverse[:n_att]
+    break_emp = inverse[n_att:n_att + n_break]
+    ot_emp = inverse[n_att + n_break:]
+    shape = (len(all_emails), n_days)
+
+    # Attendance: check-in / check-out seconds on the grid, NaN where missing
+    check_in = np.full(shape, np.nan)
+    check_out = np.full(shape, np.nan)
+    if att_rows:
+        att_day = np.fromiter((row[1].toordinal() for row in att_rows), dtype=np.int64, count=n_att) - start_ordinal
+        check_in[att_emp, att_day] = [_seconds_of_day(row[2]) if row[2] else np.nan for row in att_rows]
+        check_out[att_emp, att_day] = [_seconds_of_day(row[3]) if row[3] else np.nan for row in att_rows]
+
+    gross = check_out - check_in
+    gross = np.where(gross < 0, gross + SECONDS_PER_DAY, gross)  # check-out after midnight
+    gross = np.nan_to_num(gross, nan=0.0)
+    window_end = check_in + gross
+
+    # Breaks: only the overlap with that day's attendance window counts
+    break_seconds = np.zeros(shape)
+    in_period = (break_day >= 0) & (break_day < n_days)
+    if in_period.any():
+        emp, day = break_emp[in_period], break_day[in_period]
+        overlap = (
+            np.minimum(break_to[in_period], window_end[emp, day])
+            - np.maximum(break_from[in_period], check_in[emp, day])
+        )
+        np.add.at(break_seconds, (emp, day), np.nan_to_num(np.clip(overlap, 0, None), nan=0.0))
+
+    # Overtime: full interval length on the day it starts
+    ot_seconds = np.zeros(shape)
+    in_period = (ot_day >= 0) & (ot_day < n_days)
+    if in_period.any():
+        np.add.at(
+            ot_seconds,
+            (ot_emp[in_period], ot_day[in_period]),
+            np.clip(ot_to[in_period] - ot_from[in_period], 0, None),
+        )
+
+    return WorkedHours(start, [str(email) for email in all_emails], gross, break_seconds, ot_seconds)
+
+
+def monthly_worked_hours(email, month, year):
+    """Totals for one employee and payroll month (month / year as stored on Payroll)."""
+    month, year = int(month), int(year)
+    first_day = date(year, month, 1)
+    last_day = date(year, month, calendar.monthrange(year, month)[1])
+    return compute_worked_hours(first_day, last_day, emails=[email]).totals(email)
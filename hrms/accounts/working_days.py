@@ -0,0 +1,76 @@
+"""
+Working-day arithmetic on numpy's business-day functions.
+
+A working day is a WORKING_WEEKMASK day (Monday-Saturday) that is not a
+Holiday. `working_calendar()` returns a WorkingCalendar over every Holiday
+date; the date list is cached under the Holiday version counter (see
+caching.py), so building one costs no query until a holiday changes.
+
+Counts are inclusive of both ends and vectorized: `count_many` and
+`overlap_many` take arrays of intervals and answer in one numpy call, so
+payroll can clip thousands of leaves to a month without a Python loop.
+"""
+
+import numpy as np
+
+from .caching import get_or_build, model_resource
+from .constants import WORKING_WEEKMASK
+from .models import Holiday
+from .summaries import month_bounds
+
+
+def _as_days(values):
+    return np.asarray(values, dtype="datetime64[D]")
+
+
+class WorkingCalendar:
+    def __init__(self, holidays=(), weekmask=WORKING_WEEKMASK):
+        self.busdaycal = np.busdaycalendar(weekmask=weekmask, holidays=_as_days(list(holidays)))
+
+    def is_working_day(self, day):
+        return bool(np.is_busday(_as_days(day), busdaycal=self.busdaycal))
+
+    def count(self, start, end):
+        """Working days from `start` to `end`, both included (0 if end < start)."""
+        return int(self.count_many([start], [end])[0])
+
+    def count_many(self, starts, ends):
+        """Working days in each [start, end] interval, as an int array (0 where end < start)."""
+        starts, ends = _as_days(starts), _as_days(ends)
+        counts = np.busday_count(starts, ends + 1, busdaycal=self.busdaycal)
+        return np.where(ends >= starts, counts, 0)
+
+    def overlap_many(self, starts, ends, window_start, window_end):
+        """Working days of each [start, end] interval that fall inside [window_start, window_end]."""
+        starts = np.maximum(_as_days(starts), np.datetime64(window_start, "D"))
+        ends = np.minimum(_as_days(ends), np.datetime64(window_end, "D"))
+        return self.count_many(starts, ends)
+
+    def offset(self, day, working_days):
+        """The date `working_days` working days after `day` (rolled forward to a working day first)."""
+        return np.busday_offset(
+            np.datetime64(day, "D"), working_days, roll="forward", busdaycal=self.busdaycal
+        ).astype(object)
+
+    def month_std(self, year, month):
+        """Standard working days of a month."""
+        return self.count(*month_bounds(year, month))
+
+    def year_std(self, year):
+        """{month: standard working days} for the 12 months of `year`, in one call."""
+        bounds = [month_bounds(year, month) for month in range(1, 13)]
+        counts = self.count_many([first for first, _ in bounds], [last for _, last in bounds])
+        return {month: int(count) for month, count in zip(range(1, 13), counts)}
+
+
+def holiday_dates():
+    """Sorted ISO dates of every Holiday (any country), cached until a holiday changes."""
+    return get_or_build(
+        model_resource(Holiday),
+        ("holiday_dates",),
+        lambda: [day.isoformat() for day in Holiday.objects.order_by("date").values_list("date", flat=True).distinct()],
+    )
+
+
+def working_calendar():
+    return WorkingCalendar(holiday_dates())
@@ -3,4 +3,18 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hrms.settings')
 
-application = get_asgi_application()
+# Initialise Django before importing anything that touches models
+django_asgi_app = get_asgi_application()
+
+from channels.routing import ProtocolTypeRouter, URLRouter
+from channels.security.websocket import AllowedHostsOriginValidator
+from django.conf import settings
+from accounts.routing import websocket_urlpatterns
+
+protocols = {'http': django_asgi_app}
+if settings.REALTIME_ENABLED:
+    protocols['websocket'] = AllowedHostsOriginValidator(
+        URLRouter(websocket_urlpatterns)
+    )
+
+application = ProtocolTypeRouter(protocols)
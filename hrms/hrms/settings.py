@@ -9,7 +9,9 @@ https://docs.djangoproject.com/en/5.2/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
+import logging
 import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -38,6 +40,7 @@ INSTALLED_APPS = [
     'corsheaders',
     'accounts.apps.AccountsConfig', 
     'storages',
+    'channels',
 ]
 
 # Set custom user model
@@ -116,6 +119,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'hrms.wsgi.application'
+ASGI_APPLICATION = 'hrms.asgi.application'
 
 
 from pathlib import Path
@@ -181,8 +185,22 @@ EMAIL_PORT = int(config('EMAIL_PORT', default=587))
 EMAIL_USE_TLS = config('EMAIL_USE_TLS', default='True').lower() in ['true','1','t']
 EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
+# Per socket operation; keeps one stuck send well inside the outbox's per-message lease
+EMAIL_TIMEOUT = int(config('EMAIL_TIMEOUT', default=60))
 if not DEFAULT_FROM_EMAIL:
     DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+# Mail is queued in the OutboundEmail table; this runs the in-process sender
+# thread. Turn it off to send only via `manage.py send_email_outbox`.
+EMAIL_OUTBOX_WORKER = config('EMAIL_OUTBOX_WORKER', default='True').lower() in ['true','1','t']
+# Threads per process rendering HR letters in the background (accounts/letters.py)
+LETTER_WORKERS = int(config('LETTER_WORKERS', default=2))
+# Worker processes rendering PDFs for batch letter generation (scheduler process
+# or `manage.py generate_letters` only, never a web worker)
+LETTER_PROCESSES = int(config('LETTER_PROCESSES', default=2))
+# HTML -> PDF engine for letters: 'xhtml2pdf' or 'weasyprint' (accounts/pdf_rendering.py)
+PDF_BACKEND = config('PDF_BACKEND', default='xhtml2pdf')
+# Rendered letter PDFs are cached by content hash this long
+PDF_CACHE_TIMEOUT = int(config('PDF_CACHE_TIMEOUT', default=7 * 24 * 60 * 60))
 
 # --- MinIO (S3 Compatible) Storage Configuration ---
 MINIO_STORAGE = {
@@ -191,8 +209,26 @@ MINIO_STORAGE = {
     "SECRET_KEY": config('MINIO_SECRET_KEY'),
     "BUCKET_NAME": config('MINIO_BUCKET_NAME'),
     "USE_SSL": config('MINIO_USE_SSL', default='True').lower() in ['true','1','t'],
+    # Shared client's connection pool (accounts/storage.py)
+    "MAX_POOL_CONNECTIONS": int(config('MINIO_MAX_POOL_CONNECTIONS', default=32)),
+    "CONNECT_TIMEOUT": int(config('MINIO_CONNECT_TIMEOUT', default=5)),
+    "READ_TIMEOUT": int(config('MINIO_READ_TIMEOUT', default=60)),
+    # Threads per process for parallel transfers (multi-file uploads)
+    "IO_WORKERS": int(config('MINIO_IO_WORKERS', default=8)),
 }
 BASE_BUCKET_URL = config('BASE_BUCKET_URL')
+# Threads per process making thumbnails / face crops (accounts/image_derivatives.py)
+IMAGE_DERIVATIVE_WORKERS = int(config('IMAGE_DERIVATIVE_WORKERS', default=2))
+
+# Attendance selfies (accounts/photo_retention.py): re-encoded as small WebP
+# after RECOMPRESS_AFTER_DAYS and deleted after DELETE_AFTER_DAYS (0 keeps them)
+ATTENDANCE_PHOTO_RETENTION = {
+    "RECOMPRESS_AFTER_DAYS": int(config('ATTENDANCE_PHOTO_RECOMPRESS_AFTER_DAYS', default=30)),
+    "DELETE_AFTER_DAYS": int(config('ATTENDANCE_PHOTO_DELETE_AFTER_DAYS', default=365)),
+    "WEBP_QUALITY": int(config('ATTENDANCE_PHOTO_WEBP_QUALITY', default=45)),
+    "MAX_DIMENSION": int(config('ATTENDANCE_PHOTO_MAX_DIMENSION', default=800)),
+    "CONCURRENCY": int(config('ATTENDANCE_PHOTO_CONCURRENCY', default=8)),
+}
 
 LOGIN_URL = '/login/'        # or whatever your login route is
 LOGO_URL = config('LOGO_URL', default='')
@@ -202,16 +238,70 @@ MEDIA_URL = config('MEDIA_URL', default='/media/')
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 # Caching Configuration
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
-        'TIMEOUT': 300,  # 5 minutes
-        'OPTIONS': {
-            'MAX_ENTRIES': 1000,
+# The cache is shared by every worker process: Redis when REDIS_URL is set,
+# otherwise a file-based cache that all workers on one box (and test runs)
+# share. The file cache has no atomic incr()/add(), so concurrent version
+# bumps, hit/miss counters and the today-board lock can race between workers;
+# that is fine for a single box but multi-box deploys need Redis.
+REDIS_URL = config('REDIS_URL', default='')
+CACHE_KEY_PREFIX = config('CACHE_KEY_PREFIX', default='hrms')
+# Count cache hits/misses for /cache/stats/ (one extra cache write per read)
+CACHE_STATS_ENABLED = config('CACHE_STATS_ENABLED', default='False').lower() in ['true', '1', 't']
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'TIMEOUT': 300,  # 5 minutes
+            'KEY_PREFIX': CACHE_KEY_PREFIX,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': config('CACHE_DIR', default=os.path.join(tempfile.gettempdir(), f'{CACHE_KEY_PREFIX}-cache')),
+            'TIMEOUT': 300,  # 5 minutes
+            'KEY_PREFIX': CACHE_KEY_PREFIX,
+            'OPTIONS': {
+                'MAX_ENTRIES': 5000,
+            }
+        }
+    }
+
+# Channels (WebSocket attendance board)
+# Events are published from whichever process handled the write (a gunicorn
+# worker, the scheduler) and must reach the sockets held by the `ws` process,
+# so the layer has to be Redis. Without REDIS_URL the in-memory layer only
+# works for a single DEBUG process; outside DEBUG the board is turned off with
+# a warning instead. REALTIME_ENABLED=False turns it off explicitly: no layer,
+# no WebSocket route.
+REALTIME_ENABLED = config('REALTIME_ENABLED', default='True').lower() in ['true', '1', 't']
+
+if REALTIME_ENABLED and not REDIS_URL and not DEBUG:
+    logging.getLogger('hrms.settings').warning(
+        "REDIS_URL is not set: the live attendance board (REALTIME_ENABLED) is turned off."
+    )
+    REALTIME_ENABLED = False
+
+if not REALTIME_ENABLED:
+    CHANNEL_LAYERS = {}
+elif REDIS_URL:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {
+                'hosts': [REDIS_URL],
+            },
+        }
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
         }
     }
-}
 
 # Cache Middleware (optional)
 # MIDDLEWARE = [